@@ -0,0 +1,125 @@
+"""
+asyncio counterparts of app.core.crud for the API routes.
+Function names and semantics match the sync module; query construction is
+shared with it so both paths issue the same SQL.
+"""
+from typing import List, Optional, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user import User
+from app.models.news import News
+from app.models.news_stats import NewsStats
+from app.schemas.user import UserCreate
+from app.schemas.news import NewsCreate, NewsUpdate
+from app.core.crud import (
+    encode_news_cursor,
+    decode_news_cursor,
+    NEWS_COLUMNS,
+    news_list_statement,
+    news_projection,
+    news_row_statement,
+    news_rows_by_id_statement,
+    news_search_statement,
+    search_hits,
+)
+from app.core.news_summary import make_summary
+from app.core.news_duplicates import description_fingerprint
+from app.core.password_pool import password_pool
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.username == username).limit(1))
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return await db.scalar(select(User).where(User.email == email).limit(1))
+
+async def create_user(db: AsyncSession, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+    if hashed_password is None:
+        hashed_password = await password_pool.hash(user.password)
+    db_user = User(
+        username=user.username,
+        email=user.email,
+        password_hash=hashed_password
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    user = await get_user_by_username(db, username)
+    if not user:
+        return None
+    is_valid, new_hash = await password_pool.verify_and_update(password, user.password_hash)
+    if not is_valid:
+        return None
+    # Stored hash predates the current scheme/cost; upgrade it transparently
+    if new_hash:
+        await update_user_password_hash(db, user, new_hash)
+    return user
+
+async def update_user_password_hash(db: AsyncSession, user: User, hashed_password: str) -> User:
+    user.password_hash = hashed_password
+    await db.commit()
+    return user
+
+async def get_news_list(db: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return (await db.scalars(news_list_statement(skip, limit, cursor))).all()
+
+async def get_news_rows(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    columns=NEWS_COLUMNS,
+    creator: Optional[str] = None,
+):
+    return (await db.execute(news_list_statement(skip, limit, cursor, columns=columns, creator=creator))).all()
+
+async def get_news_row(db: AsyncSession, news_id: int):
+    return (await db.execute(news_row_statement(news_id))).first()
+
+async def get_news_rows_by_id(db: AsyncSession, news_ids: List[int], columns=NEWS_COLUMNS):
+    return (await db.execute(news_rows_by_id_statement(news_ids, columns))).all()
+
+async def get_news_creator(db: AsyncSession, news_id: int) -> Optional[str]:
+    return await db.scalar(select(News.creator).where(News.id == news_id))
+
+async def get_news_by_id(db: AsyncSession, news_id: int) -> Optional[News]:
+    return await db.get(News, news_id)
+
+async def create_news(db: AsyncSession, news: NewsCreate, creator: str) -> News:
+    db_news = News(
+        **news.model_dump(),
+        creator=creator,
+        summary=make_summary(news.description),
+        fingerprint=description_fingerprint(news.description)
+    )
+    db.add(db_news)
+    await db.commit()
+    await db.refresh(db_news)
+    return db_news
+
+async def update_news(db: AsyncSession, news_id: int, news_update: NewsUpdate) -> Optional[News]:
+    db_news = await db.get(News, news_id)
+    if db_news:
+        update_data = news_update.model_dump(exclude_unset=True)
+        for field, value in update_data.items():
+            setattr(db_news, field, value)
+        if "description" in update_data:
+            db_news.summary = make_summary(db_news.description)
+            db_news.fingerprint = description_fingerprint(db_news.description)
+        await db.commit()
+        # updated_at is generated by the database
+        await db.refresh(db_news)
+    return db_news
+
+async def delete_news(db: AsyncSession, news_id: int) -> bool:
+    # Plain DELETEs: news_stats is the only dependent table, so there's no need to load the row
+    result = await db.execute(delete(News).where(News.id == news_id))
+    await db.execute(delete(NewsStats).where(NewsStats.news_id == news_id))
+    await db.commit()
+    return result.rowcount > 0
+
+async def search_news(db: AsyncSession, q: str, limit: int = 10) -> List[Tuple[News, str, str, float]]:
+    stmt, ranked, terms = news_search_statement(q, limit)
+    return search_hits((await db.execute(stmt)).all(), ranked, terms)
@@ -1,10 +1,21 @@
+import base64
+import html
+import json
+import re
+from datetime import datetime
+from sqlalchemy import and_, or_, func, literal_column, table, column, text, select, delete
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
 from app.models.user import User
 from app.models.news import News
+from app.models.news_stats import NewsStats
 from app.schemas.user import UserCreate
-from app.schemas.news import NewsCreate, NewsUpdate
-from app.core.security import get_password_hash, verify_password
-from typing import Optional
+from app.schemas.news import News as NewsSchema, NewsCreate, NewsUpdate
+from app.core.security import get_password_hash, verify_password, password_needs_rehash
+from app.core.news_summary import NEWS_SUMMARY_LENGTH, make_summary
+from app.core.news_duplicates import description_fingerprint
+from app.database import news_fts
+from typing import List, Optional, Tuple
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
     return db.query(User).filter(User.username == username).first()
@@ -12,8 +23,10 @@ def get_user_by_username(db: Session, username: str) -> Optional[User]:
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
-def create_user(db: Session, user: UserCreate) -> User:
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None) -> User:
+    # Routes hash in the password pool and pass the result; scripts hash inline
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -30,16 +43,123 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
         return None
     if not verify_password(password, user.password_hash):
         return None
+    # Upgrade hashes made with an older scheme or cost while we know the password
+    if password_needs_rehash(user.password_hash):
+        update_user_password_hash(db, user, get_password_hash(password))
     return user
 
-def get_news_list(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(News).offset(skip).limit(limit).all()
+def update_user_password_hash(db: Session, user: User, hashed_password: str) -> User:
+    user.password_hash = hashed_password
+    db.commit()
+    return user
+
+def encode_news_cursor(news: News) -> str:
+    """Build an opaque cursor pointing just past the given news item"""
+    raw = json.dumps([news.created_at.isoformat(), news.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_news_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_news_cursor, raises ValueError on malformed input"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, news_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(news_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+def _news_column(name: str):
+    if name == "summary":
+        # Rows written before the column existed show a plain prefix until backfilled
+        return func.coalesce(News.summary, func.substr(News.description, 1, NEWS_SUMMARY_LENGTH)).label("summary")
+    return getattr(News, name)
+
+# Columns of the news response, in schema order; read paths that only
+# render JSON select these as plain rows instead of loading ORM objects
+NEWS_COLUMNS = tuple(_news_column(name) for name in NewsSchema.model_fields)
+_NEWS_COLUMNS_BY_NAME = dict(zip(NewsSchema.model_fields, NEWS_COLUMNS))
+# Needed for the next cursor and Last-Modified even when not requested
+_PAGING_FIELDS = ("id", "created_at", "updated_at")
+
+def news_projection(fields: Optional[List[str]] = None) -> Tuple[Tuple[str, ...], tuple]:
+    """
+    (fields to render, columns to select) for a sparse fieldset. Rendered
+    fields come first in schema order, so rows zip with them directly;
+    raises ValueError on unknown names.
+    """
+    if not fields:
+        return tuple(_NEWS_COLUMNS_BY_NAME), NEWS_COLUMNS
+    unknown = sorted(set(fields) - set(_NEWS_COLUMNS_BY_NAME))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    rendered = tuple(name for name in _NEWS_COLUMNS_BY_NAME if name in fields)
+    selected = rendered + tuple(name for name in _PAGING_FIELDS if name not in rendered)
+    return rendered, tuple(_NEWS_COLUMNS_BY_NAME[name] for name in selected)
+
+def news_list_statement(
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    columns=None,
+    creator: Optional[str] = None,
+) -> Select:
+    # Newest first; (created_at, id) is covered by ix_news_created_at_id,
+    # and by ix_news_creator_created_at_id within one creator
+    stmt = select(*columns) if columns else select(News)
+    if creator is not None:
+        stmt = stmt.where(News.creator == creator)
+    stmt = stmt.order_by(News.created_at.desc(), News.id.desc())
+    if cursor is not None:
+        created_at, news_id = decode_news_cursor(cursor)
+        # The leading <= gives SQLite an index range to seek into instead of a scan
+        stmt = stmt.where(
+            News.created_at <= created_at,
+            or_(News.created_at < created_at, and_(News.created_at == created_at, News.id < news_id))
+        )
+    else:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
+def get_news_list(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    return db.execute(news_list_statement(skip, limit, cursor)).scalars().all()
+
+def get_news_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    columns=NEWS_COLUMNS,
+    creator: Optional[str] = None,
+):
+    """Same page as get_news_list, as plain rows of the given columns"""
+    return db.execute(news_list_statement(skip, limit, cursor, columns=columns, creator=creator)).all()
+
+def news_row_statement(news_id: int) -> Select:
+    return select(*NEWS_COLUMNS).where(News.id == news_id)
+
+def get_news_row(db: Session, news_id: int):
+    return db.execute(news_row_statement(news_id)).first()
+
+def news_rows_by_id_statement(news_ids: List[int], columns=NEWS_COLUMNS) -> Select:
+    # Primary key lookups; callers put the rows back in their own order
+    return select(*columns).where(News.id.in_(news_ids))
+
+def get_news_rows_by_id(db: Session, news_ids: List[int], columns=NEWS_COLUMNS):
+    return db.execute(news_rows_by_id_statement(news_ids, columns)).all()
+
+def get_news_creator(db: Session, news_id: int) -> Optional[str]:
+    """Owner of a news item, without loading the row into the session"""
+    return db.scalar(select(News.creator).where(News.id == news_id))
 
 def get_news_by_id(db: Session, news_id: int) -> Optional[News]:
     return db.query(News).filter(News.id == news_id).first()
 
 def create_news(db: Session, news: NewsCreate, creator: str) -> News:
-    db_news = News(**news.dict(), creator=creator)
+    db_news = News(
+        **news.dict(),
+        creator=creator,
+        summary=make_summary(news.description),
+        fingerprint=description_fingerprint(news.description)
+    )
     db.add(db_news)
     db.commit()
     db.refresh(db_news)
@@ -51,6 +171,9 @@ def update_news(db: Session, news_id: int, news_update: NewsUpdate) -> Optional[
         update_data = news_update.dict(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_news, field, value)
+        if "description" in update_data:
+            db_news.summary = make_summary(db_news.description)
+            db_news.fingerprint = description_fingerprint(db_news.description)
         db.commit()
         db.refresh(db_news)
     return db_news
@@ -59,6 +182,114 @@ def delete_news(db: Session, news_id: int) -> bool:
     db_news = db.query(News).filter(News.id == news_id).first()
     if db_news:
         db.delete(db_news)
+        db.execute(delete(NewsStats).where(NewsStats.news_id == news_id))
         db.commit()
         return True
-    return False
\ No newline at end of file
+    return False
+
+HIGHLIGHT_OPEN = "<mark>"
+HIGHLIGHT_CLOSE = "</mark>"
+# FTS5 wraps matches in these private-use characters instead of the tags, so
+# the text around them can be HTML-escaped before the tags are put in
+_FTS_OPEN = "\ue000"
+_FTS_CLOSE = "\ue001"
+SNIPPET_TOKENS = 24
+# Trigram index cannot match anything shorter than 3 characters
+FTS_MIN_TERM_LENGTH = 3
+
+_news_fts = table("news_fts", column("rowid"))
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+def _mark_terms(value: str, terms: List[str]) -> str:
+    """HTML-escaped value with every term occurrence in <mark>, in one pass so tags are never re-matched"""
+    value = html.escape(value, quote=False)
+    if not terms:
+        return value
+    # Longest first, so of two terms matching at one position the longer wins
+    escaped_terms = sorted({html.escape(term, quote=False) for term in terms}, key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(term) for term in escaped_terms))
+    return pattern.sub(lambda match: f"{HIGHLIGHT_OPEN}{match.group(0)}{HIGHLIGHT_CLOSE}", value)
+
+def _render_fts_marks(value: str) -> str:
+    """FTS5 highlight()/snippet() output as escaped HTML with <mark> tags"""
+    return (
+        html.escape(value or "", quote=False)
+        .replace(_FTS_OPEN, HIGHLIGHT_OPEN)
+        .replace(_FTS_CLOSE, HIGHLIGHT_CLOSE)
+    )
+
+def _excerpt(value: str, terms: List[str], width: int = SNIPPET_TOKENS) -> str:
+    """Python-side snippet for queries the FTS index cannot serve"""
+    hits = [value.find(term) for term in terms if term in value]
+    start = max(min(hits) - width // 2, 0) if hits else 0
+    excerpt = value[start:start + width * 2]
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + width * 2 < len(value) else ""
+    return prefix + _mark_terms(excerpt, terms) + suffix
+
+def news_search_statement(q: str, limit: int = 10) -> Tuple[Select, bool, List[str]]:
+    """Build the search query; returns (statement, ranked, terms) for search_hits()"""
+    terms = list(dict.fromkeys(q.split()))
+    long_terms = [t for t in terms if len(t) >= FTS_MIN_TERM_LENGTH]
+    short_terms = [t for t in terms if len(t) < FTS_MIN_TERM_LENGTH]
+    short_filters = [
+        or_(News.title.contains(t, autoescape=True), News.description.contains(t, autoescape=True))
+        for t in short_terms
+    ]
+
+    if news_fts.fts_enabled and long_terms:
+        fts = literal_column("news_fts")
+        # Title matches weigh 10x description matches; bm25() is lower-is-better
+        score = func.bm25(fts, 10.0, 1.0)
+        stmt = (
+            select(
+                News,
+                func.highlight(fts, 0, _FTS_OPEN, _FTS_CLOSE),
+                func.snippet(fts, 1, _FTS_OPEN, _FTS_CLOSE, "…", SNIPPET_TOKENS),
+                score,
+            )
+            .join(_news_fts, _news_fts.c.rowid == News.id)
+            .where(
+                text("news_fts MATCH :match").bindparams(match=" ".join(_fts_phrase(t) for t in long_terms)),
+                *short_filters
+            )
+            .order_by(score)
+            .limit(limit)
+        )
+        return stmt, True, terms
+
+    # Only short terms (or no FTS5): unranked substring scan, newest first
+    if not news_fts.fts_enabled:
+        short_filters = [
+            or_(News.title.contains(t, autoescape=True), News.description.contains(t, autoescape=True))
+            for t in terms
+        ]
+    stmt = (
+        select(News)
+        .where(*short_filters)
+        .order_by(News.created_at.desc(), News.id.desc())
+        .limit(limit)
+    )
+    return stmt, False, terms
+
+def search_hits(rows, ranked: bool, terms: List[str]) -> List[Tuple[News, str, str, float]]:
+    if ranked:
+        return [
+            (news, _render_fts_marks(title), _render_fts_marks(snippet), -rank)
+            for news, title, snippet, rank in rows
+        ]
+    return [
+        (news, _mark_terms(news.title, terms), _excerpt(news.description, terms), 0.0)
+        for (news,) in rows
+    ]
+
+def search_news(db: Session, q: str, limit: int = 10) -> List[Tuple[News, str, str, float]]:
+    """
+    BM25-ranked search over title and description.
+    Returns (news, highlighted title, highlighted snippet, score) tuples, best first;
+    highlights are HTML-escaped text with <mark> around matched terms.
+    """
+    stmt, ranked, terms = news_search_statement(q, limit)
+    return search_hits(db.execute(stmt).all(), ranked, terms)
\ No newline at end of file
@@ -1,18 +1,27 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from app.database.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_read_db
 from app.core.security import verify_token
-from app.core.crud import get_user_by_username
-from app.models.user import User
+from app.core.async_crud import get_user_by_username
+from app.core.user_cache import user_cache
+from app.core.profiler import profile_span
+from app.schemas.user import User
 
 security = HTTPBearer()
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ) -> User:
-    token = credentials.credentials
+    with profile_span("auth"):
+        return await _resolve_user(credentials.credentials, db)
+
+async def _resolve_user(token: str, db: AsyncSession) -> User:
+    cached_user = user_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     payload = verify_token(token)
     username = payload.get("username")
     
@@ -22,10 +31,13 @@ def get_current_user(
             detail="Could not validate credentials"
         )
     
-    user = get_user_by_username(db, username)
+    user = await get_user_by_username(db, username)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
-    return user
\ No newline at end of file
+    # Detached snapshot: safe to share across requests and sessions
+    snapshot = User.model_validate(user)
+    user_cache.set(token, snapshot, expires_at=payload["exp"])
+    return snapshot
\ No newline at end of file
@@ -0,0 +1,316 @@
+import queue
+import random
+import smtplib
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, List, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.database.database import SessionLocal
+from app.models.outbox import EmailOutbox
+from app.core.metrics import counter, gauge, histogram
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+import email_config
+
+smtp_send_seconds = histogram("smtp_send_seconds", "Time to hand one message to the SMTP server")
+smtp_connects = counter("smtp_connections_opened_total", "SMTP connections opened (connect + STARTTLS + login)")
+smtp_connect_seconds = histogram("smtp_connect_seconds", "Time to open one SMTP connection, including STARTTLS and login")
+smtp_send_failures = counter("smtp_send_failures_total", "Messages the SMTP server refused or that failed in transit")
+outbox_delivered = counter("email_outbox_delivered_total", "Outbox messages by final delivery state", labels=("status",))
+outbox_retries = counter("email_outbox_retries_total", "Outbox deliveries rescheduled after a transient failure")
+
+class SMTPConnectionPool:
+    """
+    Small pool of authenticated SMTP connections, reused across messages so
+    each send skips the connect/STARTTLS/login round-trips.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        size: int = 2,
+        use_starttls: bool = True,
+        timeout: float = 15,
+        idle_timeout: float = 60,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.use_starttls = use_starttls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl_context
+        # (connection, last used at); only idle connections live in the queue
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        started = time.perf_counter()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_starttls:
+                smtp.starttls(context=self.ssl_context or ssl.create_default_context())
+            if self.username:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._close(smtp)
+            raise
+        smtp_connects.inc()
+        smtp_connect_seconds.observe(time.perf_counter() - started)
+        return smtp
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _acquire(self) -> smtplib.SMTP:
+        while True:
+            try:
+                smtp, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used > self.idle_timeout:
+                self._close(smtp)
+                continue
+            return smtp
+
+    def send(self, sender: str, recipient: str, message: str) -> None:
+        """Send one message, at most `size` at a time; raises smtplib/socket errors"""
+        try:
+            self._send(sender, recipient, message)
+        except Exception:
+            smtp_send_failures.inc()
+            raise
+
+    def _send(self, sender: str, recipient: str, message: str) -> None:
+        with self._slots:
+            smtp = self._acquire()
+            started = time.perf_counter()
+            try:
+                smtp.sendmail(sender, recipient, message)
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server rejected the message and the conversation is still
+                # in sync; checked first because SMTPException subclasses OSError
+                self._idle.put((smtp, time.monotonic()))
+                raise
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                self._close(smtp)
+                if isinstance(e, smtplib.SMTPException) and not isinstance(e, smtplib.SMTPServerDisconnected):
+                    raise
+                # Server dropped an idle connection; retry once on a fresh one
+                smtp = self._connect()
+                try:
+                    smtp.sendmail(sender, recipient, message)
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                    self._idle.put((smtp, time.monotonic()))
+                    raise
+                except Exception:
+                    self._close(smtp)
+                    raise
+            smtp_send_seconds.observe(time.perf_counter() - started)
+            self._idle.put((smtp, time.monotonic()))
+
+    def close(self) -> None:
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(smtp)
+
+def build_message(sender: str, recipient: str, subject: str, html_body: str) -> str:
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = sender
+    message["To"] = recipient
+    message.attach(MIMEText(html_body, "html"))
+    return message.as_string()
+
+def enqueue_email(db: Session, recipient: str, subject: str, html_body: str) -> EmailOutbox:
+    """Add a message to the outbox; it is sent once the caller commits"""
+    row = EmailOutbox(
+        recipient=recipient,
+        subject=subject,
+        body=html_body,
+        status="pending",
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(row)
+    return row
+
+def _is_permanent(error: Exception) -> bool:
+    # 5xx replies (bad mailbox, rejected content) will not succeed on retry
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500 and not isinstance(error, smtplib.SMTPAuthenticationError)
+    return False
+
+class OutboxWorker:
+    """
+    Background thread that delivers pending email_outbox rows through an
+    SMTPConnectionPool, retrying transient failures with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        pool: SMTPConnectionPool,
+        sender: str,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_attempts: int = email_config.OUTBOX_MAX_ATTEMPTS,
+        retry_base: float = email_config.OUTBOX_RETRY_BASE_SECONDS,
+        retry_max: float = email_config.OUTBOX_RETRY_MAX_SECONDS,
+        poll_interval: float = email_config.OUTBOX_POLL_SECONDS,
+        claim_lease: float = email_config.OUTBOX_CLAIM_LEASE_SECONDS,
+    ):
+        self.pool = pool
+        self.sender = sender
+        self.session_factory = session_factory
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_interval = poll_interval
+        self.claim_lease = claim_lease
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._senders: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.pending = gauge(
+            "email_outbox_pending",
+            "Outbox messages waiting for delivery as of the last poll",
+            function=lambda: self._pending,
+        )
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._recover_stuck()
+        self._senders = ThreadPoolExecutor(max_workers=self.pool.size, thread_name_prefix="smtp-send")
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._senders.shutdown(wait=True)
+        self.pool.close()
+        self._thread = None
+
+    def notify(self) -> None:
+        """Wake the worker now instead of at the next poll"""
+        self._wakeup.set()
+
+    def _recover_stuck(self) -> None:
+        db = self.session_factory()
+        try:
+            self._reclaim_expired(db, datetime.utcnow())
+            db.commit()
+        finally:
+            db.close()
+
+    def _reclaim_expired(self, db: Session, now: datetime) -> int:
+        # Rows left in 'sending' by a crashed worker are retried once their claim
+        # lease runs out; claims held by live workers are left alone. Delivery is
+        # at-least-once. Rows claimed before claimed_at existed have no lease.
+        expired = now - timedelta(seconds=self.claim_lease)
+        return db.query(EmailOutbox).filter(
+            EmailOutbox.status == "sending",
+            or_(EmailOutbox.claimed_at.is_(None), EmailOutbox.claimed_at <= expired),
+        ).update({EmailOutbox.status: "pending", EmailOutbox.claimed_at: None}, synchronize_session=False)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                batch = self._claim_due(limit=self.pool.size * 4)
+            except Exception as e:
+                print(f"❌ Email outbox poll failed: {e}")
+                batch = []
+            if batch:
+                list(self._senders.map(self._deliver, batch))
+                continue
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim_due(self, limit: int) -> List[int]:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            self._reclaim_expired(db, now)
+            due = db.query(EmailOutbox).filter(
+                EmailOutbox.status == "pending",
+                EmailOutbox.next_attempt_at <= now
+            )
+            self._pending = db.query(EmailOutbox).filter(EmailOutbox.status == "pending").count()
+            rows = due.order_by(EmailOutbox.next_attempt_at).limit(limit).all()
+            for row in rows:
+                row.status = "sending"
+                row.claimed_at = now
+                row.attempts += 1
+            db.commit()
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    def _deliver(self, outbox_id: int) -> None:
+        db = self.session_factory()
+        try:
+            row = db.query(EmailOutbox).filter(EmailOutbox.id == outbox_id).first()
+            if row is None:
+                return
+            try:
+                self.pool.send(self.sender, row.recipient, build_message(self.sender, row.recipient, row.subject, row.body))
+            except Exception as e:
+                row.last_error = f"{type(e).__name__}: {e}"
+                if _is_permanent(e) or row.attempts >= self.max_attempts:
+                    row.status = "failed"
+                    outbox_delivered.inc(status="failed")
+                    print(f"❌ Failed to send email to {row.recipient}: {e}")
+                else:
+                    delay = min(self.retry_max, self.retry_base * 2 ** (row.attempts - 1))
+                    row.status = "pending"
+                    row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+                    outbox_retries.inc()
+            else:
+                row.status = "sent"
+                row.sent_at = datetime.utcnow()
+                row.last_error = None
+                outbox_delivered.inc(status="sent")
+            db.commit()
+        finally:
+            db.close()
+
+# Global outbox worker, started by the app when real email sending is enabled
+outbox_worker = OutboxWorker(
+    SMTPConnectionPool(
+        host=email_config.SMTP_SERVER,
+        port=email_config.SMTP_PORT,
+        username=email_config.EMAIL_ADDRESS,
+        password=email_config.EMAIL_PASSWORD,
+        size=email_config.SMTP_POOL_SIZE,
+        use_starttls=email_config.SMTP_USE_STARTTLS,
+        timeout=email_config.SMTP_TIMEOUT,
+        idle_timeout=email_config.SMTP_IDLE_TIMEOUT,
+    ),
+    sender=email_config.EMAIL_ADDRESS,
+)
\ No newline at end of file
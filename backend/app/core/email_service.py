@@ -1,14 +1,12 @@
-import smtplib
-import ssl
 import secrets
 import string
 from datetime import datetime, timedelta
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.verification import EmailVerification
-from app.core.crud import get_user_by_email
+from app.core.async_crud import get_user_by_email
+from app.core.email_outbox import build_message, enqueue_email, outbox_worker
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -42,23 +40,12 @@ class EmailService:
             return True
         
         try:
-            # Create message
-            message = MIMEMultipart("alternative")
-            message["Subject"] = EMAIL_SUBJECT
-            message["From"] = self.email_address
-            message["To"] = email
-            
             # Use template from config
             html_content = EMAIL_TEMPLATE.format(verification_code=verification_code)
-            part = MIMEText(html_content, "html")
-            message.attach(part)
+            message = build_message(self.email_address, email, EMAIL_SUBJECT, html_content)
             
-            # Send email
-            context = ssl.create_default_context()
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls(context=context)
-                server.login(self.email_address, self.email_password)
-                server.sendmail(self.email_address, email, message.as_string())
+            # Send over a pooled, already-authenticated connection
+            outbox_worker.pool.send(self.email_address, email, message)
             
             print(f"✅ Email sent successfully!")
             print(f"   From: {self.email_address}")
@@ -72,16 +59,37 @@ class EmailService:
             print(f"   Error: {e}")
             return False
     
-    def create_verification_record(self, db: Session, email: str) -> str:
+    def queue_verification_email(self, db: AsyncSession, email: str, verification_code: str) -> None:
+        """Add the verification email to the outbox; delivered after the caller commits"""
+        if not self.use_real_email:
+            self.send_verification_email(email, verification_code)
+            return
+        html_content = EMAIL_TEMPLATE.format(verification_code=verification_code)
+        enqueue_email(db, email, EMAIL_SUBJECT, html_content)
+    
+    async def request_verification(self, db: AsyncSession, email: str) -> str:
+        """Create a verification record and queue its email in one transaction"""
+        verification_code = await self._add_verification_record(db, email)
+        self.queue_verification_email(db, email, verification_code)
+        await db.commit()
+        outbox_worker.notify()
+        return verification_code
+    
+    async def create_verification_record(self, db: AsyncSession, email: str) -> str:
         """Create a new verification record and return the code"""
+        verification_code = await self._add_verification_record(db, email)
+        await db.commit()
+        return verification_code
+    
+    async def _add_verification_record(self, db: AsyncSession, email: str) -> str:
         verification_code = self.generate_verification_code()
         expires_at = datetime.utcnow() + timedelta(minutes=10)
         
         # Remove any existing unverified codes for this email
-        db.query(EmailVerification).filter(
+        await db.execute(delete(EmailVerification).where(
             EmailVerification.email == email,
             EmailVerification.is_used == False
-        ).delete()
+        ))
         
         # Create new verification record
         verification = EmailVerification(
@@ -90,38 +98,37 @@ class EmailService:
             expires_at=expires_at
         )
         db.add(verification)
-        db.commit()
         
         return verification_code
     
-    def verify_code(self, db: Session, email: str, code: str) -> bool:
+    async def verify_code(self, db: AsyncSession, email: str, code: str) -> bool:
         """Verify the email code"""
-        verification = db.query(EmailVerification).filter(
+        verification = await db.scalar(select(EmailVerification).where(
             EmailVerification.email == email,
             EmailVerification.verification_code == code,
             EmailVerification.is_used == False,
             EmailVerification.expires_at > datetime.utcnow()
-        ).first()
+        ).limit(1))
         
         if verification:
             verification.is_used = True
-            db.commit()
+            await db.commit()
             return True
         
         return False
     
-    def is_email_verified(self, db: Session, email: str) -> bool:
+    async def is_email_verified(self, db: AsyncSession, email: str) -> bool:
         """Check if email has been verified"""
         # Check if user exists and has verified email
-        user = get_user_by_email(db, email)
+        user = await get_user_by_email(db, email)
         if user:
             return True  # User exists, so email was verified during registration
             
         # Check for recent verification
-        verification = db.query(EmailVerification).filter(
+        verification = await db.scalar(select(EmailVerification).where(
             EmailVerification.email == email,
             EmailVerification.is_used == True
-        ).order_by(EmailVerification.created_at.desc()).first()
+        ).order_by(EmailVerification.created_at.desc()).limit(1))
         
         return verification is not None
 
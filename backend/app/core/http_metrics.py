@@ -0,0 +1,79 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import counter, gauge, histogram
+
+http_requests = counter(
+    "http_requests_total",
+    "HTTP requests by method, route template and status",
+    labels=("method", "route", "status"),
+)
+http_request_seconds = histogram(
+    "http_request_duration_seconds",
+    "Time from request start until the last body byte is sent",
+    labels=("method", "route"),
+)
+http_in_flight = gauge("http_requests_in_flight", "HTTP requests currently being served")
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task/queue overhead) that
+    records per-route counts, latency and in-flight requests. Routes are
+    labeled by their path template, so /api/news/1 and /api/news/2 share
+    one series.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            http_requests.inc(method=scope["method"], route=template, status=str(status_code))
+            http_request_seconds.observe(elapsed, method=scope["method"], route=template)
+
+def _thread_limiter_stat(name: str) -> float:
+    # anyio's limiter lives in the event loop; /metrics is async so this runs there
+    from anyio import to_thread
+    try:
+        limiter = to_thread.current_default_thread_limiter()
+    except Exception:
+        return 0
+    if name == "waiting":
+        return limiter.statistics().tasks_waiting
+    return getattr(limiter, name)
+
+threadpool_capacity = gauge(
+    "threadpool_capacity",
+    "Worker threads available to sync routes and run_in_threadpool",
+    function=lambda: _thread_limiter_stat("total_tokens"),
+)
+threadpool_busy = gauge(
+    "threadpool_busy_threads",
+    "Worker threads currently running sync work",
+    function=lambda: _thread_limiter_stat("borrowed_tokens"),
+)
+threadpool_waiting = gauge(
+    "threadpool_waiting_tasks",
+    "Sync calls queued because every worker thread is busy",
+    function=lambda: _thread_limiter_stat("waiting"),
+)
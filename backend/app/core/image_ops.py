@@ -0,0 +1,36 @@
+"""
+Image transforms run inside the media worker processes. Kept free of app
+imports so spawned workers start without touching the database setup.
+"""
+from io import BytesIO
+from PIL import Image, ImageOps
+
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+def render_variant(source: bytes, width: int, fmt: str, quality: int) -> bytes:
+    """Decode source, shrink it to at most `width` pixels wide and encode as fmt"""
+    with Image.open(BytesIO(source)) as image:
+        if image.format == "JPEG":
+            # Let libjpeg decode at a reduced scale when the target is much smaller
+            image.draft("RGB", (width, image.height * width // max(image.width, 1)))
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+
+        if fmt == "jpeg" or image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+            if has_alpha and fmt == "jpeg":
+                # JPEG has no alpha channel; flatten onto white
+                rgba = image.convert("RGBA")
+                image = Image.new("RGB", rgba.size, (255, 255, 255))
+                image.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                image = image.convert("RGBA" if has_alpha else "RGB")
+
+        output = BytesIO()
+        if fmt == "jpeg":
+            image.save(output, FORMATS[fmt], quality=quality, optimize=True, progressive=True)
+        else:
+            image.save(output, FORMATS[fmt], quality=quality, method=4)
+        return output.getvalue()
@@ -0,0 +1,387 @@
+import asyncio
+import hashlib
+import ipaddress
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import SplitResult, urljoin, urlsplit
+import httpx
+from app.core import image_ops
+from app.core.metrics import counter, gauge, histogram
+
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "./data/media")
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Requested widths snap up to one of these, which bounds the variants per image
+MEDIA_WIDTHS = [int(w) for w in os.getenv("MEDIA_WIDTHS", "160,320,480,640,960,1280,1920").split(",")]
+MEDIA_QUALITY = int(os.getenv("MEDIA_QUALITY", "80"))
+MEDIA_FETCH_TIMEOUT = float(os.getenv("MEDIA_FETCH_TIMEOUT", "10"))
+MEDIA_MAX_SOURCE_BYTES = int(os.getenv("MEDIA_MAX_SOURCE_BYTES", str(20 * 1024 * 1024)))
+# Comma-separated hostnames the proxy may fetch from; empty allows any http(s) host.
+# Either way, hosts that resolve to loopback, private, link-local or other
+# non-public addresses are refused, on the first request and on every redirect
+MEDIA_ALLOWED_HOSTS = [h.strip().lower() for h in os.getenv("MEDIA_ALLOWED_HOSTS", "").split(",") if h.strip()]
+MEDIA_MAX_REDIRECTS = int(os.getenv("MEDIA_MAX_REDIRECTS", "5"))
+
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+media_requests = counter("media_requests_total", "Image proxy requests by cache result", labels=("result",))
+media_evictions = counter("media_cache_evictions_total", "Files evicted from the image cache to stay under budget")
+media_fetch_seconds = histogram("media_fetch_seconds", "Time to download a source image")
+media_render_seconds = histogram("media_render_seconds", "Time to resize and encode one variant, including queueing")
+
+class MediaUnavailable(Exception):
+    """The source image could not be fetched or decoded"""
+
+def snap_width(width: Optional[int], widths: Sequence[int] = MEDIA_WIDTHS) -> int:
+    widths = sorted(widths)
+    if width is None:
+        return widths[-1]
+    for candidate in widths:
+        if candidate >= width:
+            return candidate
+    return widths[-1]
+
+def is_public_address(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+async def resolve_host(host: str, port: int) -> List[str]:
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+class HTTPImageFetcher:
+    """
+    Downloads source images over a shared httpx client with a size cap.
+    Every hop, redirects included, must resolve to public addresses only,
+    and the request goes to the address that was checked so a second DNS
+    answer can't point it at an internal service.
+    """
+
+    def __init__(
+        self,
+        timeout: float = MEDIA_FETCH_TIMEOUT,
+        max_bytes: int = MEDIA_MAX_SOURCE_BYTES,
+        allowed_hosts: Sequence[str] = MEDIA_ALLOWED_HOSTS,
+        max_redirects: int = MEDIA_MAX_REDIRECTS,
+        resolver: Callable[[str, int], Awaitable[List[str]]] = resolve_host,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.allowed_hosts = list(allowed_hosts)
+        self.max_redirects = max_redirects
+        self.resolver = resolver
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _check_url(self, url: str) -> SplitResult:
+        parts = urlsplit(url)
+        try:
+            parts.port
+        except ValueError:
+            raise MediaUnavailable(f"Unsupported image URL: {url}")
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise MediaUnavailable(f"Unsupported image URL: {url}")
+        if self.allowed_hosts and parts.hostname.lower() not in self.allowed_hosts:
+            raise MediaUnavailable(f"Image host not allowed: {parts.hostname}")
+        return parts
+
+    async def _pinned_request(self, url: str) -> httpx.Request:
+        parts = self._check_url(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            addresses = await self.resolver(parts.hostname, port)
+        except OSError as e:
+            raise MediaUnavailable(f"Cannot resolve image host: {parts.hostname}") from e
+        if not addresses or not all(is_public_address(address) for address in addresses):
+            raise MediaUnavailable(f"Image host is not public: {parts.hostname}")
+        target = httpx.URL(url)
+        # Host and SNI keep the original name, so virtual hosting and
+        # certificate checks behave as if the name had been dialled
+        return self._client.build_request(
+            "GET",
+            target.copy_with(host=addresses[0]),
+            headers={"Host": target.netloc.decode("ascii")},
+            extensions={"sni_hostname": parts.hostname} if parts.scheme == "https" else {},
+        )
+
+    async def fetch(self, url: str) -> bytes:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, follow_redirects=False, transport=self.transport)
+        try:
+            for _ in range(self.max_redirects + 1):
+                request = await self._pinned_request(url)
+                response = await self._client.send(request, stream=True)
+                try:
+                    location = response.headers.get("location")
+                    if response.status_code in _REDIRECT_STATUSES and location:
+                        url = urljoin(url, location)
+                        continue
+                    if response.status_code != 200:
+                        raise MediaUnavailable(f"Upstream returned {response.status_code}")
+                    chunks: List[bytes] = []
+                    size = 0
+                    async for chunk in response.aiter_bytes():
+                        size += len(chunk)
+                        if size > self.max_bytes:
+                            raise MediaUnavailable(f"Image exceeds {self.max_bytes} bytes")
+                        chunks.append(chunk)
+                    return b"".join(chunks)
+                finally:
+                    await response.aclose()
+            raise MediaUnavailable(f"More than {self.max_redirects} redirects")
+        except httpx.HTTPError as e:
+            raise MediaUnavailable(f"Fetch failed: {type(e).__name__}") from e
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+class Variant:
+    __slots__ = ("path", "size", "etag", "media_type")
+
+    def __init__(self, path: str, size: int, etag: str, media_type: str):
+        self.path = path
+        self.size = size
+        self.etag = etag
+        self.media_type = media_type
+
+class MediaCache:
+    """
+    Content-addressed disk cache for proxied images. Sources are stored
+    under their sha256, resized variants next to them, and a per-URL
+    pointer maps the image URL to its source digest. Total size is kept
+    under max_bytes by evicting least recently served files; file mtimes
+    carry the recency across restarts.
+    """
+
+    def __init__(
+        self,
+        root: str = MEDIA_CACHE_DIR,
+        max_bytes: int = MEDIA_CACHE_MAX_BYTES,
+        fetcher=None,
+        workers: int = MEDIA_WORKERS,
+        quality: int = MEDIA_QUALITY,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        # Anything with `async fetch(url) -> bytes`; tests point this at a local server
+        self.fetcher = fetcher or HTTPImageFetcher()
+        self.workers = workers
+        self.quality = quality
+        self._lock = threading.Lock()
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._loaded = False
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Tuple[str, int, str], "asyncio.Task"] = {}
+        self.disk_bytes = gauge("media_cache_bytes", "Bytes currently held by the image cache", function=lambda: self._bytes)
+
+    # Layout
+
+    def _path(self, kind: str, name: str) -> str:
+        return os.path.join(self.root, kind, name[:2], name)
+
+    def _pointer_path(self, url: str) -> str:
+        return self._path("urls", hashlib.sha256(url.encode()).hexdigest())
+
+    @staticmethod
+    def _variant_name(digest: str, width: int, fmt: str) -> str:
+        return f"{digest}-w{width}.{fmt}"
+
+    # Disk index
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        found = []
+        for kind in ("sources", "variants"):
+            for directory, _, names in os.walk(os.path.join(self.root, kind)):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    found.append((stat.st_mtime, path, stat.st_size))
+        with self._lock:
+            for _, path, size in sorted(found):
+                self._files[path] = size
+                self._bytes += size
+            self._loaded = True
+
+    def _touch(self, path: str) -> bool:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._bytes -= self._files.pop(path, 0)
+            return False
+        with self._lock:
+            if path in self._files:
+                self._files.move_to_end(path)
+        return True
+
+    def _write(self, path: str, data: bytes, track: bool = True) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        if track:
+            with self._lock:
+                self._bytes += len(data) - self._files.pop(path, 0)
+                self._files[path] = len(data)
+            self._evict(keep=path)
+
+    def _evict(self, keep: str) -> None:
+        while True:
+            with self._lock:
+                if self._bytes <= self.max_bytes or len(self._files) <= 1:
+                    return
+                path = next(iter(self._files))
+                if path == keep:
+                    self._files.move_to_end(path)
+                    path = next(iter(self._files))
+                self._bytes -= self._files.pop(path)
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            media_evictions.inc()
+
+    def _read_pointer(self, url: str) -> Optional[str]:
+        try:
+            with open(self._pointer_path(url)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _find_variant(self, url: str, width: int, fmt: str) -> Optional[Tuple[str, str]]:
+        """(source digest, variant path) when the variant is on disk"""
+        self._load()
+        digest = self._read_pointer(url)
+        if digest is None:
+            return None
+        path = self._path("variants", self._variant_name(digest, width, fmt))
+        return (digest, path) if self._touch(path) else None
+
+    def _read_source(self, digest: str) -> Optional[bytes]:
+        path = self._path("sources", digest)
+        if not self._touch(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _store_source(self, url: str, source: bytes) -> str:
+        digest = hashlib.sha256(source).hexdigest()
+        path = self._path("sources", digest)
+        if not self._touch(path):
+            self._write(path, source)
+        # Pointers are a few bytes each and not counted against the budget
+        self._write(self._pointer_path(url), digest.encode(), track=False)
+        return digest
+
+    # Rendering
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn for the same reason as the password pool: no forked locks
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def _render(self, source: bytes, width: int, fmt: str) -> bytes:
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._get_executor(), image_ops.render_variant, source, width, fmt, self.quality
+            )
+        except Exception as e:
+            raise MediaUnavailable(f"Cannot decode image: {type(e).__name__}") from e
+        finally:
+            media_render_seconds.observe(time.perf_counter() - started)
+
+    def _variant(self, digest: str, path: str, width: int, fmt: str) -> Variant:
+        return Variant(
+            path=path,
+            size=os.path.getsize(path),
+            etag=f'"{digest[:20]}-w{width}.{fmt}"',
+            media_type=MEDIA_TYPES[fmt],
+        )
+
+    async def _produce(self, url: str, width: int, fmt: str) -> Variant:
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, self._read_pointer, url)
+        source = await loop.run_in_executor(None, self._read_source, digest) if digest else None
+        if source is None:
+            started = time.perf_counter()
+            source = await self.fetcher.fetch(url)
+            media_fetch_seconds.observe(time.perf_counter() - started)
+            digest = await loop.run_in_executor(None, self._store_source, url, source)
+        data = await self._render(source, width, fmt)
+        path = self._path("variants", self._variant_name(digest, width, fmt))
+        await loop.run_in_executor(None, self._write, path, data)
+        return self._variant(digest, path, width, fmt)
+
+    async def get(self, url: str, width: int, fmt: str) -> Variant:
+        """Return the cached variant, fetching and rendering it on first use"""
+        loop = asyncio.get_running_loop()
+        found = await loop.run_in_executor(None, self._find_variant, url, width, fmt)
+        if found is not None:
+            media_requests.inc(result="hit")
+            return self._variant(found[0], found[1], width, fmt)
+
+        media_requests.inc(result="miss")
+        key = (url, width, fmt)
+        task = self._inflight.get(key)
+        if task is None:
+            # Concurrent misses for the same variant share one fetch and render
+            task = asyncio.ensure_future(self._produce(url, width, fmt))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def start(self) -> None:
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(os.getpid)
+
+    def shutdown(self) -> None:
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def close(self) -> None:
+        close = getattr(self.fetcher, "close", None)
+        if close is not None:
+            await close()
+
+# Global image proxy cache
+media_cache = MediaCache()
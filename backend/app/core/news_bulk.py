@@ -0,0 +1,165 @@
+import os
+from typing import AsyncIterator, Dict, List, Optional
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import AsyncReadSessionLocal
+from app.models.news import News
+from app.schemas.news import NewsCreate
+from app.core.crud import NEWS_COLUMNS
+from app.core.metrics import counter
+from app.core.news_json import render_news_ndjson
+from app.core.news_summary import make_summary
+from app.core.news_duplicates import FingerprintIndex, description_fingerprint, news_duplicates
+
+BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", "1000"))
+BULK_MAX_LINE_BYTES = int(os.getenv("BULK_MAX_LINE_BYTES", str(64 * 1024)))
+# Errors beyond this are still counted, just not listed in the response
+BULK_MAX_REPORTED_ERRORS = int(os.getenv("BULK_MAX_REPORTED_ERRORS", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+bulk_rows = counter("news_bulk_rows_total", "NDJSON import lines by outcome", labels=("result",))
+export_rows = counter("news_export_rows_total", "News rows streamed by the NDJSON export")
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = BULK_MAX_LINE_BYTES) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split a byte stream into lines without buffering the whole body. An
+    over-long line is skipped up to its newline and yielded as None, so
+    line numbers stay aligned.
+    """
+    buffer = b""
+    skipping = False
+    async for chunk in chunks:
+        # Split once per chunk; slicing the buffer per line would be quadratic
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if skipping:
+                skipping = False
+                continue
+            yield None if len(line) > max_line_bytes else line
+        if not skipping and len(buffer) > max_line_bytes:
+            # Drop the partial line now instead of growing the buffer
+            yield None
+            buffer = b""
+            skipping = True
+        elif skipping:
+            buffer = b""
+    if buffer and not skipping:
+        yield None if len(buffer) > max_line_bytes else buffer
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" if item["loc"] else item["msg"]
+        for item in error.errors()
+    )
+
+async def _flush(db: AsyncSession, batch: List[Dict]) -> None:
+    # Core insert on the session's connection: a single executemany, no ORM bookkeeping
+    connection = await db.connection()
+    await connection.execute(insert(News.__table__), batch)
+    await db.commit()
+
+async def import_news_ndjson(
+    db: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    creator: str,
+    batch_size: int = BULK_INSERT_BATCH_SIZE,
+) -> Dict:
+    """
+    Validate NDJSON lines as NewsCreate and insert them in batches. Each
+    batch is its own transaction, so the write lock is released between
+    batches and earlier batches stay committed if a later one fails.
+    Near-duplicates of existing news, or of earlier lines, are warned
+    about or rejected like single creates.
+    """
+    inserted = 0
+    failed = 0
+    errors: List[Dict] = []
+    warnings: List[Dict] = []
+    batch: List[Dict] = []
+    batch_lines: List[int] = []
+    # Fingerprints of the lines in `batch`, by line number
+    batch_fingerprints = FingerprintIndex(bucket_bits=batch_size.bit_length())
+    # Whether rows were inserted since the duplicate index last caught up
+    stale = True
+
+    def reject(line_number: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        bulk_rows.inc(result="rejected")
+        if len(errors) < BULK_MAX_REPORTED_ERRORS:
+            errors.append({"line": line_number, "error": message})
+
+    async def flush() -> None:
+        nonlocal inserted, stale
+        try:
+            await _flush(db, batch)
+        except Exception as e:
+            await db.rollback()
+            for line_number in batch_lines:
+                reject(line_number, f"Batch insert failed: {type(e).__name__}")
+        else:
+            inserted += len(batch)
+            bulk_rows.inc(len(batch), result="inserted")
+            stale = True
+        batch.clear()
+        batch_lines.clear()
+        batch_fingerprints.clear()
+
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if line is None:
+            reject(line_number, f"Line exceeds {BULK_MAX_LINE_BYTES} bytes")
+            continue
+        if not line.strip():
+            continue
+        try:
+            item = NewsCreate.model_validate_json(line)
+        except ValidationError as e:
+            reject(line_number, _describe(e))
+            continue
+        fingerprint = description_fingerprint(item.description)
+        if news_duplicates.enabled and fingerprint is not None:
+            if batch_fingerprints.matches(fingerprint, limit=1):
+                # The earlier line has no id yet; insert it so the match can name it
+                await flush()
+            if stale:
+                await news_duplicates.catch_up(db)
+                stale = False
+            duplicates = news_duplicates.find(fingerprint)
+            if duplicates and news_duplicates.rejects:
+                reject(line_number, f"Near-duplicate of news {', '.join(map(str, duplicates))}")
+                continue
+            if duplicates and len(warnings) < BULK_MAX_REPORTED_ERRORS:
+                warnings.append({"line": line_number, "duplicates": duplicates})
+            batch_fingerprints.add(line_number, fingerprint)
+        batch.append({
+            **item.model_dump(),
+            "creator": creator,
+            "summary": make_summary(item.description),
+            "fingerprint": fingerprint,
+        })
+        batch_lines.append(line_number)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    return {"inserted": inserted, "failed": failed, "errors": errors, "warnings": warnings}
+
+async def export_news_ndjson(batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """
+    Stream every news row as NDJSON in id order. Rows come from a
+    server-side cursor a partition at a time; the session is owned by the
+    generator because it must outlive the request handler.
+    """
+    stmt = select(*NEWS_COLUMNS).order_by(News.id).execution_options(yield_per=batch_size)
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield render_news_ndjson(rows)
+            export_rows.inc(len(rows))
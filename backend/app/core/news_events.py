@@ -0,0 +1,192 @@
+"""
+In-process fan-out of news changes to /api/news/stream subscribers.
+
+Every write publishes one event, and a bulk import a single "reset"; the
+hub encodes it once and hands the same object to each subscriber's
+bounded queue, so a broadcast costs one list append per subscriber and
+an idle subscriber holds no buffered data. A subscriber that falls behind loses its oldest events and is sent
+a "reset" telling it to refetch. A single hub task sends heartbeats to
+idle subscribers instead of each connection running its own timer.
+
+The hub is per process: with several workers, a client only hears about
+writes handled by the worker it is connected to.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import List, Optional, Set
+from app.core.metrics import counter, gauge
+
+NEWS_STREAM_QUEUE_SIZE = int(os.getenv("NEWS_STREAM_QUEUE_SIZE", "64"))
+NEWS_STREAM_REPLAY_SIZE = int(os.getenv("NEWS_STREAM_REPLAY_SIZE", "256"))
+NEWS_STREAM_HEARTBEAT_SECONDS = float(os.getenv("NEWS_STREAM_HEARTBEAT_SECONDS", "15"))
+NEWS_STREAM_MAX_SUBSCRIBERS = int(os.getenv("NEWS_STREAM_MAX_SUBSCRIBERS", "20000"))
+# Reconnect delay suggested to EventSource clients
+NEWS_STREAM_RETRY_MS = int(os.getenv("NEWS_STREAM_RETRY_MS", "3000"))
+
+stream_events = counter("news_stream_events_total", "News change events published to stream subscribers", labels=("type",))
+stream_dropped = counter("news_stream_dropped_total", "Events dropped from slow subscribers' queues")
+
+class NewsEvent:
+    """One change; its wire encodings are built on first use and shared by all subscribers"""
+    __slots__ = ("id", "type", "data", "_sse", "_ws")
+
+    def __init__(self, event_id: Optional[int], event_type: str, data: bytes):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self._sse: Optional[bytes] = None
+        self._ws: Optional[str] = None
+
+    def sse(self) -> bytes:
+        if self._sse is None:
+            id_line = b"" if self.id is None else b"id: %d\n" % self.id
+            self._sse = id_line + b"event: " + self.type.encode() + b"\ndata: " + self.data + b"\n\n"
+        return self._sse
+
+    def ws(self) -> str:
+        if self._ws is None:
+            event_id = "null" if self.id is None else str(self.id)
+            self._ws = f'{{"id":{event_id},"event":"{self.type}","data":{self.data.decode()}}}'
+        return self._ws
+
+HEARTBEAT = NewsEvent(None, "ping", b"{}")
+# SSE comments keep proxies from timing the connection out without waking the client
+HEARTBEAT._sse = b": ping\n\n"
+
+class Subscriber:
+    # Idle subscribers are the common case, so they hold no queue, only the
+    # future they wait on; a deque plus an asyncio.Event costs ~1.6 KB each
+    __slots__ = ("_queue", "_queue_size", "_waiter", "lagged", "closed")
+
+    def __init__(self, queue_size: int):
+        self._queue: Optional[List[NewsEvent]] = None
+        self._queue_size = queue_size
+        self._waiter: Optional["asyncio.Future"] = None
+        self.lagged = False
+        self.closed = False
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def push(self, event: NewsEvent) -> None:
+        if self._queue is None:
+            self._queue = [event]
+        else:
+            if len(self._queue) >= self._queue_size:
+                # Drop the oldest; the client gets a reset instead of a gap
+                del self._queue[0]
+                self.lagged = True
+                stream_dropped.inc()
+            self._queue.append(event)
+        self._wake()
+
+    @property
+    def idle(self) -> bool:
+        return not self._queue
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake()
+
+    async def next_batch(self) -> Optional[List[NewsEvent]]:
+        """Everything queued since the last call; None once closed"""
+        while not self._queue:
+            if self.closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        batch, self._queue = self._queue, None
+        return batch
+
+class NewsEventHub:
+    def __init__(
+        self,
+        queue_size: int = NEWS_STREAM_QUEUE_SIZE,
+        replay_size: int = NEWS_STREAM_REPLAY_SIZE,
+        heartbeat_seconds: float = NEWS_STREAM_HEARTBEAT_SECONDS,
+        max_subscribers: int = NEWS_STREAM_MAX_SUBSCRIBERS,
+    ):
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+        self._subscribers: Set[Subscriber] = set()
+        self._replay: "deque[NewsEvent]" = deque(maxlen=replay_size)
+        # Ids continue from the boot time in microseconds, so ids from before a
+        # restart are always older than the ring and resolve to a reset.
+        # Stays below 2**53, the largest integer JavaScript holds exactly.
+        self._last_id = time.time_ns() // 1000
+        self._heartbeat: Optional["asyncio.Task"] = None
+        self.subscriber_count = gauge("news_stream_subscribers", "Open /api/news/stream connections", function=lambda: len(self._subscribers))
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def publish(self, event_type: str, data: bytes) -> NewsEvent:
+        """Queue a change for every subscriber; call from the event loop"""
+        self._last_id += 1
+        event = NewsEvent(self._last_id, event_type, data)
+        self._replay.append(event)
+        for subscriber in self._subscribers:
+            subscriber.push(event)
+        stream_events.inc(event_type=event_type)
+        return event
+
+    def reset_event(self) -> NewsEvent:
+        # Carries the newest id so the client resumes from here after refetching
+        return NewsEvent(self._last_id, "reset", b"{}")
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        if last_event_id is not None and last_event_id != self._last_id:
+            oldest = self._replay[0].id if self._replay else self._last_id + 1
+            if oldest <= last_event_id + 1 and last_event_id < self._last_id:
+                for event in self._replay:
+                    if event.id > last_event_id:
+                        subscriber.push(event)
+            else:
+                # Too old for the ring, or from another process: the client must refetch
+                subscriber.push(self.reset_event())
+        self._subscribers.add(subscriber)
+        if self._heartbeat is None and self.heartbeat_seconds > 0:
+            self._heartbeat = asyncio.ensure_future(self._send_heartbeats())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    async def events(self, subscriber: Subscriber):
+        """Batches for one subscriber until it is closed; a dropped backlog starts with a reset"""
+        while True:
+            batch = await subscriber.next_batch()
+            if batch is None:
+                return
+            if subscriber.lagged:
+                subscriber.lagged = False
+                batch = [self.reset_event()]
+            yield batch
+
+    async def _send_heartbeats(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for subscriber in self._subscribers:
+                if subscriber.idle:
+                    subscriber.push(HEARTBEAT)
+
+    async def close(self) -> None:
+        """End every open stream so shutdown doesn't wait on them"""
+        for subscriber in self._subscribers:
+            subscriber.close()
+        self._subscribers.clear()
+        heartbeat, self._heartbeat = self._heartbeat, None
+        if heartbeat is not None:
+            heartbeat.cancel()
+
+# Global broadcaster for /api/news/stream
+news_events = NewsEventHub()
@@ -0,0 +1,30 @@
+"""
+JSON rendering for news rows selected as NEWS_COLUMNS tuples. The output
+is byte-for-byte what the News schema's dump_json produces for the same
+data, so the endpoints keep their documented response_model while
+skipping ORM loading and Pydantic validation on the read path.
+"""
+from typing import Iterable, Sequence, Tuple
+import orjson
+from app.schemas.news import News as NewsSchema
+
+NEWS_FIELDS = tuple(NewsSchema.model_fields)
+
+# Pydantic writes UTC offsets as "Z"; naive datetimes are identical either way
+_OPTIONS = orjson.OPT_UTC_Z
+
+def _as_dict(row: Sequence, fields: Tuple[str, ...] = NEWS_FIELDS) -> dict:
+    # zip stops at the shorter side: trailing columns selected only for paging are dropped
+    return dict(zip(fields, row))
+
+def render_news_row(row: Sequence) -> bytes:
+    return orjson.dumps(_as_dict(row), option=_OPTIONS)
+
+def render_news_rows(rows: Iterable[Sequence], fields: Tuple[str, ...] = NEWS_FIELDS) -> bytes:
+    return orjson.dumps([_as_dict(row, fields) for row in rows], option=_OPTIONS)
+
+def render_news_ndjson(rows: Iterable[Sequence]) -> bytes:
+    return b"".join(
+        orjson.dumps(_as_dict(row), option=_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        for row in rows
+    )
@@ -0,0 +1,458 @@
+"""
+Related news for /api/news/{id}/related: cosine similarity of TF-IDF
+vectors over title and description, kept in an in-memory index.
+
+Text is split into Latin words and overlapping pairs of CJK characters
+(there are no spaces to split Chinese on), hashed into
+RELATED_FEATURES columns. A document is stored as its sublinear term
+frequencies divided by its TF-IDF norm; IDF is applied to the query
+side at lookup time, so new documents shift every score without any
+stored row being rewritten. Only each document's norm is fixed when it
+is indexed.
+
+The index is a terms x documents CSR matrix, which makes each row a
+posting list: scoring a batch of queries is one sparse product that only
+reads the rows of the query terms. Rows are capped at their
+RELATED_MAX_POSTINGS highest weights, which bounds that cost whatever
+the collection size. Writes go to a small "recent" segment that is
+merged into the matrix in a background thread once it holds
+RELATED_MERGE_THRESHOLD documents; superseded and deleted columns are
+masked until then. Document frequencies are counted when documents are
+indexed and not decremented on edit or delete; the next start recounts
+them.
+
+The index is built from the database in a background thread at startup
+and is per process, like the other in-memory structures here. Results
+are cached per article and tagged with the index generation, which
+every add, remove and merge advances; a new or edited article can
+change any other article's list, so a cached list is only served while
+the index it came from is current.
+"""
+import asyncio
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from app.database.database import read_engine
+from app.models.news import News
+from app.core.cache import LRUCache
+from app.core.metrics import counter, gauge, histogram
+
+RELATED_FEATURES = int(os.getenv("RELATED_FEATURES", str(2 ** 20)))
+RELATED_TERMS_PER_DOC = int(os.getenv("RELATED_TERMS_PER_DOC", "64"))
+RELATED_QUERY_TERMS = int(os.getenv("RELATED_QUERY_TERMS", "32"))
+RELATED_MAX_POSTINGS = int(os.getenv("RELATED_MAX_POSTINGS", "2000"))
+RELATED_MERGE_THRESHOLD = int(os.getenv("RELATED_MERGE_THRESHOLD", "2000"))
+# Title tokens count this many times over description tokens
+RELATED_TITLE_WEIGHT = int(os.getenv("RELATED_TITLE_WEIGHT", "2"))
+# Results kept per article; requests take a prefix
+RELATED_MAX_RESULTS = int(os.getenv("RELATED_MAX_RESULTS", "20"))
+RELATED_CACHE_SIZE = int(os.getenv("RELATED_CACHE_SIZE", "10000"))
+RELATED_CACHE_TTL_SECONDS = float(os.getenv("RELATED_CACHE_TTL_SECONDS", "300"))
+RELATED_BUILD_BATCH_SIZE = int(os.getenv("RELATED_BUILD_BATCH_SIZE", "5000"))
+RELATED_BUILD_MERGE_SIZE = int(os.getenv("RELATED_BUILD_MERGE_SIZE", "100000"))
+
+related_batches = histogram("related_news_batch_size", "Articles scored together in one related-news lookup", buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+related_seconds = histogram("related_news_lookup_seconds", "Duration of one batched related-news lookup")
+related_merges = counter("related_news_merges_total", "Merges of recent documents into the related-news matrix")
+
+_TAG = re.compile(r"<[^>]*>")
+_CJK = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+# Overlapping pairs inside CJK runs, lone CJK characters, and words of
+# other letters and digits; three C-level scans instead of a Python loop
+_CJK_PAIRS = re.compile(f"(?=([{_CJK}]{{2}}))")
+_CJK_SINGLES = re.compile(f"(?<![{_CJK}])[{_CJK}](?![{_CJK}])")
+_WORDS = re.compile(f"[^\\W_{_CJK}]{{2,}}")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased words, and CJK runs as overlapping character pairs"""
+    if not text:
+        return []
+    text = _TAG.sub(" ", text).lower()
+    return _CJK_PAIRS.findall(text) + _CJK_SINGLES.findall(text) + _WORDS.findall(text)
+
+def _champion_lists(postings: sp.csr_matrix, size: int) -> sp.csr_matrix:
+    """Drop all but the `size` highest weights of every row"""
+    lengths = np.diff(postings.indptr)
+    long_rows = np.flatnonzero(lengths > size)
+    if not len(long_rows):
+        return postings
+    keep = np.ones(postings.nnz, dtype=bool)
+    for row in long_rows:
+        start, end = postings.indptr[row], postings.indptr[row + 1]
+        dropped = np.argpartition(postings.data[start:end], end - start - size)[:end - start - size]
+        keep[start + dropped] = False
+    lengths[long_rows] = size
+    indptr = np.concatenate(([0], np.cumsum(lengths))).astype(postings.indptr.dtype)
+    return sp.csr_matrix((postings.data[keep], postings.indices[keep], indptr), shape=postings.shape)
+
+# One entry per distinct term of each document in a batch, ordered by
+# document then term: (document position, term, value)
+Terms = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+class RelatedNewsIndex:
+    def __init__(
+        self,
+        features: int = RELATED_FEATURES,
+        terms_per_doc: int = RELATED_TERMS_PER_DOC,
+        query_terms: int = RELATED_QUERY_TERMS,
+        max_postings: int = RELATED_MAX_POSTINGS,
+        merge_threshold: int = RELATED_MERGE_THRESHOLD,
+    ):
+        # Hash buckets are taken with a mask
+        assert features & (features - 1) == 0, "RELATED_FEATURES must be a power of two"
+        self.features = features
+        self.terms_per_doc = terms_per_doc
+        self.query_terms = query_terms
+        self.max_postings = max_postings
+        self.merge_threshold = merge_threshold
+        self.df = np.zeros(features, dtype=np.int32)
+        self.documents = 0
+        self._lock = threading.RLock()
+        # Merged part: one column per document, columns in news id order
+        self._postings = sp.csr_matrix((features, 0), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        # Documents indexed since the last merge, news id -> (terms, stored values)
+        self._recent: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._recent_segment: Optional[Tuple[np.ndarray, sp.csr_matrix]] = None
+        self._merging = False
+        # News ids edited or deleted while a merge was running
+        self._touched: Optional[set] = None
+        # Advanced by every change that can alter what similar() returns
+        self.generation = 0
+
+    def terms(self, texts: Sequence[Tuple[Optional[str], Optional[str]]]) -> Terms:
+        """Term counts of (title, description) pairs"""
+        hashes: List[int] = []
+        lengths: List[int] = []
+        for title, description in texts:
+            tokens = tokenize(title) * RELATED_TITLE_WEIGHT + tokenize(description)
+            # hash() is salted per process, which is fine: the index never leaves it
+            hashes.extend(map(hash, tokens))
+            lengths.append(len(tokens))
+        keys = np.repeat(np.arange(len(texts), dtype=np.int64), lengths) * self.features
+        keys += np.array(hashes, dtype=np.int64) & (self.features - 1)
+        keys, counts = np.unique(keys, return_counts=True)
+        return keys // self.features, keys % self.features, counts
+
+    def _weigh(self, terms: Terms, limit: int, min_df: int = 0) -> Tuple[Terms, np.ndarray]:
+        """
+        TF-IDF weights over each document's full norm, for its `limit`
+        strongest terms with at least `min_df` documents; returns them with
+        their idf
+        """
+        docs, term_ids, counts = terms
+        idf = np.log((1.0 + self.documents) / (1.0 + self.df[term_ids])) + 1.0
+        weights = (1.0 + np.log(counts)) * idf
+        norms = np.sqrt(np.bincount(docs, weights * weights))
+        weights /= norms[docs]
+        # Strongest first within each document, then a rank cut
+        order = np.lexsort((-weights, docs))
+        if min_df:
+            order = order[self.df[term_ids[order]] >= min_df]
+        ordered_docs = docs[order]
+        rank = np.arange(len(order)) - np.searchsorted(ordered_docs, ordered_docs)
+        selected = np.sort(order[rank < limit])
+        return (docs[selected], term_ids[selected], weights[selected]), idf[selected]
+
+    def _stored(self, terms: Terms) -> Terms:
+        # Stored without IDF: the query side applies it at lookup time
+        (docs, term_ids, weights), idf = self._weigh(terms, self.terms_per_doc)
+        return docs, term_ids.astype(np.int32), (weights / idf).astype(np.float32)
+
+    def _segment(self, stored: Terms, size: int) -> sp.csr_matrix:
+        docs, term_ids, values = stored
+        return sp.csr_matrix((values, (term_ids, docs)), shape=(self.features, size), dtype=np.float32)
+
+    def _main_column(self, news_id: int) -> Optional[int]:
+        column = int(np.searchsorted(self._ids, news_id))
+        if column < len(self._ids) and self._ids[column] == news_id and self._alive[column]:
+            return column
+        return None
+
+    def __contains__(self, news_id: int) -> bool:
+        with self._lock:
+            return news_id in self._recent or self._main_column(news_id) is not None
+
+    def add(self, news_id: int, title: Optional[str], description: Optional[str]) -> None:
+        """Index a new document, or replace an edited one"""
+        terms = self.terms([(title, description)])
+        with self._lock:
+            if not self._discard(news_id):
+                self.documents += 1
+            self.df[terms[1]] += 1
+            _, term_ids, values = self._stored(terms)
+            self._recent[news_id] = (term_ids, values)
+            self._recent_segment = None
+            self.generation += 1
+
+    def remove(self, news_id: int) -> None:
+        with self._lock:
+            if self._discard(news_id):
+                self.documents -= 1
+                self._recent_segment = None
+                self.generation += 1
+
+    def _discard(self, news_id: int) -> bool:
+        if self._touched is not None:
+            self._touched.add(news_id)
+        if self._recent.pop(news_id, None) is not None:
+            return True
+        column = self._main_column(news_id)
+        if column is None:
+            return False
+        self._alive[column] = False
+        return True
+
+    @property
+    def needs_merge(self) -> bool:
+        return len(self._recent) >= self.merge_threshold and not self._merging
+
+    def _recent_postings(self) -> Tuple[np.ndarray, sp.csr_matrix]:
+        if self._recent_segment is None:
+            ids = np.fromiter(self._recent, dtype=np.int64, count=len(self._recent))
+            docs = [terms for terms, _ in self._recent.values()]
+            stored = (
+                np.repeat(np.arange(len(docs)), [len(terms) for terms in docs]),
+                np.concatenate(docs) if docs else np.zeros(0, dtype=np.int32),
+                np.concatenate([values for _, values in self._recent.values()]) if docs else np.zeros(0, dtype=np.float32),
+            )
+            self._recent_segment = (ids, self._segment(stored, len(ids)))
+        return self._recent_segment
+
+    def count(self, rows: Sequence[Tuple[int, Optional[str], Optional[str]]]) -> None:
+        """Add rows to the document frequencies only, ahead of segment(..., counted=True)"""
+        term_ids = self.terms([(title, description) for _, title, description in rows])[1]
+        with self._lock:
+            self.df += np.bincount(term_ids, minlength=self.features).astype(np.int32)
+            self.documents += len(rows)
+            self.generation += 1
+
+    def segment(self, rows: Sequence[Tuple[int, Optional[str], Optional[str]]], counted: bool = False) -> Tuple[np.ndarray, sp.csr_matrix]:
+        """(ids, postings) for many rows, to be passed to merge; skips ids already indexed"""
+        with self._lock:
+            rows = [row for row in rows if row[0] not in self]
+        terms = self.terms([(title, description) for _, title, description in rows])
+        with self._lock:
+            if not counted:
+                self.df += np.bincount(terms[1], minlength=self.features).astype(np.int32)
+                self.documents += len(rows)
+                self.generation += 1
+            stored = self._stored(terms)
+        return np.array([row[0] for row in rows], dtype=np.int64), self._segment(stored, len(rows))
+
+    def merge(self, segments: Sequence[Tuple[np.ndarray, sp.csr_matrix]] = ()) -> None:
+        """Fold the recent documents and any built segments into the matrix; runs off the request path"""
+        with self._lock:
+            if self._merging:
+                return
+            self._merging = True
+            self._touched = set()
+            postings, ids, alive = self._postings, self._ids, self._alive.copy()
+            recent_ids, recent = self._recent_postings()
+            merged_recent = dict(self._recent)
+        try:
+            keep = np.flatnonzero(alive)
+            merged_ids = np.concatenate([ids[keep], recent_ids] + [segment_ids for segment_ids, _ in segments])
+            merged = sp.hstack([postings[:, keep], recent] + [matrix for _, matrix in segments], format="csr")
+            order = np.argsort(merged_ids, kind="stable")
+            merged = _champion_lists(merged[:, order], self.max_postings)
+            merged_ids = merged_ids[order]
+            with self._lock:
+                self._postings, self._ids = merged, merged_ids
+                self._alive = np.ones(len(merged_ids), dtype=bool)
+                for news_id, doc in merged_recent.items():
+                    # Entries replaced during the merge stay recent
+                    if self._recent.get(news_id) is doc:
+                        del self._recent[news_id]
+                # Edited or deleted during the merge: the merged column is the old version
+                for news_id in self._touched:
+                    column = int(np.searchsorted(merged_ids, news_id))
+                    if column < len(merged_ids) and merged_ids[column] == news_id:
+                        self._alive[column] = False
+                self._recent_segment = None
+                # Pruned posting lists change scores, not only where documents live
+                self.generation += 1
+            related_merges.inc()
+        finally:
+            with self._lock:
+                self._merging = False
+                self._touched = None
+
+    def similar(self, queries: Sequence[Tuple[int, Optional[str], Optional[str]]], limit: int) -> Dict[int, List[int]]:
+        """Most similar news ids for each (news id, title, description), best first"""
+        terms = self.terms([(title, description) for _, title, description in queries])
+        with self._lock:
+            # Terms no other document has can't produce a match
+            (docs, term_ids, weights), idf = self._weigh(terms, self.query_terms, min_df=2)
+            query = sp.csr_matrix(
+                ((weights * idf).astype(np.float32), (docs, term_ids)),
+                shape=(len(queries), self.features),
+            )
+            recent_ids, recent = self._recent_postings()
+            parts = [
+                (query @ self._postings, self._ids, self._alive),
+                (query @ recent, recent_ids, None),
+            ]
+        results = {}
+        for row, (news_id, _, _) in enumerate(queries):
+            found_ids, found_scores = zip(*(_best(scores, row, ids, alive, news_id, limit) for scores, ids, alive in parts))
+            found_ids, found_scores = np.concatenate(found_ids), np.concatenate(found_scores)
+            results[news_id] = found_ids[np.argsort(-found_scores, kind="stable")][:limit].tolist()
+        return results
+
+def _best(scores: sp.csr_matrix, row: int, ids: np.ndarray, alive: Optional[np.ndarray], exclude: int, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Up to `limit` best (news ids, scores) of one result row, skipping dead columns and `exclude`"""
+    start, end = scores.indptr[row], scores.indptr[row + 1]
+    found, values = scores.indices[start:end], scores.data[start:end]
+    # Dead columns are rare, so only the head of the candidates is checked
+    wanted = limit + 1
+    while True:
+        head = np.argpartition(values, -wanted)[-wanted:] if len(found) > wanted else np.arange(len(found))
+        columns = found[head]
+        keep = ids[columns] != exclude
+        if alive is not None:
+            keep &= alive[columns]
+        if keep.sum() >= limit or len(head) == len(found):
+            return ids[columns[keep]], values[head[keep]]
+        wanted *= 4
+
+class RelatedNews:
+    """The index plus per-article result caching and request batching"""
+
+    def __init__(self, bind: Engine = read_engine, index: Optional[RelatedNewsIndex] = None):
+        self.bind = bind
+        self.index = index or RelatedNewsIndex()
+        self.ready = False
+        # news id -> (index generation, related ids)
+        self._cache = LRUCache(max_entries=RELATED_CACHE_SIZE, ttl=RELATED_CACHE_TTL_SECONDS)
+        self._queued: Dict[int, Tuple["asyncio.Future", Optional[str], Optional[str]]] = {}
+        self._drainer: Optional["asyncio.Task"] = None
+        self._scanned_id = 0
+        self._scan_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.document_gauge = gauge("related_news_documents", "Documents in the related-news index", function=lambda: self.index.documents)
+
+    def start(self) -> None:
+        """Build the index from the database in the background"""
+        self._stopping.clear()
+        threading.Thread(target=self._build, name="related-news-build", daemon=True).start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _build(self) -> None:
+        started = time.perf_counter()
+        try:
+            self.catch_up()
+        except Exception as e:
+            print(f"❌ Related news index build failed: {e}")
+            return
+        self.ready = True
+        print(f"🔗 Related news index: {self.index.documents} articles in {time.perf_counter() - started:.1f}s")
+
+    def _scan(self, after: int):
+        table = News.__table__
+        while not self._stopping.is_set():
+            with self.bind.connect() as conn:
+                rows = conn.execute(
+                    select(table.c.id, table.c.title, table.c.description)
+                    .where(table.c.id > after)
+                    .order_by(table.c.id)
+                    .limit(RELATED_BUILD_BATCH_SIZE)
+                ).all()
+            if not rows:
+                return
+            yield rows
+            after = rows[-1].id
+
+    def catch_up(self) -> int:
+        """Index rows past the highest id scanned so far, e.g. after a bulk import"""
+        indexed = 0
+        with self._scan_lock:
+            counted_until = self._scanned_id
+            if self._scanned_id == 0:
+                # Seed document frequencies from a prefix, so the first rows
+                # aren't weighed against an almost empty collection; IDF is a
+                # ratio, which a sample of this size estimates well
+                for rows in self._scan(0):
+                    self.index.count(rows)
+                    counted_until = rows[-1].id
+                    if self.index.documents >= RELATED_BUILD_MERGE_SIZE:
+                        break
+            segments = []
+            for rows in self._scan(self._scanned_id):
+                segments.append(self.index.segment(rows, counted=rows[-1].id <= counted_until))
+                self._scanned_id = rows[-1].id
+                indexed += len(rows)
+                # Merging as we go keeps the unpruned segments from piling up
+                if len(segments) * RELATED_BUILD_BATCH_SIZE >= RELATED_BUILD_MERGE_SIZE:
+                    self.index.merge(segments)
+                    segments = []
+            self.index.merge(segments)
+        return indexed
+
+    def catch_up_later(self) -> None:
+        threading.Thread(target=self.catch_up, name="related-news-catch-up", daemon=True).start()
+
+    def _changed(self) -> None:
+        # Cached lists of every article went stale with the generation; no need to pop them
+        if self.index.needs_merge:
+            threading.Thread(target=self.index.merge, name="related-news-merge", daemon=True).start()
+
+    def add(self, news_id: int, title: Optional[str], description: Optional[str]) -> None:
+        self.index.add(news_id, title, description)
+        self._changed()
+
+    def remove(self, news_id: int) -> None:
+        self.index.remove(news_id)
+        self._changed()
+
+    def cached(self, news_id: int) -> Optional[List[int]]:
+        """Related ids from the cache, if the index hasn't changed since they were found"""
+        entry = self._cache.get(news_id)
+        if entry is None or entry[0] != self.index.generation:
+            return None
+        return entry[1]
+
+    async def related(self, news_id: int, title: Optional[str], description: Optional[str]) -> List[int]:
+        """Up to RELATED_MAX_RESULTS similar news ids; concurrent misses share one lookup"""
+        cached = self.cached(news_id)
+        if cached is not None:
+            return cached
+        queued = self._queued.get(news_id)
+        if queued is None:
+            queued = self._queued[news_id] = (asyncio.get_running_loop().create_future(), title, description)
+            if self._drainer is None or self._drainer.done():
+                self._drainer = asyncio.ensure_future(self._drain())
+        return await asyncio.shield(queued[0])
+
+    async def _drain(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Requests that arrive while a batch is scored form the next batch
+        while self._queued:
+            batch, self._queued = self._queued, {}
+            queries = [(news_id, title, description) for news_id, (_, title, description) in batch.items()]
+            started = time.perf_counter()
+            # Taken first: a write during scoring leaves these results already stale
+            generation = self.index.generation
+            try:
+                results = await loop.run_in_executor(None, self.index.similar, queries, RELATED_MAX_RESULTS)
+            except Exception as e:
+                for future, _, _ in batch.values():
+                    future.set_exception(e)
+                continue
+            related_seconds.observe(time.perf_counter() - started)
+            related_batches.observe(len(queries))
+            for news_id, (future, _, _) in batch.items():
+                self._cache.set(news_id, (generation, results[news_id]))
+                future.set_result(results[news_id])
+
+# Global related-news index, built at startup
+related_news = RelatedNews()
@@ -0,0 +1,71 @@
+"""
+Stored plain-text excerpts of news descriptions for list views.
+
+Summaries are computed when news is created or updated. Rows written
+before the column existed are filled in with:
+
+    python -m app.core.news_summary            # rows without a summary
+    python -m app.core.news_summary --all      # recompute, e.g. after changing NEWS_SUMMARY_LENGTH
+"""
+import argparse
+import html
+import os
+import re
+import time
+from typing import Optional
+from sqlalchemy import bindparam, select, update
+from app.database.database import engine, ensure_columns
+from app.models.news import News
+
+NEWS_SUMMARY_LENGTH = int(os.getenv("NEWS_SUMMARY_LENGTH", "160"))
+SUMMARY_BACKFILL_BATCH_SIZE = int(os.getenv("SUMMARY_BACKFILL_BATCH_SIZE", "1000"))
+
+_TAG = re.compile(r"<[^>]*>")
+_WHITESPACE = re.compile(r"\s+")
+
+def make_summary(description: Optional[str], length: int = NEWS_SUMMARY_LENGTH) -> str:
+    """Description without markup, collapsed to one line and cut to `length` characters"""
+    if not description:
+        return ""
+    text = _WHITESPACE.sub(" ", html.unescape(_TAG.sub(" ", description))).strip()
+    if len(text) <= length:
+        return text
+    cut = text[:length - 1]
+    # Prefer a word boundary for spaced scripts; CJK text has none and is cut as is
+    space = cut.rfind(" ")
+    if space >= length * 3 // 4:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+def backfill_summaries(bind=engine, batch_size: int = SUMMARY_BACKFILL_BATCH_SIZE, recompute: bool = False) -> int:
+    """Fill in missing (or, with recompute, all) summaries in id order; returns rows updated"""
+    table = News.__table__
+    stmt = update(table).where(table.c.id == bindparam("row_id")).values(summary=bindparam("new_summary"))
+    updated = 0
+    last_id = 0
+    while True:
+        query = select(table.c.id, table.c.description).where(table.c.id > last_id)
+        if not recompute:
+            query = query.where(table.c.summary.is_(None))
+        # One short transaction per batch so the app's writers aren't locked out
+        with bind.begin() as conn:
+            rows = conn.execute(query.order_by(table.c.id).limit(batch_size)).all()
+            if not rows:
+                return updated
+            conn.execute(stmt, [{"row_id": row.id, "new_summary": make_summary(row.description)} for row in rows])
+        updated += len(rows)
+        last_id = rows[-1].id
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill news.summary")
+    parser.add_argument("--all", action="store_true", help="recompute every summary, not just missing ones")
+    parser.add_argument("--batch-size", type=int, default=SUMMARY_BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    ensure_columns()
+    started = time.perf_counter()
+    count = backfill_summaries(batch_size=args.batch_size, recompute=args.all)
+    print(f"📝 Updated {count} news summaries in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Write-behind view counting and the trending ranking behind
+/api/news/trending.
+
+Reading a news item only bumps an in-memory counter. A background thread
+writes the accumulated counts to news_stats in one short transaction
+every VIEW_FLUSH_INTERVAL_SECONDS, or sooner once VIEW_FLUSH_THRESHOLD
+views are waiting, so reads never queue on SQLite's single writer.
+Shutdown flushes whatever is left; counts from a failed flush are put
+back and retried with the next one.
+
+The trending score decays exponentially with TRENDING_HALF_LIFE_HOURS.
+It is stored as log(sum of 2^((t - epoch) / half-life)) over all views,
+a value that only ever grows, so adding views never requires touching
+other rows and ordering by the stored value is ordering by the decayed
+score at any moment. Views in one flush count as seen at flush time.
+
+The top TRENDING_SIZE items are kept in memory, updated with each flush
+and reloaded from the head of ix_news_stats_trending_score every
+TRENDING_RELOAD_SECONDS to pick up other workers' flushes.
+"""
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.engine import Engine
+from app.database.database import engine
+from app.models.news import News
+from app.models.news_stats import NewsStats
+from app.core.metrics import counter, gauge, histogram
+
+VIEW_FLUSH_INTERVAL_SECONDS = float(os.getenv("VIEW_FLUSH_INTERVAL_SECONDS", "5"))
+VIEW_FLUSH_THRESHOLD = int(os.getenv("VIEW_FLUSH_THRESHOLD", "1000"))
+TRENDING_SIZE = int(os.getenv("TRENDING_SIZE", "100"))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "12"))
+TRENDING_RELOAD_SECONDS = float(os.getenv("TRENDING_RELOAD_SECONDS", "60"))
+
+# Keeps IN lists under SQLite's older 999-variable limit
+_CHUNK_SIZE = 500
+
+views_written = counter("news_views_written_total", "News item views written to news_stats")
+view_flushes = histogram("news_view_flush_seconds", "Duration of one batched write of view counts")
+view_flush_failures = counter("news_view_flush_failures_total", "View count flushes that failed and were retried later")
+
+def _logaddexp(a: float, b: float) -> float:
+    high, low = (a, b) if a >= b else (b, a)
+    return high + math.log1p(math.exp(low - high))
+
+class TrendingTopK:
+    """
+    Highest trending scores seen by this process. Scores only grow, so an
+    item that falls out of the top K can only come back by being viewed,
+    and it is offered again when its views are flushed.
+    """
+
+    def __init__(self, size: int = TRENDING_SIZE):
+        self.size = size
+        self._scores: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        # (version, ids best first); replaced as a whole so readers need no lock
+        self._snapshot: Tuple[int, Tuple[int, ...]] = (0, ())
+
+    def snapshot(self) -> Tuple[int, Tuple[int, ...]]:
+        """(version, news ids best first); the version changes whenever the order does"""
+        return self._snapshot
+
+    def offer(self, scores: Dict[int, float]) -> None:
+        with self._lock:
+            self._scores.update(scores)
+            self._publish()
+
+    def replace(self, scores: Dict[int, float]) -> None:
+        with self._lock:
+            self._scores = dict(scores)
+            self._publish()
+
+    def discard(self, news_id: int) -> None:
+        with self._lock:
+            if self._scores.pop(news_id, None) is not None:
+                self._publish()
+
+    def _publish(self) -> None:
+        ranked = sorted(self._scores, key=self._scores.__getitem__, reverse=True)[:self.size]
+        self._scores = {news_id: self._scores[news_id] for news_id in ranked}
+        version, current = self._snapshot
+        if tuple(ranked) != current:
+            self._snapshot = (version + 1, tuple(ranked))
+
+class NewsViewCounter:
+    def __init__(
+        self,
+        bind: Engine = engine,
+        interval: float = VIEW_FLUSH_INTERVAL_SECONDS,
+        threshold: int = VIEW_FLUSH_THRESHOLD,
+        trending_size: int = TRENDING_SIZE,
+        half_life_hours: float = TRENDING_HALF_LIFE_HOURS,
+        reload_interval: float = TRENDING_RELOAD_SECONDS,
+    ):
+        self.bind = bind
+        self.interval = interval
+        self.threshold = threshold
+        self.reload_interval = reload_interval
+        # Per second, in natural log units
+        self.decay_rate = math.log(2) / (half_life_hours * 3600)
+        self.trending = TrendingTopK(trending_size)
+        self._pending: Dict[int, int] = {}
+        self._pending_views = 0
+        self._lock = threading.Lock()
+        # Only one flush at a time: the thread's, or the final one at shutdown
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reloaded_at = 0.0
+        self.pending_gauge = gauge("news_views_pending", "Views counted in memory, not yet written", function=lambda: self._pending_views)
+
+    def record(self, news_id: int) -> None:
+        """Count one view; cheap enough to call on every read"""
+        with self._lock:
+            self._pending[news_id] = self._pending.get(news_id, 0) + 1
+            self._pending_views += 1
+            # Wake the flusher once, as the batch fills up
+            full = self._pending_views == self.threshold
+        if full:
+            self._wake.set()
+
+    def forget(self, news_id: int) -> None:
+        """Drop a deleted item's unwritten views and its trending slot"""
+        with self._lock:
+            self._pending_views -= self._pending.pop(news_id, 0)
+        self.trending.discard(news_id)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"⚠️  Trending news not loaded: {e}")
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="news-view-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        if self._thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+        # Requests have drained by now; write what they counted
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"❌ Final view count flush failed, {self._pending_views} views lost: {e}")
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() - self._reloaded_at >= self.reload_interval:
+                    self.reload()
+            except Exception as e:
+                view_flush_failures.inc()
+                print(f"❌ View count flush failed: {e}")
+
+    def reload(self) -> None:
+        """Rebuild the top K from the trending score index"""
+        stats = NewsStats.__table__
+        with self.bind.connect() as conn:
+            rows = conn.execute(
+                select(stats.c.news_id, stats.c.trending_score)
+                .order_by(stats.c.trending_score.desc())
+                .limit(self.trending.size)
+            ).all()
+        self.trending.replace(dict(rows))
+        self._reloaded_at = time.monotonic()
+
+    def flush(self) -> int:
+        """Write pending views; returns the number of views written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                views, self._pending_views = self._pending_views, 0
+            if not pending:
+                return 0
+            started = time.perf_counter()
+            try:
+                scores = self._write(pending, time.time())
+            except Exception:
+                # Back into the queue, merged with what arrived meanwhile
+                with self._lock:
+                    for news_id, count in pending.items():
+                        self._pending[news_id] = self._pending.get(news_id, 0) + count
+                    self._pending_views += views
+                raise
+            self.trending.offer(scores)
+            views_written.inc(views)
+            view_flushes.observe(time.perf_counter() - started)
+            return views
+
+    def _write(self, pending: Dict[int, int], now: float) -> Dict[int, float]:
+        stats = NewsStats.__table__
+        news = News.__table__
+        add_views = (
+            update(stats)
+            .where(stats.c.news_id == bindparam("row_id"))
+            .values(view_count=stats.c.view_count + bindparam("views"))
+        )
+        set_score = update(stats).where(stats.c.news_id == bindparam("row_id")).values(trending_score=bindparam("score"))
+        base = self.decay_rate * now
+        scores: Dict[int, float] = {}
+        ids = sorted(pending)
+        with self.bind.begin() as conn:
+            for start in range(0, len(ids), _CHUNK_SIZE):
+                chunk = ids[start:start + _CHUNK_SIZE]
+                # The additive UPDATE goes first: from here on this transaction
+                # holds the write lock, so the scores read next can't go stale
+                conn.execute(add_views, [{"row_id": news_id, "views": pending[news_id]} for news_id in chunk])
+                existing = dict(conn.execute(
+                    select(stats.c.news_id, stats.c.trending_score).where(stats.c.news_id.in_(chunk))
+                ).all())
+                updates: List[dict] = []
+                for news_id, score in existing.items():
+                    scores[news_id] = _logaddexp(score, base + math.log(pending[news_id]))
+                    updates.append({"row_id": news_id, "score": scores[news_id]})
+                if updates:
+                    conn.execute(set_score, updates)
+
+                missing = [news_id for news_id in chunk if news_id not in existing]
+                if missing:
+                    # Items deleted since they were read get no row
+                    alive = conn.execute(select(news.c.id).where(news.c.id.in_(missing))).scalars().all()
+                    rows = []
+                    for news_id in alive:
+                        scores[news_id] = base + math.log(pending[news_id])
+                        rows.append({"news_id": news_id, "view_count": pending[news_id], "trending_score": scores[news_id]})
+                    if rows:
+                        conn.execute(insert(stats), rows)
+        return scores
+
+# Global view counter, started with the app
+news_views = NewsViewCounter()
@@ -0,0 +1,109 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from app.core import security
+from app.core.metrics import counter, gauge, histogram
+
+# Worker processes for password hashing; each keeps one core busy while hashing
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests allowed to wait for a worker before we shed load with 503
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "32"))
+
+class PasswordHasherPool:
+    """
+    Runs password hashing/verification in a dedicated process pool so the
+    CPU-bound work never holds the server's GIL or threadpool workers.
+    """
+
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_queue: int = PASSWORD_POOL_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.queue_depth = gauge(
+            "password_pool_queue_depth",
+            "Password hash jobs waiting for a worker process",
+            function=lambda: max(self._pending - self.workers, 0),
+        )
+        self.in_flight = gauge(
+            "password_pool_in_flight",
+            "Password hash jobs queued or running",
+            function=lambda: self._pending,
+        )
+        self.rejected = counter(
+            "password_pool_rejected_total",
+            "Password hash jobs rejected because the queue was full",
+        )
+        self.latency = histogram(
+            "password_hash_seconds",
+            "Wall time of password hash jobs, including time spent queued",
+            labels=("operation",),
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a threaded server process can copy held locks into the child.
+            # Workers don't inherit module state, so hand them the calibrated policy.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=security.configure_password_hashing,
+                initargs=security.current_password_policy(),
+            )
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected.inc()
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication service is busy, please retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+            executor = self._get_executor()
+
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, compute_seconds = await loop.run_in_executor(executor, security.timed_call, fn, *args)
+            security.observe_hash_time(operation, compute_seconds)
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+            self.latency.observe(time.perf_counter() - started, operation=operation)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", security.get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run("verify", security.verify_password, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run("verify", security.verify_and_update_password, password, hashed_password)
+
+    def start(self) -> None:
+        """
+        Start the worker processes up front so the first login doesn't pay for it.
+        Call after calibrate_password_hashing() so workers pick up the chosen cost.
+        """
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(os.getpid)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+# Global password hashing pool
+password_pool = PasswordHasherPool()
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+Opt-in per-request profiler (SQL_PROFILER_ENABLED=true). Every SQL
+statement a request issues is counted and timed, the time spent in auth
+and response serialization is measured, and the breakdown goes out as a
+Server-Timing header. Requests slower than SLOW_REQUEST_MS are written
+with their statements and query plans to a rotating log.
+"""
+import asyncio
+import functools
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.database.database import read_engine
+
+SQL_PROFILER_ENABLED = os.getenv("SQL_PROFILER_ENABLED", "false").lower() == "true"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "200"))
+SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH", "./data/slow_queries.log")
+SLOW_QUERY_LOG_MAX_BYTES = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_QUERY_LOG_BACKUPS = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", "5"))
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_statement(statement: str) -> str:
+    # Statements are already parameterized; only layout differs between call sites
+    return _WHITESPACE.sub(" ", statement).strip()
+
+class StatementStats:
+    __slots__ = ("count", "seconds", "parameters", "executemany")
+
+    def __init__(self, parameters, executemany: bool):
+        self.count = 0
+        self.seconds = 0.0
+        # First call's parameters, kept so the plan can be explained later
+        self.parameters = parameters
+        self.executemany = executemany
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.statements: "OrderedDict[str, StatementStats]" = OrderedDict()
+        self.query_count = 0
+        self.spans: Dict[str, float] = {"db": 0.0, "auth": 0.0, "serialization": 0.0}
+        self.endpoint_finished: Optional[float] = None
+
+    def record_statement(self, statement: str, parameters, executemany: bool, seconds: float) -> None:
+        key = normalize_statement(statement)
+        stats = self.statements.get(key)
+        if stats is None:
+            stats = self.statements[key] = StatementStats(parameters, executemany)
+        stats.count += 1
+        stats.seconds += seconds
+        self.query_count += 1
+        self.spans["db"] += seconds
+
+    def server_timing(self, total: float) -> str:
+        parts = [
+            f'db;dur={self.spans["db"] * 1000:.2f};desc="{self.query_count} queries"',
+            f'auth;dur={self.spans["auth"] * 1000:.2f}',
+            f'serialization;dur={self.spans["serialization"] * 1000:.2f}',
+            f"total;dur={total * 1000:.2f}",
+        ]
+        return ", ".join(parts)
+
+@contextmanager
+def profile_span(name: str):
+    """Add the block's duration to the current request's span; no-op when not profiling"""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.spans[name] = profile.spans.get(name, 0.0) + time.perf_counter() - started
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    stack = conn.info.get("profile_started")
+    if profile is None or not stack:
+        return
+    profile.record_statement(statement, parameters, executemany, time.perf_counter() - stack.pop())
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    stack = conn.info.get("profile_started") if conn is not None else None
+    if _current.get() is not None and stack:
+        stack.pop()
+
+def _mark_endpoint_finished(call):
+    # Whatever happens between the endpoint returning and the response
+    # starting is FastAPI validating and serializing the return value
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed_endpoint(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                profile = _current.get()
+                if profile is not None:
+                    profile.endpoint_finished = time.perf_counter()
+        return timed_endpoint
+
+    @functools.wraps(call)
+    def timed_sync_endpoint(*args, **kwargs):
+        try:
+            return call(*args, **kwargs)
+        finally:
+            profile = _current.get()
+            if profile is not None:
+                profile.endpoint_finished = time.perf_counter()
+    return timed_sync_endpoint
+
+class SlowQueryLog:
+    """Writes slow requests to a rotating file; EXPLAIN runs off the request path"""
+
+    def __init__(self, path: str = SLOW_QUERY_LOG_PATH, max_bytes: int = SLOW_QUERY_LOG_MAX_BYTES, backups: int = SLOW_QUERY_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._logger: Optional[logging.Logger] = None
+        self._writer: Optional[ThreadPoolExecutor] = None
+
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            logger = logging.getLogger("music_web.slow_queries")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def submit(self, profile: RequestProfile, status_code: int, total: float) -> None:
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-log")
+        self._writer.submit(self._write, profile, status_code, total)
+
+    def _explain(self, statement: str, stats: StatementStats) -> List[str]:
+        if stats.executemany or not statement.upper().startswith(("SELECT", "WITH")):
+            return []
+        prefix = "EXPLAIN QUERY PLAN " if read_engine.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            with read_engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, stats.parameters).all()
+        except Exception as e:
+            return [f"(explain failed: {type(e).__name__}: {e})"]
+        return [" | ".join(str(value) for value in row) for row in rows]
+
+    def _write(self, profile: RequestProfile, status_code: int, total: float) -> None:
+        lines = [
+            f"{profile.method} {profile.path} {status_code} total={total * 1000:.1f}ms "
+            f"db={profile.spans['db'] * 1000:.1f}ms queries={profile.query_count} "
+            f"distinct={len(profile.statements)}"
+        ]
+        for statement, stats in profile.statements.items():
+            repeated = " REPEATED" if stats.count > 1 else ""
+            lines.append(f"  [{stats.count}x {stats.seconds * 1000:.2f}ms{repeated}] {statement}")
+            for plan in self._explain(statement, stats):
+                lines.append(f"      plan: {plan}")
+        try:
+            self._get_logger().info("\n".join(lines))
+        except Exception as e:
+            print(f"⚠️  Slow query log write failed: {e}")
+
+    def close(self) -> None:
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.shutdown(wait=True)
+
+slow_query_log = SlowQueryLog()
+
+class SQLProfilerMiddleware:
+    """
+    Opens a RequestProfile per HTTP request and adds a Server-Timing header
+    to the response. Only installed when SQL_PROFILER_ENABLED is set.
+    """
+
+    def __init__(self, app: ASGIApp, slow_request_ms: float = SLOW_REQUEST_MS, log: SlowQueryLog = slow_query_log):
+        self.app = app
+        self.slow_request_seconds = slow_request_ms / 1000
+        self.log = log
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current.set(profile)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                status_code = message["status"]
+                if profile.endpoint_finished is not None:
+                    profile.spans["serialization"] += now - profile.endpoint_finished
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing(now - profile.started).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            total = time.perf_counter() - profile.started
+            if total >= self.slow_request_seconds:
+                self.log.submit(profile, status_code, total)
+
+def install_profiler(app: FastAPI) -> None:
+    """Hook SQL events and endpoints, and add the middleware; call before startup"""
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            # run_endpoint_function looks up dependant.call per request
+            route.dependant.call = _mark_endpoint_finished(route.dependant.call)
+    app.add_middleware(SQLProfilerMiddleware)
@@ -0,0 +1,134 @@
+"""
+Rotating refresh tokens. A refresh is one indexed lookup by token hash
+and a couple of small writes; no password hashing is involved.
+
+Each token can be used once. Presenting a token that was already used
+means two parties hold the same family (a stolen token, or a replay), so
+the whole family is deleted and both have to log in again. The exception
+is a token spent only seconds ago: that is usually two browser tabs
+refreshing at once, so the late one is refused without revoking anything
+and picks up the tokens the other tab stored.
+"""
+import hashlib
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.core.metrics import counter
+from app.core.sweeper import sweeper
+
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
+# Used tokens kept per family for reuse detection; older ones are just unknown
+REFRESH_TOKEN_REUSE_WINDOW = int(os.getenv("REFRESH_TOKEN_REUSE_WINDOW", "8"))
+# A token presented again this soon after it was spent is a refresh race, not a theft
+REFRESH_TOKEN_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_TOKEN_REUSE_GRACE_SECONDS", "10"))
+
+refresh_results = counter("refresh_tokens_total", "Refresh token presentations by outcome", labels=("result",))
+refresh_sweep_rows_deleted = counter("refresh_token_sweep_rows_deleted_total", "Expired refresh_tokens rows deleted by the sweeper")
+
+class InvalidRefreshToken(Exception):
+    """Unknown, expired or reused refresh token"""
+
+class RefreshTokenRaced(InvalidRefreshToken):
+    """Token was rotated moments ago by another client of the same session; nothing is revoked"""
+
+def hash_refresh_token(token: str) -> str:
+    # Tokens are 256 random bits, so a fast hash is enough; no salt or stretching needed
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _new_token(username: str, family_id: str, now: datetime) -> Tuple[str, RefreshToken]:
+    token = secrets.token_urlsafe(32)
+    row = RefreshToken(
+        token_hash=hash_refresh_token(token),
+        family_id=family_id,
+        username=username,
+        expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    return token, row
+
+async def issue_refresh_token(db: AsyncSession, username: str) -> str:
+    """Start a new family, at login"""
+    token, row = _new_token(username, secrets.token_hex(16), datetime.utcnow())
+    db.add(row)
+    await db.commit()
+    refresh_results.inc(result="issued")
+    return token
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> Tuple[str, str]:
+    """Spend a refresh token; returns (username, next token in the family)"""
+    now = datetime.utcnow()
+    row = await db.scalar(select(RefreshToken).where(RefreshToken.token_hash == hash_refresh_token(token)))
+    if row is None:
+        refresh_results.inc(result="invalid")
+        raise InvalidRefreshToken("Invalid refresh token")
+    if row.expires_at <= now:
+        refresh_results.inc(result="expired")
+        raise InvalidRefreshToken("Refresh token expired")
+    if await db.scalar(select(User.id).where(User.username == row.username)) is None:
+        # The account was deleted after login; nothing should keep its sessions alive
+        await db.execute(delete(RefreshToken).where(RefreshToken.family_id == row.family_id))
+        await db.commit()
+        refresh_results.inc(result="orphaned")
+        raise InvalidRefreshToken("User no longer exists")
+
+    # Conditional, so two concurrent refreshes with one token can't both succeed
+    claimed = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.id == row.id, RefreshToken.used_at.is_(None))
+        .values(used_at=now)
+    )
+    if claimed.rowcount != 1:
+        used_at = await db.scalar(select(RefreshToken.used_at).where(RefreshToken.id == row.id))
+        if used_at is not None and now - used_at <= timedelta(seconds=REFRESH_TOKEN_REUSE_GRACE_SECONDS):
+            # No new token is handed out here, so the grace gives a thief nothing
+            await db.rollback()
+            refresh_results.inc(result="raced")
+            raise RefreshTokenRaced("Refresh token was just rotated by another client")
+        await db.execute(delete(RefreshToken).where(RefreshToken.family_id == row.family_id))
+        await db.commit()
+        refresh_results.inc(result="reused")
+        raise InvalidRefreshToken("Refresh token reuse detected; please log in again")
+
+    next_token, next_row = _new_token(row.username, row.family_id, now)
+    db.add(next_row)
+    await _prune_family(db, row.family_id)
+    await db.commit()
+    refresh_results.inc(result="rotated")
+    return row.username, next_token
+
+async def _prune_family(db: AsyncSession, family_id: str) -> None:
+    # Keep the newest used tokens (and the live one); older ones only
+    # matter for reuse detection, and a window of them is enough
+    boundary = await db.scalar(
+        select(RefreshToken.id)
+        .where(RefreshToken.family_id == family_id, RefreshToken.used_at.is_not(None))
+        .order_by(RefreshToken.id.desc())
+        .offset(REFRESH_TOKEN_REUSE_WINDOW)
+        .limit(1)
+    )
+    if boundary is not None:
+        await db.execute(
+            delete(RefreshToken).where(RefreshToken.family_id == family_id, RefreshToken.id <= boundary)
+        )
+
+async def revoke_refresh_family(db: AsyncSession, token: str) -> bool:
+    """Log out: drop every token of the presented token's family"""
+    family_id: Optional[str] = await db.scalar(
+        select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_refresh_token(token))
+    )
+    if family_id is None:
+        return False
+    await db.execute(delete(RefreshToken).where(RefreshToken.family_id == family_id))
+    await db.commit()
+    refresh_results.inc(result="revoked")
+    return True
+
+def expired_refresh_tokens():
+    # Used tokens inside a live family are pruned on rotation; this catches abandoned families
+    return RefreshToken.expires_at <= datetime.utcnow()
+
+sweeper.register("refresh_tokens", RefreshToken, expired_refresh_tokens, rows_deleted=refresh_sweep_rows_deleted)
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Hashable, Iterable, Optional, Set
+from fastapi import Request, Response
+from app.core.cache import LRUCache
+
+NEWS_CACHE_MAX_ENTRIES = int(os.getenv("NEWS_CACHE_MAX_ENTRIES", "512"))
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    last_modified: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def to_response(self, request: Request, headers: Optional[dict] = None) -> Response:
+        """
+        Full 200 response, or a bodyless 304 if the client already has this version.
+        `headers` apply to this response only, for routes that share an entry
+        but differ in caching policy.
+        """
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache", **self.headers, **(headers or {})}
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or self.etag in _split_etags(if_none_match)):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+def _split_etags(header: str) -> Set[str]:
+    return {tag.strip() for tag in header.split(",")}
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    """Format a timestamp for Last-Modified; naive values are UTC as stored by SQLite"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized responses.
+    Each entry carries tags so writes can drop exactly the entries they affect.
+    """
+
+    def __init__(self, max_entries: int = NEWS_CACHE_MAX_ENTRIES):
+        self._lock = threading.RLock()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._key_tags: Dict[Hashable, Iterable[str]] = {}
+        self._generation = 0
+        self._entries = LRUCache(max_entries=max_entries, on_evict=self._forget)
+
+    def generation(self) -> int:
+        """Take before reading from the database and pass to store()"""
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def store(
+        self,
+        key: Hashable,
+        body: bytes,
+        generation: int,
+        tags: Iterable[str] = (),
+        last_modified: Optional[datetime] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> CachedResponse:
+        entry = CachedResponse(
+            body=body,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            last_modified=http_date(last_modified),
+            headers=headers or {},
+        )
+        with self._lock:
+            # A write landed while this response was being built; it may be stale
+            if generation != self._generation:
+                return entry
+            tags = tuple(tags)
+            self._entries.pop(key)
+            self._entries.set(key, entry)
+            self._key_tags[key] = tags
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+        return entry
+
+    def invalidate(self, *tags: str) -> int:
+        """Drop every entry carrying any of the given tags; returns how many were dropped"""
+        with self._lock:
+            self._generation += 1
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._entries.pop(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _forget(self, key: Hashable, _entry: CachedResponse) -> None:
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._entries.stats(), "tags": len(self._tags)}
+
+# Global cache for /api/news reads
+news_cache = ResponseCache()
\ No newline at end of file
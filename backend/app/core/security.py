@@ -1,25 +1,126 @@
+import os
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from app.core.metrics import histogram
 
 SECRET_KEY = "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(
-    schemes=["bcrypt"], 
-    deprecated="auto",
-    bcrypt__rounds=10  # 降低到10轮加快处理速度（仍然安全）
+# 密码哈希策略：启动时按本机性能校准成本，使单次哈希接近目标耗时
+PASSWORD_HASH_SCHEME = os.getenv("PASSWORD_HASH_SCHEME", "bcrypt")  # bcrypt | argon2
+PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "100"))
+# Fixed cost (bcrypt rounds / argon2 time_cost); skips calibration when set
+PASSWORD_HASH_COST = os.getenv("PASSWORD_HASH_COST")
+ARGON2_MEMORY_KIB = int(os.getenv("ARGON2_MEMORY_KIB", "19456"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+
+SUPPORTED_SCHEMES = ("bcrypt", "argon2")
+# Never go below what existing hashes were created with
+COST_BOUNDS = {"bcrypt": (10, 16), "argon2": (2, 10)}
+
+pwd_context = CryptContext(schemes=list(SUPPORTED_SCHEMES))
+_password_policy: Tuple[str, int] = ("bcrypt", 10)
+
+password_hash_compute_seconds = histogram(
+    "password_hash_compute_seconds",
+    "CPU time of one password hash or verify, excluding pool queueing",
+    labels=("operation", "scheme"),
 )
 
+def configure_password_hashing(scheme: str, cost: int) -> None:
+    """
+    Hash new passwords with the given scheme/cost. Hashes made with the other
+    scheme or a lower cost still verify but report needs_update().
+    """
+    global _password_policy
+    settings = {
+        "schemes": [scheme] + [other for other in SUPPORTED_SCHEMES if other != scheme],
+        "default": scheme,
+        "deprecated": "auto",
+        f"{scheme}__default_rounds": cost,
+        f"{scheme}__min_rounds": cost,
+    }
+    if scheme == "argon2":
+        settings.update({
+            "argon2__type": "ID",
+            "argon2__memory_cost": ARGON2_MEMORY_KIB,
+            "argon2__parallelism": ARGON2_PARALLELISM,
+        })
+    pwd_context.load(settings)
+    _password_policy = (scheme, cost)
+
+# Uncalibrated default for scripts; the app calibrates at startup
+configure_password_hashing(*_password_policy)
+
+def current_password_policy() -> Tuple[str, int]:
+    return _password_policy
+
+def _time_hash(scheme: str, cost: int, samples: int = 3) -> float:
+    configure_password_hashing(scheme, cost)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        pwd_context.hash("calibration-password")
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+def calibrate_password_hashing(
+    scheme: str = PASSWORD_HASH_SCHEME,
+    target_ms: float = PASSWORD_HASH_TARGET_MS,
+) -> Tuple[str, int]:
+    """Pick the highest cost whose hash time stays within target_ms on this machine"""
+    if scheme not in SUPPORTED_SCHEMES:
+        raise ValueError(f"Unsupported password hash scheme: {scheme}")
+    low, high = COST_BOUNDS[scheme]
+
+    if PASSWORD_HASH_COST:
+        cost = int(PASSWORD_HASH_COST)
+    elif scheme == "bcrypt":
+        # Each bcrypt round doubles the work: time one cheap hash and extrapolate
+        base_ms = _time_hash(scheme, low)
+        cost = low
+        while cost < high and base_ms * 2 ** (cost + 1 - low) <= target_ms:
+            cost += 1
+    else:
+        # argon2 time_cost scales linearly at fixed memory
+        per_pass_ms = _time_hash(scheme, low) / low
+        cost = max(low, min(high, int(target_ms // max(per_pass_ms, 0.001))))
+
+    configure_password_hashing(scheme, cost)
+    print(f"🔐 Password hashing: {scheme} cost={cost} (target {target_ms:.0f} ms)")
+    return scheme, cost
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify, and return a fresh hash under the current policy if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def timed_call(fn: Callable[..., Any], *args) -> Tuple[Any, float]:
+    """
+    Run a hashing function and return (result, seconds). Used as the pool's
+    worker entry point: worker processes have their own metrics registry,
+    so the timing travels back with the result.
+    """
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+def observe_hash_time(operation: str, seconds: float) -> None:
+    password_hash_compute_seconds.observe(seconds, operation=operation, scheme=_password_policy[0])
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -39,7 +140,7 @@ def verify_token(token: str) -> dict:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials"
             )
-        return {"username": username}
+        return {"username": username, "exp": payload.get("exp")}
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+from app.database.database import SessionLocal
+from app.core.metrics import Counter, Histogram
+
+SWEEP_INTERVAL_SECONDS = float(os.getenv("SWEEP_INTERVAL_SECONDS", "600"))
+SWEEP_BATCH_SIZE = int(os.getenv("SWEEP_BATCH_SIZE", "500"))
+
+class SweepJob(NamedTuple):
+    name: str
+    model: type
+    # Called at the start of each pass, so time-based predicates see the current time
+    removable: Callable[[], ColumnElement]
+    rows_scanned: Optional[Counter]
+    rows_deleted: Optional[Counter]
+    seconds: Optional[Histogram]
+
+class Sweeper:
+    """
+    Background thread that deletes stale rows from the tables registered
+    with it. Each table is walked by primary key in small batches, each in
+    its own short transaction, so the SQLite write lock is never held for
+    long.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        interval: float = SWEEP_INTERVAL_SECONDS,
+        batch_size: int = SWEEP_BATCH_SIZE,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self._jobs: Dict[str, SweepJob] = {}
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(
+        self,
+        name: str,
+        model: type,
+        removable: Callable[[], ColumnElement],
+        rows_scanned: Optional[Counter] = None,
+        rows_deleted: Optional[Counter] = None,
+        seconds: Optional[Histogram] = None,
+    ) -> None:
+        """Sweep rows of `model` matching removable() on every pass; `model` needs an integer id"""
+        self._jobs[name] = SweepJob(name, model, removable, rows_scanned, rows_deleted, seconds)
+
+    @property
+    def jobs(self) -> List[str]:
+        return list(self._jobs)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            for name in self.jobs:
+                try:
+                    self.sweep(name)
+                except Exception as e:
+                    # One failing table shouldn't keep the others from being swept
+                    print(f"❌ Sweep of {name} failed: {e}")
+            self._stopping.wait(self.interval)
+
+    def sweep(self, name: str) -> int:
+        """Run one pass over a registered table; returns the number of rows deleted"""
+        job = self._jobs[name]
+        started = time.perf_counter()
+        model = job.model
+        removable = job.removable()
+        deleted = 0
+        last_id = 0
+        while not self._stopping.is_set():
+            db = self.session_factory()
+            try:
+                ids = db.scalars(
+                    select(model.id)
+                    .where(model.id > last_id)
+                    .order_by(model.id)
+                    .limit(self.batch_size)
+                ).all()
+                if not ids:
+                    break
+                last_id = ids[-1]
+                result = db.execute(delete(model).where(model.id.in_(ids), removable))
+                db.commit()
+            finally:
+                db.close()
+            if job.rows_scanned is not None:
+                job.rows_scanned.inc(len(ids))
+            if job.rows_deleted is not None:
+                job.rows_deleted.inc(result.rowcount)
+            deleted += result.rowcount
+            if len(ids) < self.batch_size:
+                break
+        if job.seconds is not None:
+            job.seconds.observe(time.perf_counter() - started)
+        return deleted
+
+# Global sweeper, started with the app; modules register their tables when imported
+sweeper = Sweeper()
@@ -1,16 +1,168 @@
+import asyncio
+import dns.asyncresolver
+import dns.exception
 import dns.resolver
+import os
 import smtplib
 import socket
+import threading
+import time
+from concurrent.futures import Future
 from email_validator import validate_email, EmailNotValidError
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+from app.core.cache import LRUCache
+from app.core.metrics import counter
+
+DNS_CACHE_MAX_ENTRIES = int(os.getenv("DNS_CACHE_MAX_ENTRIES", "4096"))
+# Record TTLs are clamped to this range so a 0-TTL record still gets some reuse
+DNS_CACHE_MIN_TTL = float(os.getenv("DNS_CACHE_MIN_TTL", "30"))
+DNS_CACHE_MAX_TTL = float(os.getenv("DNS_CACHE_MAX_TTL", "3600"))
+# NXDOMAIN / no records of that type
+DNS_CACHE_NEGATIVE_TTL = float(os.getenv("DNS_CACHE_NEGATIVE_TTL", "60"))
+
+# Async validation: one overall budget per address, SMTP probe is opt-in
+EMAIL_VALIDATION_DEADLINE = float(os.getenv("EMAIL_VALIDATION_DEADLINE", "3"))
+EMAIL_SMTP_PROBE_TIMEOUT = float(os.getenv("EMAIL_SMTP_PROBE_TIMEOUT", "2"))
+EMAIL_VALIDATION_CONCURRENCY = int(os.getenv("EMAIL_VALIDATION_CONCURRENCY", "50"))
+# /validate-batch: addresses per user per minute, and addresses one batch may SMTP-probe.
+# A probe opens a port-25 connection to someone else's server, so it costs more quota
+EMAIL_BATCH_ADDRESSES_PER_MINUTE = int(os.getenv("EMAIL_BATCH_ADDRESSES_PER_MINUTE", "1000"))
+EMAIL_BATCH_MAX_SMTP_PROBES = int(os.getenv("EMAIL_BATCH_MAX_SMTP_PROBES", "10"))
+EMAIL_BATCH_SMTP_PROBE_COST = int(os.getenv("EMAIL_BATCH_SMTP_PROBE_COST", "10"))
+
+dns_cache_lookups = counter("dns_cache_lookups_total", "DNS cache lookups by record type and result", labels=("rdtype", "result"))
+
+class DNSCache:
+    """
+    TTL-honoring cache of DNS answers keyed by (domain, record type).
+    Negative answers are cached for a shorter time; concurrent lookups of the
+    same key share one resolution. Timeouts and server failures are not cached.
+    """
+
+    def __init__(
+        self,
+        resolver: Optional[dns.resolver.Resolver] = None,
+        async_resolver: Optional[dns.asyncresolver.Resolver] = None,
+        max_entries: int = DNS_CACHE_MAX_ENTRIES,
+        min_ttl: float = DNS_CACHE_MIN_TTL,
+        max_ttl: float = DNS_CACHE_MAX_TTL,
+        negative_ttl: float = DNS_CACHE_NEGATIVE_TTL,
+        lifetime: float = 10,
+    ):
+        self.resolver = resolver
+        self.async_resolver = async_resolver
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.lifetime = lifetime
+        self._entries = LRUCache(max_entries=max_entries)
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._async_inflight: Dict[Tuple[str, str], "asyncio.Task"] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, domain: str, rdtype: str) -> Tuple[str, ...]:
+        """Record values (MX: exchanges by preference); empty if the name has none"""
+        key = (domain.lower().rstrip("."), rdtype)
+        records = self._entries.get(key)
+        if records is not None:
+            dns_cache_lookups.inc(rdtype=rdtype, result="hit")
+            return records
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            dns_cache_lookups.inc(rdtype=rdtype, result="coalesced")
+            return future.result()
+
+        dns_cache_lookups.inc(rdtype=rdtype, result="miss")
+        try:
+            records = self._query(*key)
+            future.set_result(records)
+            return records
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def resolve_async(self, domain: str, rdtype: str) -> Tuple[str, ...]:
+        """Event-loop version of resolve(); shares the same cached answers"""
+        key = (domain.lower().rstrip("."), rdtype)
+        records = self._entries.get(key)
+        if records is not None:
+            dns_cache_lookups.inc(rdtype=rdtype, result="hit")
+            return records
+
+        task = self._async_inflight.get(key)
+        if task is None:
+            dns_cache_lookups.inc(rdtype=rdtype, result="miss")
+            task = self._async_inflight[key] = asyncio.ensure_future(self._query_async(*key))
+            task.add_done_callback(lambda done: self._finish_async(key, done))
+        else:
+            dns_cache_lookups.inc(rdtype=rdtype, result="coalesced")
+        # shield: a caller hitting its deadline must not cancel the shared lookup
+        return await asyncio.shield(task)
+
+    def _finish_async(self, key: Tuple[str, str], task: "asyncio.Task") -> None:
+        self._async_inflight.pop(key, None)
+        # Mark the error retrieved in case every waiter already gave up
+        if not task.cancelled():
+            task.exception()
+
+    def _query(self, domain: str, rdtype: str) -> Tuple[str, ...]:
+        resolver = self.resolver or dns.resolver.get_default_resolver()
+        try:
+            answer = resolver.resolve(domain, rdtype, lifetime=self.lifetime)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return self._store_negative(domain, rdtype)
+        return self._store(domain, rdtype, answer)
+
+    async def _query_async(self, domain: str, rdtype: str) -> Tuple[str, ...]:
+        resolver = self.async_resolver or dns.asyncresolver.get_default_resolver()
+        try:
+            answer = await resolver.resolve(domain, rdtype, lifetime=self.lifetime)
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return self._store_negative(domain, rdtype)
+        return self._store(domain, rdtype, answer)
+
+    def _store_negative(self, domain: str, rdtype: str) -> Tuple[str, ...]:
+        self._entries.set((domain, rdtype), (), ttl=self.negative_ttl)
+        return ()
+
+    def _store(self, domain: str, rdtype: str, answer) -> Tuple[str, ...]:
+        if rdtype == "MX":
+            records = tuple(
+                str(record.exchange)
+                for record in sorted(answer, key=lambda record: record.preference)
+            )
+        else:
+            records = tuple(record.to_text() for record in answer)
+        ttl = min(max(answer.rrset.ttl, self.min_ttl), self.max_ttl)
+        self._entries.set((domain, rdtype), records, ttl=ttl)
+        return records
+
+    def stats(self) -> dict:
+        return self._entries.stats()
 
 class TruemailValidator:
     """
     Python implementation of email validation similar to truemail-go
     """
     
-    def __init__(self):
+    def __init__(self, dns_cache: Optional[DNSCache] = None):
         self.timeout = 10
+        self.dns_cache = dns_cache or DNSCache(lifetime=self.timeout)
+    
+    def _resolve(self, domain: str, rdtype: str) -> Tuple[str, ...]:
+        try:
+            return self.dns_cache.resolve(domain, rdtype)
+        except dns.exception.DNSException:
+            # Timeouts / SERVFAIL: treat as no records, but don't cache
+            return ()
         
     def validate_email_address(self, email: str) -> Dict[str, Any]:
         """
@@ -29,7 +181,8 @@ class TruemailValidator:
         
         try:
             # Step 1: Syntax validation
-            validated_email = validate_email(email)
+            # Deliverability is checked below through the DNS cache
+            validated_email = validate_email(email, check_deliverability=False)
             result["syntax_valid"] = True
             result["email"] = validated_email.email
             
@@ -64,30 +217,19 @@ class TruemailValidator:
     
     def _validate_domain(self, domain: str) -> bool:
         """Check if domain exists"""
-        try:
-            dns.resolver.resolve(domain, 'A')
-            return True
-        except:
-            try:
-                dns.resolver.resolve(domain, 'AAAA')
-                return True
-            except:
-                return False
+        return bool(self._resolve(domain, 'A') or self._resolve(domain, 'AAAA'))
     
     def _validate_mx_records(self, domain: str) -> bool:
         """Check if domain has MX records"""
-        try:
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            return len(mx_records) > 0
-        except:
-            return False
+        return len(self._resolve(domain, 'MX')) > 0
     
     def _validate_smtp(self, domain: str, local_part: str) -> bool:
         """Basic SMTP server connectivity check"""
+        mx_records = self._resolve(domain, 'MX')
+        if not mx_records:
+            return False
         try:
-            # Get MX records
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            mx_record = str(mx_records[0].exchange)
+            mx_record = mx_records[0]
             
             # Try to connect to SMTP server
             with smtplib.SMTP(timeout=self.timeout) as smtp:
@@ -99,16 +241,159 @@ class TruemailValidator:
         except Exception as e:
             # Many servers block SMTP connections, so we'll be lenient here
             # If MX records exist, we assume SMTP is probably working
-            try:
-                mx_records = dns.resolver.resolve(domain, 'MX')
-                return len(mx_records) > 0
-            except:
-                return False
+            return True
     
     def is_email_valid(self, email: str) -> bool:
         """Simple validation method that returns True/False"""
         result = self.validate_email_address(email)
         return result["valid"] or (result["syntax_valid"] and result["mx_valid"])
 
-# Global validator instance
-truemail_validator = TruemailValidator()
\ No newline at end of file
+class AsyncTruemailValidator:
+    """
+    asyncio version of TruemailValidator: A/AAAA/MX are looked up concurrently
+    and the whole check, including the optional SMTP probe, shares one deadline.
+    """
+
+    def __init__(
+        self,
+        dns_cache: Optional[DNSCache] = None,
+        deadline: float = EMAIL_VALIDATION_DEADLINE,
+        smtp_probe: bool = False,
+        smtp_timeout: float = EMAIL_SMTP_PROBE_TIMEOUT,
+        smtp_port: int = 25,
+    ):
+        self.dns_cache = dns_cache or DNSCache(lifetime=deadline)
+        self.deadline = deadline
+        self.smtp_probe = smtp_probe
+        self.smtp_timeout = smtp_timeout
+        self.smtp_port = smtp_port
+
+    async def _resolve(self, domain: str, rdtype: str) -> Tuple[str, ...]:
+        try:
+            return await self.dns_cache.resolve_async(domain, rdtype)
+        except dns.exception.DNSException:
+            return ()
+
+    async def _probe_smtp(self, host: str) -> bool:
+        """Connect to the MX and read its greeting; no mail commands are sent"""
+        reader, writer = await asyncio.open_connection(host.rstrip("."), self.smtp_port)
+        try:
+            banner = await reader.readline()
+            writer.write(b"QUIT\r\n")
+            await writer.drain()
+            return banner.startswith(b"220")
+        finally:
+            writer.close()
+
+    async def validate_email_address(
+        self,
+        email: str,
+        deadline: Optional[float] = None,
+        smtp_probe: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Same result shape as TruemailValidator.validate_email_address"""
+        deadline = self.deadline if deadline is None else deadline
+        smtp_probe = self.smtp_probe if smtp_probe is None else smtp_probe
+        result = {
+            "email": email,
+            "valid": False,
+            "syntax_valid": False,
+            "domain_valid": False,
+            "mx_valid": False,
+            "smtp_valid": False,
+            "errors": []
+        }
+
+        try:
+            validated_email = validate_email(email, check_deliverability=False)
+        except EmailNotValidError as e:
+            result["errors"].append(f"Syntax error: {str(e)}")
+            return result
+        result["syntax_valid"] = True
+        result["email"] = validated_email.email
+        domain = validated_email.domain
+
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + deadline
+        try:
+            a, aaaa, mx = await asyncio.wait_for(
+                asyncio.gather(
+                    self._resolve(domain, "A"),
+                    self._resolve(domain, "AAAA"),
+                    self._resolve(domain, "MX"),
+                ),
+                timeout=deadline,
+            )
+        except asyncio.TimeoutError:
+            result["errors"].append("Validation timed out")
+            return result
+
+        if not (a or aaaa):
+            result["errors"].append("Domain does not exist")
+            return result
+        result["domain_valid"] = True
+        if not mx:
+            result["errors"].append("No valid MX records found")
+            return result
+        result["mx_valid"] = True
+
+        if smtp_probe:
+            remaining = min(self.smtp_timeout, give_up_at - loop.time())
+            try:
+                result["smtp_valid"] = remaining > 0 and await asyncio.wait_for(self._probe_smtp(mx[0]), remaining)
+            except (asyncio.TimeoutError, OSError):
+                result["smtp_valid"] = False
+            if not result["smtp_valid"]:
+                result["errors"].append("SMTP server not reachable")
+        else:
+            # Same leniency as the sync validator: MX records imply SMTP
+            result["smtp_valid"] = True
+        result["valid"] = result["smtp_valid"]
+        return result
+
+    async def is_email_valid(self, email: str) -> bool:
+        result = await self.validate_email_address(email)
+        return result["valid"] or (result["syntax_valid"] and result["mx_valid"])
+
+    async def validate_many(
+        self,
+        emails: List[str],
+        concurrency: int = EMAIL_VALIDATION_CONCURRENCY,
+        smtp_probe: Optional[bool] = None,
+    ) -> List[Dict[str, Any]]:
+        """Validate in parallel, at most `concurrency` at a time; results keep input order"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def validate_one(email: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.validate_email_address(email, smtp_probe=smtp_probe)
+
+        return await asyncio.gather(*(validate_one(email) for email in emails))
+
+class AddressQuota:
+    """Per-caller token bucket of `per_minute` addresses, refilled continuously"""
+
+    def __init__(self, per_minute: int = EMAIL_BATCH_ADDRESSES_PER_MINUTE, max_callers: int = 10000):
+        self.per_minute = per_minute
+        # caller -> (tokens left, when they were counted); forgotten callers start full
+        self._buckets = LRUCache(max_entries=max_callers)
+        self._lock = threading.Lock()
+
+    def take(self, caller: str, count: int) -> float:
+        """Spend `count` addresses; 0 on success, otherwise seconds until they would fit"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, counted_at = self._buckets.get(caller, (self.per_minute, now))
+            tokens = min(self.per_minute, tokens + (now - counted_at) * self.per_minute / 60)
+            if count > tokens:
+                self._buckets.set(caller, (tokens, now))
+                return (count - tokens) * 60 / self.per_minute
+            self._buckets.set(caller, (tokens - count, now))
+            return 0.0
+
+# Global validator instances, sharing one DNS cache
+truemail_validator = TruemailValidator()
+async_truemail_validator = AsyncTruemailValidator(dns_cache=truemail_validator.dns_cache)
+
+# Per-user address budget for /validate-batch
+batch_quota = AddressQuota()
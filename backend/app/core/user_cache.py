@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+from app.core.cache import LRUCache
+from app.core.metrics import counter
+from app.models.user import User as UserModel
+from app.schemas.user import User
+
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "4096"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "300"))
+
+class UserCache:
+    """
+    Verified access token -> User schema snapshot, so authenticated requests
+    skip both the JWT decode and the users lookup. An entry never outlives
+    its token's exp claim.
+    """
+
+    def __init__(self, max_entries: int = USER_CACHE_MAX_ENTRIES, ttl: float = USER_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._entries = LRUCache(max_entries=max_entries, on_evict=self._forget)
+        self.hits = counter("user_cache_hits_total", "get_current_user lookups served from cache")
+        self.misses = counter("user_cache_misses_total", "get_current_user lookups that hit the database")
+
+    def get(self, token: str) -> Optional[User]:
+        with self._lock:
+            user = self._entries.get(token)
+        (self.hits if user is not None else self.misses).inc()
+        return user
+
+    def set(self, token: str, user: User, expires_at: float) -> None:
+        ttl = min(self.ttl, expires_at - time.time())
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries.set(token, user, ttl=ttl)
+            self._tokens_by_user.setdefault(user.username, set()).add(token)
+
+    def invalidate_user(self, username: str) -> None:
+        with self._lock:
+            for token in list(self._tokens_by_user.get(username, ())):
+                self._entries.pop(token)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _forget(self, token: str, user: User) -> None:
+        tokens = self._tokens_by_user.get(user.username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user.username]
+
+# Global authenticated-user cache
+user_cache = UserCache()
+
+@event.listens_for(UserModel, "after_update")
+@event.listens_for(UserModel, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: UserModel) -> None:
+    # ORM-level changes only; bulk query.update()/delete() must call invalidate_user()
+    user_cache.invalidate_user(target.username)
+    # A rename leaves tokens cached under the old username
+    for old_username in get_history(target, "username").deleted or ():
+        user_cache.invalidate_user(old_username)
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Registers email_verifications with the background sweeper: expired codes,
+and used ones once they are past VERIFICATION_USED_RETENTION_HOURS.
+Imported by main for that side effect.
+"""
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_
+from app.models.verification import EmailVerification
+from app.core.metrics import counter, histogram
+from app.core.sweeper import sweeper
+
+# Used codes back is_email_verified, so they outlive their expiry for a while
+VERIFICATION_USED_RETENTION_HOURS = float(os.getenv("VERIFICATION_USED_RETENTION_HOURS", "24"))
+
+sweep_rows_scanned = counter("verification_sweep_rows_scanned_total", "email_verifications rows examined by the sweeper")
+sweep_rows_deleted = counter("verification_sweep_rows_deleted_total", "email_verifications rows deleted by the sweeper")
+sweep_seconds = histogram("verification_sweep_seconds", "Duration of one full email_verifications sweep")
+
+def removable_verifications(used_retention: timedelta = timedelta(hours=VERIFICATION_USED_RETENTION_HOURS)):
+    now = datetime.utcnow()
+    return or_(
+        and_(EmailVerification.is_used == False, EmailVerification.expires_at <= now),
+        EmailVerification.expires_at <= now - used_retention,
+    )
+
+sweeper.register(
+    "email_verifications",
+    EmailVerification,
+    removable_verifications,
+    rows_scanned=sweep_rows_scanned,
+    rows_deleted=sweep_rows_deleted,
+    seconds=sweep_seconds,
+)
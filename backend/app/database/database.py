@@ -1,13 +1,122 @@
-from sqlalchemy import create_engine
+import importlib.util
+import os
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./music_web.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./music_web.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# SQLite tuning, applied to every new connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KIB = int(os.getenv("SQLITE_CACHE_SIZE_KIB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# SQLite allows one writer at a time, so the write pool stays small;
+# WAL readers never block on it and get their own, larger pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "20"))
+
+def _is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        if not read_only:
+            # Persistent per database file; readers inherit it
+            cursor.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across app crashes in WAL mode, only an OS crash can lose the last commit
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+def _pool_kwargs(url: str, read_only: bool) -> dict:
+    if not _is_sqlite_file(url):
+        return {}
+    size = DB_READ_POOL_SIZE if read_only else DB_POOL_SIZE
+    return {"pool_size": size, "max_overflow": size}
+
+def _install_sqlite_pragmas(db_engine: Engine, read_only: bool) -> None:
+    @event.listens_for(db_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only)
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, read_only: bool = False) -> Engine:
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_pre_ping=True)
+
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        **_pool_kwargs(url, read_only)
+    )
+    _install_sqlite_pragmas(db_engine, read_only)
+    return db_engine
+
+# asyncio driver used when DATABASE_URL names a sync one; only aiosqlite is in
+# requirements.txt, the others have to be installed for those backends
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+def async_database_url(url: str) -> str:
+    """Same database through an asyncio driver; raises RuntimeError if there isn't one installed"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if parsed.get_dialect().is_async:
+        # Already names an asyncio driver, e.g. postgresql+psycopg_async
+        return parsed.render_as_string(hide_password=False)
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise RuntimeError(
+            f"No asyncio driver known for {backend!r} in DATABASE_URL; "
+            f"name one explicitly, e.g. {backend}+<async driver>://..."
+        )
+    if importlib.util.find_spec(driver) is None:
+        raise RuntimeError(
+            f"DATABASE_URL uses {backend!r}, which needs the {driver!r} package for the async engine; "
+            f"install it (pip install {driver}) or use SQLite"
+        )
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL, read_only: bool = False) -> AsyncEngine:
+    url = async_database_url(url)
+    if not url.startswith("sqlite"):
+        return create_async_engine(url, pool_pre_ping=True)
+
+    pool_kwargs = _pool_kwargs(url, read_only)
+    if pool_kwargs:
+        pool_kwargs["poolclass"] = AsyncAdaptedQueuePool
+    db_engine = create_async_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        **pool_kwargs
+    )
+    _install_sqlite_pragmas(db_engine.sync_engine, read_only)
+    return db_engine
+
+engine = create_db_engine()
+# In-memory databases exist per connection, so they can't be split
+_single_engine = SQLALCHEMY_DATABASE_URL.startswith("sqlite") and not _is_sqlite_file(SQLALCHEMY_DATABASE_URL)
+read_engine = engine if _single_engine else create_db_engine(read_only=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async stack used by the API routes; the sync one above stays for scripts
+# and background threads. expire_on_commit=False: attributes stay loaded
+# after commit, since lazy loads are not possible outside an await.
+async_engine = create_async_db_engine()
+async_read_engine = async_engine if _single_engine else create_async_db_engine(read_only=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
@@ -16,4 +125,53 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    """Session for read-only routes; never queues behind writers"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """Async session for read-only routes"""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+async def dispose_async_engines():
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+def ensure_columns(bind=engine):
+    """Add nullable model columns that are missing on tables created by older versions"""
+    inspector = inspect(bind)
+    preparer = bind.dialect.identifier_preparer
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not column.nullable:
+                    # Would need a default for the existing rows; add it by hand
+                    print(f"⚠️  Column {table.name}.{column.name} is missing and NOT NULL, not added")
+                    continue
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=bind.dialect)}"
+                )
+
+def ensure_indexes(bind=engine):
+    """Create model indexes that are missing on tables created by older versions"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
\ No newline at end of file
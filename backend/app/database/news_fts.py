@@ -0,0 +1,62 @@
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app.database.database import engine
+
+# External-content FTS5 index over news.title/news.description.
+# The trigram tokenizer indexes every 3-character window, so Chinese text
+# (no spaces between words) is searchable by substring without a segmenter.
+NEWS_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+        title, description,
+        content='news', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_ai AFTER INSERT ON news BEGIN
+        INSERT INTO news_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_ad AFTER DELETE ON news BEGIN
+        INSERT INTO news_fts(news_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS news_fts_au AFTER UPDATE OF title, description ON news BEGIN
+        INSERT INTO news_fts(news_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO news_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+# Set by ensure_news_fts(); search falls back to LIKE when FTS5 is unavailable
+fts_enabled = False
+
+def ensure_news_fts(bind=engine) -> bool:
+    """Create the FTS index and its sync triggers, backfilling existing rows once"""
+    global fts_enabled
+    if bind.dialect.name != "sqlite":
+        fts_enabled = False
+        return False
+
+    try:
+        with bind.begin() as conn:
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'news_fts'")
+            ).first() is not None
+            for statement in NEWS_FTS_DDL:
+                conn.execute(text(statement))
+            if not existed:
+                conn.execute(text("INSERT INTO news_fts(news_fts) VALUES ('rebuild')"))
+        fts_enabled = True
+    except OperationalError as e:
+        # SQLite < 3.34 has no trigram tokenizer
+        print(f"⚠️  Full-text search disabled: {e}")
+        fts_enabled = False
+    return fts_enabled
\ No newline at end of file
@@ -0,0 +1,40 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.metrics import counter, histogram
+
+# Statements are mostly sub-millisecond on SQLite, so start finer than the HTTP buckets
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+db_query_seconds = histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time by statement type",
+    labels=("operation",),
+    buckets=QUERY_BUCKETS,
+)
+db_query_errors = counter("db_query_errors_total", "SQL statements that raised", labels=("operation",))
+
+_KNOWN_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "CREATE", "WITH"}
+
+def statement_operation(statement: str) -> str:
+    # Only look at the first word; a bounded label set keeps series count fixed
+    word = statement[:16].lstrip().split(None, 1)
+    operation = word[0].upper() if word else ""
+    return operation if operation in _KNOWN_OPERATIONS else "OTHER"
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    db_query_seconds.observe(time.perf_counter() - started, operation=statement_operation(statement))
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    stack = conn.info.get("query_started") if conn is not None else None
+    if stack:
+        stack.pop()
+    db_query_errors.inc(operation=statement_operation(exception_context.statement or ""))
@@ -1,9 +1,28 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database.database import engine, Base
-from app.routes import auth, news, verification
+from fastapi.responses import PlainTextResponse
+from app.database.database import engine, Base, ensure_columns, ensure_indexes, dispose_async_engines
+from app.database.news_fts import ensure_news_fts
+from app.routes import auth, news, verification, media
+from app.core.metrics import REGISTRY
+from app.core.http_metrics import MetricsMiddleware
+from app.core.profiler import SQL_PROFILER_ENABLED, install_profiler, slow_query_log
+from app.database import query_metrics  # registers SQL timing listeners on import
+from app.core.password_pool import password_pool
+from app.core.security import calibrate_password_hashing
+from app.core.email_service import email_service
+from app.core.email_outbox import outbox_worker
+from app.core.sweeper import sweeper
+from app.core import refresh_tokens, verification_sweeper  # register their tables with the sweeper on import
+from app.core.media_cache import media_cache
+from app.core.news_events import news_events
+from app.core.news_views import news_views
+from app.core.news_related import related_news
 
 Base.metadata.create_all(bind=engine)
+ensure_columns()
+ensure_indexes()
+ensure_news_fts()
 
 app = FastAPI(
     title="NeuraFlow API",
@@ -19,10 +38,43 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],  # 暴露所有响应头
 )
+# Outermost, so the timing includes CORS handling
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(news.router, prefix="/api/news", tags=["news"])
 app.include_router(verification.router, prefix="/api/verification", tags=["verification"])
+app.include_router(media.router, prefix="/api/media", tags=["media"])
+
+if SQL_PROFILER_ENABLED:
+    install_profiler(app)
+
+@app.on_event("startup")
+def start_workers():
+    calibrate_password_hashing()
+    password_pool.start()
+    media_cache.start()
+    sweeper.start()
+    news_views.start()
+    related_news.start()
+    if email_service.use_real_email:
+        outbox_worker.start()
+
+@app.on_event("shutdown")
+def stop_workers():
+    password_pool.shutdown()
+    media_cache.shutdown()
+    sweeper.stop()
+    news_views.stop()
+    related_news.stop()
+    outbox_worker.stop()
+    slow_query_log.close()
+
+@app.on_event("shutdown")
+async def close_connections():
+    await news_events.close()
+    await media_cache.close()
+    await dispose_async_engines()
 
 @app.get("/")
 def root():
@@ -40,4 +92,9 @@ def health_check():
         "local_ip": local_ip,
         "cors_enabled": True,
         "api_base": "/api"
-    }
\ No newline at end of file
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    # async: the threadpool gauges read anyio state that lives on the event loop
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -1,14 +1,34 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, LargeBinary
+from sqlalchemy.dialects.sqlite import DATETIME as SQLITE_DATETIME
 from sqlalchemy.sql import func
 from app.database.database import Base
 
+# SQLite 的 CURRENT_TIMESTAMP 只精确到秒，绑定参数也用同样的文本格式，
+# 否则 "2024-01-01 12:00:00" 与 "2024-01-01 12:00:00.000000" 的字典序比较会出错
+Timestamp = DateTime(timezone=True).with_variant(
+    SQLITE_DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite",
+)
+
 class News(Base):
     __tablename__ = "news"
+    __table_args__ = (
+        # Keyset pagination: newest first, id breaks ties within the same second
+        Index("ix_news_created_at_id", "created_at", "id"),
+        # Same ordering within one creator's items, for /mine and ?creator=
+        Index("ix_news_creator_created_at_id", "creator", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=False)
+    # Plain-text excerpt of description for list views, see app.core.news_summary
+    summary = Column(String, nullable=True)
+    # MinHash signature of description for near-duplicate checks, see app.core.news_duplicates
+    fingerprint = Column(LargeBinary, nullable=True)
     image_url = Column(String, nullable=True)
     creator = Column(String, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Float, Index
+from app.database.database import Base
+
+class NewsStats(Base):
+    """
+    Popularity counters for one news item, written in batches by
+    app.core.news_views. Kept out of the news table so counting a view
+    doesn't touch news.updated_at, which drives Last-Modified and caching.
+    """
+    __tablename__ = "news_stats"
+    __table_args__ = (
+        # /api/news/trending reloads its top-K from the head of this index
+        Index("ix_news_stats_trending_score", "trending_score"),
+    )
+
+    news_id = Column(Integer, primary_key=True)
+    view_count = Column(Integer, nullable=False, default=0)
+    # log of the decayed view total, see app.core.news_views
+    trending_score = Column(Float, nullable=False)
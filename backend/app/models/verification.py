@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from sqlalchemy.sql import func
 from app.database.database import Base
 
 class EmailVerification(Base):
     __tablename__ = "email_verifications"
+    __table_args__ = (
+        # Equality columns first, then the expires_at range; serves verify_code
+        # and the (email, is_used) prefix used by is_email_verified
+        Index("ix_email_verifications_lookup", "email", "is_used", "verification_code", "expires_at"),
+        Index("ix_email_verifications_expires_at", "expires_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, index=True, nullable=False)
@@ -1,65 +1,93 @@
 from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database.database import get_db
-from app.schemas.user import UserCreate, UserLogin, User, Token
-from app.core.crud import create_user, authenticate_user, get_user_by_username, get_user_by_email
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_db
+from app.schemas.user import UserCreate, UserLogin, User, Token, RefreshRequest, LogoutRequest
+from app.core.async_crud import create_user, authenticate_user, get_user_by_username, get_user_by_email
 from app.core.security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.core.deps import get_current_user
 from app.core.email_service import email_service
+from app.core.refresh_tokens import InvalidRefreshToken, RefreshTokenRaced, issue_refresh_token, rotate_refresh_token, revoke_refresh_family
 
 router = APIRouter()
 
 @router.post("/register", response_model=User)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Verify email code first
     email = user.email.lower()
-    is_verified = email_service.verify_code(db, email, user.verification_code)
+    is_verified = await email_service.verify_code(db, email, user.verification_code)
     if not is_verified:
         raise HTTPException(
             status_code=400,
             detail="Invalid or expired verification code"
         )
     
-    db_user_username = get_user_by_username(db, username=user.username)
+    db_user_username = await get_user_by_username(db, username=user.username)
     if db_user_username:
         raise HTTPException(
             status_code=400,
             detail="Username already registered"
         )
     
-    db_user_email = get_user_by_email(db, email=email)
+    db_user_email = await get_user_by_email(db, email=email)
     if db_user_email:
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
-    return create_user(db=db, user=user)
+    # Hashing runs in the password pool, off the event loop
+    return await create_user(db=db, user=user)
 
 @router.post("/login", response_model=Token)
-def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_credentials.username, user_credentials.password)
+async def login_user(user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, user_credentials.username, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    refresh_token = await issue_refresh_token(db, user.username)
+    return _token_response(user.username, refresh_token)
+
+def _token_response(username: str, refresh_token: str) -> dict:
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data={"sub": username}, expires_delta=access_token_expires
     )
     return {
         "access_token": access_token,
         "token_type": "bearer",
-        "username": user.username
+        "username": username,
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds())
     }
 
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Trade a refresh token for a new access token and the next refresh token"""
+    try:
+        username, refresh_token = await rotate_refresh_token(db, body.refresh_token)
+    except RefreshTokenRaced as e:
+        # The session is fine; the client should use the tokens its other tab just received
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except InvalidRefreshToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _token_response(username, refresh_token)
+
 @router.get("/me", response_model=User)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.post("/logout")
-def logout_user():
-    return {"message": "Successfully logged out"}
\ No newline at end of file
+async def logout_user(body: Optional[LogoutRequest] = None, db: AsyncSession = Depends(get_async_db)):
+    # Access tokens are stateless and simply run out; the refresh family is what keeps a session alive
+    if body is not None and body.refresh_token:
+        await revoke_refresh_family(db, body.refresh_token)
+    return {"message": "Successfully logged out"}
@@ -0,0 +1,86 @@
+import os
+import re
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_read_db
+from app.core.async_crud import get_news_by_id
+from app.core.media_cache import MEDIA_TYPES, MediaUnavailable, media_cache, snap_width
+
+# The URL is per news item, not per image, so it can't be immutable
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", str(7 * 24 * 3600)))
+
+router = APIRouter()
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single byte range; None means serve the whole file"""
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        # Multi-range and malformed headers are ignored, as RFC 9110 allows
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+def _read(path: str, start: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+@router.get("/{news_id}")
+async def get_news_image(
+    news_id: int,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=4096, description="Target width; snapped up to a fixed set of sizes"),
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$", description="Defaults to WebP when the client accepts it"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Resized, cached copy of a news item's image"""
+    news = await get_news_by_id(db, news_id=news_id)
+    if news is None or not news.image_url:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    fmt = format or ("webp" if MEDIA_TYPES["webp"] in request.headers.get("accept", "") else "jpeg")
+    try:
+        variant = await media_cache.get(news.image_url, snap_width(w), fmt)
+    except MediaUnavailable as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    headers = {
+        "ETag": variant.etag,
+        "Cache-Control": f"public, max-age={MEDIA_MAX_AGE}",
+        "Accept-Ranges": "bytes",
+        # Only the negotiated default depends on Accept
+        **({} if format else {"Vary": "Accept"}),
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and variant.etag in {tag.strip() for tag in if_none_match.split(",")}:
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == variant.etag):
+        byte_range = parse_range(range_header, variant.size)
+
+    try:
+        if byte_range is None:
+            body = await run_in_threadpool(_read, variant.path, 0, variant.size)
+            return Response(content=body, media_type=variant.media_type, headers=headers)
+        start, end = byte_range
+        body = await run_in_threadpool(_read, variant.path, start, end - start + 1)
+    except FileNotFoundError:
+        # Evicted between lookup and read; the client's retry re-renders it
+        raise HTTPException(status_code=503, detail="Image is being regenerated", headers={"Retry-After": "1"})
+    headers["Content-Range"] = f"bytes {start}-{end}/{variant.size}"
+    return Response(content=body, status_code=206, media_type=variant.media_type, headers=headers)
@@ -1,70 +1,407 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from app.database.database import get_db
-from app.schemas.news import News, NewsCreate, NewsUpdate
-from app.core.crud import get_news_list, get_news_by_id, create_news, update_news, delete_news
+import asyncio
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_db, get_async_read_db
+from app.schemas.news import News, NewsCreate, NewsUpdate, NewsSearchResult, NewsBulkResult
+from app.core.async_crud import news_projection, get_news_rows, get_news_row, get_news_rows_by_id, get_news_creator, create_news, update_news, delete_news, encode_news_cursor, search_news
 from app.core.deps import get_current_user
-from app.models.user import User
+from app.core.response_cache import news_cache
+from app.core.profiler import profile_span
+from app.core.news_bulk import NDJSON_MEDIA_TYPE, import_news_ndjson, export_news_ndjson
+from app.core.news_json import render_news_row, render_news_rows
+from app.core.news_events import NEWS_STREAM_RETRY_MS, news_events
+from app.core.news_views import TRENDING_SIZE, news_views
+from app.core.news_related import RELATED_MAX_RESULTS, related_news
+from app.core.news_duplicates import description_fingerprint, duplicate_header, news_duplicates
+from app.schemas.user import User
 
 router = APIRouter()
 
+# Cache tags: a single item, and every list page whose contents depend on offset
+LIST_OFFSET_TAG = "news:list:offset"
+
+def news_tag(news_id: int) -> str:
+    return f"news:{news_id}"
+
+def creator_tag(creator: str) -> str:
+    return f"news:list:creator:{creator}"
+
+_FIELDS_QUERY = Query(
+    None,
+    description="Comma-separated subset of fields to return, e.g. id,title,summary,image_url; "
+                "only these columns are read from the database"
+)
+
+def _projection(fields: Optional[str]):
+    try:
+        return news_projection([name.strip() for name in fields.split(",") if name.strip()] if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _list_news(
+    request: Request,
+    db: AsyncSession,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[str],
+    creator: Optional[str] = None,
+    headers: Optional[dict] = None,
+):
+    rendered, columns = _projection(fields)
+    page = ("list", limit, cursor) if cursor is not None else ("list", limit, skip)
+    # /mine and ?creator= share this entry; route-specific headers are added per response
+    key = page + (rendered, creator)
+    entry = news_cache.get(key)
+    if entry is None:
+        generation = news_cache.generation()
+        try:
+            # Plain rows rendered straight to bytes; response_model only documents the shape
+            news = await get_news_rows(db, skip=skip, limit=limit, cursor=cursor, columns=columns, creator=creator)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page_headers = {}
+        # A full page means there may be more; hand out the cursor for the next one
+        if len(news) == limit:
+            page_headers["X-Next-Cursor"] = encode_news_cursor(news[-1])
+        # New items only ever appear ahead of a cursor, so cursor pages
+        # change only when one of their own items does
+        tags = [news_tag(item.id) for item in news]
+        if cursor is None:
+            tags.append(LIST_OFFSET_TAG if creator is None else creator_tag(creator))
+        with profile_span("serialization"):
+            body = render_news_rows(news, rendered)
+        entry = news_cache.store(
+            key,
+            body,
+            generation,
+            tags=tags,
+            last_modified=max((item.updated_at for item in news), default=None),
+            headers=page_headers
+        )
+    return entry.to_response(request, headers)
+
 @router.get("/", response_model=List[News])
-def read_news(
+async def read_news(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; takes precedence over skip"),
+    fields: Optional[str] = _FIELDS_QUERY,
+    creator: Optional[str] = Query(None, description="Only news created by this username"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await _list_news(request, db, skip, limit, cursor, fields, creator=creator)
+
+@router.get("/mine", response_model=List[News])
+async def read_my_news(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from X-Next-Cursor; takes precedence over skip"),
+    fields: Optional[str] = _FIELDS_QUERY,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """The current user's news, newest first, paginated like the main list"""
+    # Same URL for every user: keep shared caches from handing it to someone else
+    headers = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    return await _list_news(request, db, skip, limit, cursor, fields, creator=current_user.username, headers=headers)
+
+@router.get("/trending", response_model=List[News])
+async def read_trending_news(
+    request: Request,
+    limit: int = Query(10, ge=1, le=TRENDING_SIZE),
+    fields: Optional[str] = _FIELDS_QUERY,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Most viewed news, with recent views weighing more; best first. Views
+    count once written behind, within VIEW_FLUSH_INTERVAL_SECONDS, so a
+    fresh database has no trending news until the first flush.
+    """
+    rendered, columns = _projection(fields)
+    # The ranking lives in memory, so only the items themselves are read
+    version, ranked = news_views.trending.snapshot()
+    ids = ranked[:limit]
+    key = ("trending", version, limit, rendered)
+    entry = news_cache.get(key)
+    if entry is None:
+        generation = news_cache.generation()
+        rows = await get_news_rows_by_id(db, list(ids), columns=columns) if ids else []
+        by_id = {row.id: row for row in rows}
+        news = [by_id[news_id] for news_id in ids if news_id in by_id]
+        with profile_span("serialization"):
+            body = render_news_rows(news, rendered)
+        # A new ranking is a new key; edits to listed items drop this one
+        entry = news_cache.store(
+            key,
+            body,
+            generation,
+            tags=[news_tag(news_id) for news_id in ids],
+            last_modified=max((item.updated_at for item in news), default=None)
+        )
+    return entry.to_response(request)
+
+async def _check_duplicates(db: AsyncSession, description: str, exclude: Optional[int] = None) -> List[int]:
+    """Ids of news nearly duplicating `description`; raises 409 in reject mode"""
+    duplicates = await news_duplicates.check(db, description_fingerprint(description), exclude=exclude)
+    if duplicates and news_duplicates.rejects:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Near-duplicate of existing news: {', '.join(map(str, duplicates))}",
+            headers=duplicate_header(duplicates)
+        )
+    return duplicates
+
+def _resume_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+@router.get("/stream")
+async def stream_news(
+    request: Request,
+    last_event_id: Optional[str] = Query(None, description="Resume after this event id; EventSource reconnects send the Last-Event-ID header instead")
 ):
-    news = get_news_list(db, skip=skip, limit=limit)
-    return news
+    """
+    Server-Sent Events feed of news changes: `created` and `updated` carry
+    the item, `deleted` its id, and `reset` means events were missed and
+    the client should refetch. The same feed is available as a WebSocket
+    on this path.
+    """
+    if news_events.full:
+        raise HTTPException(status_code=503, detail="Too many stream subscribers", headers={"Retry-After": "30"})
+    resume = _resume_id(request.headers.get("last-event-id") or last_event_id)
+
+    async def body():
+        # Subscribed here, not in the handler, so the finally always pairs with it
+        subscriber = news_events.subscribe(resume)
+        try:
+            yield b"retry: %d\n\n" % NEWS_STREAM_RETRY_MS
+            async for batch in news_events.events(subscriber):
+                yield b"".join(event.sse() for event in batch)
+        finally:
+            news_events.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        # Nginx would otherwise buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/stream")
+async def stream_news_ws(websocket: WebSocket, last_event_id: Optional[str] = None):
+    """WebSocket variant of the stream; each message is {"id", "event", "data"}"""
+    if news_events.full:
+        await websocket.close(code=1013)
+        return
+    await websocket.accept()
+    subscriber = news_events.subscribe(_resume_id(last_event_id))
+
+    async def read_until_closed():
+        # Client messages are ignored; reading is how a disconnect shows up
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            subscriber.close()
+
+    reader = asyncio.ensure_future(read_until_closed())
+    try:
+        async for batch in news_events.events(subscriber):
+            for event in batch:
+                await websocket.send_text(event.ws())
+        if not reader.done():
+            # The hub closed the stream (shutdown)
+            await websocket.close(code=1001)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        reader.cancel()
+        news_events.unsubscribe(subscriber)
+
+@router.get("/search", response_model=List[NewsSearchResult])
+async def search_news_items(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty search query")
+    hits = await search_news(db, q=q, limit=limit)
+    return [
+        NewsSearchResult(
+            **News.model_validate(news).model_dump(),
+            title_highlight=title_highlight,
+            snippet=snippet,
+            score=score
+        )
+        for news, title_highlight, snippet, score in hits
+    ]
+
+@router.get("/export")
+async def export_news(current_user: User = Depends(get_current_user)):
+    """Every news item as NDJSON, one object per line, in id order"""
+    return StreamingResponse(
+        export_news_ndjson(),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="news.ndjson"'}
+    )
+
+@router.post(
+    "/bulk",
+    response_model=NewsBulkResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {NDJSON_MEDIA_TYPE: {"schema": {"type": "string", "description": "One NewsCreate object per line"}}}
+        }
+    }
+)
+async def bulk_create_news(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Create many news items from an NDJSON body; invalid lines are reported, not fatal"""
+    result = await import_news_ndjson(db, request.stream(), creator=current_user.username)
+    if result["inserted"]:
+        news_cache.invalidate(LIST_OFFSET_TAG, creator_tag(current_user.username))
+        # Inserted ids aren't returned; the index picks up everything past what it has scanned
+        related_news.catch_up_later()
+        # One reset instead of an event per row, which would overflow subscriber queues anyway
+        news_events.publish("reset", b"{}")
+    return result
 
 @router.get("/{news_id}", response_model=News)
-def read_news_item(news_id: int, db: Session = Depends(get_db)):
-    db_news = get_news_by_id(db, news_id=news_id)
-    if db_news is None:
-        raise HTTPException(status_code=404, detail="News not found")
-    return db_news
+async def read_news_item(news_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    key = ("item", news_id)
+    entry = news_cache.get(key)
+    if entry is None:
+        generation = news_cache.generation()
+        db_news = await get_news_row(db, news_id=news_id)
+        if db_news is None:
+            raise HTTPException(status_code=404, detail="News not found")
+        with profile_span("serialization"):
+            body = render_news_row(db_news)
+        entry = news_cache.store(
+            key,
+            body,
+            generation,
+            tags=[news_tag(news_id)],
+            last_modified=db_news.updated_at
+        )
+    news_views.record(news_id)
+    return entry.to_response(request)
+
+@router.get("/{news_id}/related", response_model=List[News])
+async def read_related_news(
+    news_id: int,
+    request: Request,
+    limit: int = Query(5, ge=1, le=RELATED_MAX_RESULTS),
+    fields: Optional[str] = _FIELDS_QUERY,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """News most similar to this item by title and description, best first"""
+    rendered, columns = _projection(fields)
+    if not related_news.ready:
+        raise HTTPException(status_code=503, detail="Related news index is still being built", headers={"Retry-After": "10"})
+    ids = related_news.cached(news_id)
+    if ids is None:
+        item = await get_news_row(db, news_id=news_id)
+        if item is None:
+            raise HTTPException(status_code=404, detail="News not found")
+        ids = await related_news.related(news_id, item.title, item.description)
+    key = ("related", news_id, tuple(ids), limit, rendered)
+    entry = news_cache.get(key)
+    if entry is None:
+        generation = news_cache.generation()
+        # All cached ids are read, so items deleted since the lookup leave no gap
+        rows = await get_news_rows_by_id(db, ids, columns=columns) if ids else []
+        by_id = {row.id: row for row in rows}
+        news = [by_id[related_id] for related_id in ids if related_id in by_id][:limit]
+        with profile_span("serialization"):
+            body = render_news_rows(news, rendered)
+        entry = news_cache.store(
+            key,
+            body,
+            generation,
+            tags=[news_tag(news_id)] + [news_tag(related_id) for related_id in ids],
+            last_modified=max((item.updated_at for item in news), default=None)
+        )
+    return entry.to_response(request)
 
 @router.post("/", response_model=News)
-def create_news_item(
+async def create_news_item(
     news: NewsCreate,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return create_news(db=db, news=news, creator=current_user.username)
+    duplicates = await _check_duplicates(db, news.description)
+    db_news = await create_news(db=db, news=news, creator=current_user.username)
+    if duplicates:
+        response.headers.update(duplicate_header(duplicates))
+    news_cache.invalidate(LIST_OFFSET_TAG, creator_tag(current_user.username))
+    news_events.publish("created", News.model_validate(db_news).model_dump_json().encode())
+    related_news.add(db_news.id, db_news.title, db_news.description)
+    return db_news
 
 @router.put("/{news_id}", response_model=News)
-def update_news_item(
+async def update_news_item(
     news_id: int,
     news_update: NewsUpdate,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_news = get_news_by_id(db, news_id=news_id)
-    if db_news is None:
+    creator = await get_news_creator(db, news_id=news_id)
+    if creator is None:
         raise HTTPException(status_code=404, detail="News not found")
     
-    if db_news.creator != current_user.username:
+    if creator != current_user.username:
         raise HTTPException(status_code=403, detail="Not authorized to update this news")
     
-    updated_news = update_news(db=db, news_id=news_id, news_update=news_update)
+    description_changed = "description" in news_update.model_fields_set
+    if description_changed:
+        duplicates = await _check_duplicates(db, news_update.description, exclude=news_id)
+        if duplicates:
+            response.headers.update(duplicate_header(duplicates))
+    updated_news = await update_news(db=db, news_id=news_id, news_update=news_update)
+    news_cache.invalidate(news_tag(news_id))
+    if updated_news is not None:
+        news_events.publish("updated", News.model_validate(updated_news).model_dump_json().encode())
+        if "title" in news_update.model_fields_set or description_changed:
+            related_news.add(news_id, updated_news.title, updated_news.description)
+        if description_changed:
+            news_duplicates.update(news_id, updated_news.fingerprint)
     return updated_news
 
 @router.delete("/{news_id}")
-def delete_news_item(
+async def delete_news_item(
     news_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    db_news = get_news_by_id(db, news_id=news_id)
-    if db_news is None:
+    creator = await get_news_creator(db, news_id=news_id)
+    if creator is None:
         raise HTTPException(status_code=404, detail="News not found")
     
-    if db_news.creator != current_user.username:
+    if creator != current_user.username:
         raise HTTPException(status_code=403, detail="Not authorized to delete this news")
     
-    success = delete_news(db=db, news_id=news_id)
+    success = await delete_news(db=db, news_id=news_id)
     if success:
+        news_cache.invalidate(news_tag(news_id), LIST_OFFSET_TAG, creator_tag(creator))
+        news_views.forget(news_id)
+        related_news.remove(news_id)
+        news_duplicates.discard(news_id)
+        news_events.publish("deleted", b'{"id":%d}' % news_id)
         return {"message": "News deleted successfully"}
     else:
         raise HTTPException(status_code=500, detail="Failed to delete news")
\ No newline at end of file
@@ -1,61 +1,62 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import get_async_db, get_async_read_db
 from app.schemas.verification import (
     EmailVerificationRequest, 
     EmailVerificationVerify, 
     EmailVerificationResponse,
-    EmailVerificationStatus
+    EmailVerificationStatus,
+    EmailBatchValidationRequest,
+    EmailBatchValidationResponse
 )
 from app.core.email_service import email_service
-from app.core.crud import get_user_by_email
-from app.core.truemail_validator import truemail_validator
+from app.core.async_crud import get_user_by_email
+from app.core.deps import get_current_user
+from app.core.truemail_validator import (
+    EMAIL_BATCH_MAX_SMTP_PROBES,
+    EMAIL_BATCH_SMTP_PROBE_COST,
+    async_truemail_validator,
+    batch_quota,
+)
+from app.schemas.user import User
+import math
 import re
 
 router = APIRouter()
 
-def is_valid_email_domain(email: str) -> bool:
+async def is_valid_email_domain(email: str) -> bool:
     """Real email validation using truemail-like validation"""
     try:
-        return truemail_validator.is_email_valid(email)
+        return await async_truemail_validator.is_email_valid(email)
     except Exception as e:
         print(f"Email validation error: {e}")
         return False
 
 @router.post("/send-verification", response_model=EmailVerificationResponse)
-def send_email_verification(
+async def send_email_verification(
     request: EmailVerificationRequest, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Send email verification code"""
     email = request.email.lower()
     
-    # Check if email is valid using real validation
-    if not is_valid_email_domain(email):
+    # Check if email is valid using real validation (bounded by EMAIL_VALIDATION_DEADLINE)
+    if not await is_valid_email_domain(email):
         raise HTTPException(
             status_code=400,
             detail="Email address is invalid or not deliverable. Please check your email address and try again."
         )
     
     # Check if user already exists
-    existing_user = get_user_by_email(db, email)
+    existing_user = await get_user_by_email(db, email)
     if existing_user:
         raise HTTPException(
             status_code=400,
             detail="Email already registered"
         )
     
-    # Create verification record
-    verification_code = email_service.create_verification_record(db, email)
-    
-    # Send verification email
-    success = email_service.send_verification_email(email, verification_code)
-    
-    if not success:
-        raise HTTPException(
-            status_code=500,
-            detail="Failed to send verification email. Please try again."
-        )
+    # Create verification record and queue the email; the outbox worker delivers it
+    await email_service.request_verification(db, email)
     
     return EmailVerificationResponse(
         message="Verification code sent to your email",
@@ -63,9 +64,9 @@ def send_email_verification(
     )
 
 @router.post("/verify-email")
-def verify_email_code(
+async def verify_email_code(
     request: EmailVerificationVerify, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify email code"""
     email = request.email.lower()
@@ -78,7 +79,7 @@ def verify_email_code(
         )
     
     # Verify the code
-    is_valid = email_service.verify_code(db, email, code)
+    is_valid = await email_service.verify_code(db, email, code)
     
     if not is_valid:
         raise HTTPException(
@@ -89,10 +90,10 @@ def verify_email_code(
     return {"message": "Email verified successfully", "verified": True}
 
 @router.get("/verification-status/{email}", response_model=EmailVerificationStatus)
-def get_verification_status(email: str, db: Session = Depends(get_db)):
+async def get_verification_status(email: str, db: AsyncSession = Depends(get_async_read_db)):
     """Get email verification status"""
     email = email.lower()
-    is_verified = email_service.is_email_verified(db, email)
+    is_verified = await email_service.is_email_verified(db, email)
     
     return EmailVerificationStatus(
         email=email,
@@ -100,20 +101,46 @@ def get_verification_status(email: str, db: Session = Depends(get_db)):
     )
 
 @router.post("/validate-email")
-def validate_email_detailed(request: EmailVerificationRequest):
+async def validate_email_detailed(request: EmailVerificationRequest):
     """Detailed email validation for debugging"""
     email = request.email.lower()
     
     try:
-        result = truemail_validator.validate_email_address(email)
+        result = await async_truemail_validator.validate_email_address(email, smtp_probe=True)
         return {
             "email": email,
             "validation_result": result,
-            "is_valid": truemail_validator.is_email_valid(email)
+            "is_valid": result["valid"] or (result["syntax_valid"] and result["mx_valid"])
         }
     except Exception as e:
         return {
             "email": email,
             "error": str(e),
             "is_valid": False
-        }
\ No newline at end of file
+        }
+
+@router.post("/validate-batch", response_model=EmailBatchValidationResponse)
+async def validate_email_batch(
+    request: EmailBatchValidationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Validate many addresses concurrently; results keep the request order"""
+    if request.smtp_probe and len(request.emails) > EMAIL_BATCH_MAX_SMTP_PROBES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"smtp_probe is limited to {EMAIL_BATCH_MAX_SMTP_PROBES} addresses per batch"
+        )
+    cost = len(request.emails) * (EMAIL_BATCH_SMTP_PROBE_COST if request.smtp_probe else 1)
+    retry_after = batch_quota.take(current_user.username, cost)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many addresses validated, try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+    emails = [email.strip().lower() for email in request.emails]
+    results = await async_truemail_validator.validate_many(emails, smtp_probe=request.smtp_probe)
+    return EmailBatchValidationResponse(
+        results=results,
+        valid_count=sum(1 for result in results if result["syntax_valid"] and result["mx_valid"])
+    )
\ No newline at end of file
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class NewsBase(BaseModel):
     title: str
@@ -20,6 +20,27 @@ class News(NewsBase):
     creator: str
     created_at: datetime
     updated_at: datetime
+    summary: Optional[str] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class NewsSearchResult(News):
+    title_highlight: str
+    snippet: str
+    score: float
+
+class NewsBulkError(BaseModel):
+    line: int
+    error: str
+
+class NewsBulkWarning(BaseModel):
+    line: int
+    duplicates: List[int]
+
+class NewsBulkResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[NewsBulkError]
+    # Lines accepted although they nearly duplicate existing news
+    warnings: List[NewsBulkWarning] = []
\ No newline at end of file
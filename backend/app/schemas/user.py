@@ -24,4 +24,13 @@ class User(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
-    username: str
\ No newline at end of file
+    username: str
+    refresh_token: str
+    # Access token lifetime in seconds, so clients can refresh ahead of expiry
+    expires_in: int
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
\ No newline at end of file
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 class EmailVerificationRequest(BaseModel):
     email: EmailStr
@@ -19,4 +19,13 @@ class EmailVerificationStatus(BaseModel):
     expires_at: Optional[datetime] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class EmailBatchValidationRequest(BaseModel):
+    # Plain strings so malformed addresses get a per-item result instead of a 422
+    emails: List[str] = Field(..., min_length=1, max_length=500)
+    smtp_probe: bool = False
+
+class EmailBatchValidationResponse(BaseModel):
+    results: List[Dict[str, Any]]
+    valid_count: int
\ No newline at end of file
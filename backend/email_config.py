@@ -48,4 +48,15 @@ EMAIL_TEMPLATE = """
     </div>
 </body>
 </html>
-"""
\ No newline at end of file
+"""
+
+# Delivery (background outbox worker)
+SMTP_USE_STARTTLS = True
+SMTP_TIMEOUT = 15             # seconds per SMTP command
+SMTP_POOL_SIZE = 2            # authenticated connections kept open and reused
+SMTP_IDLE_TIMEOUT = 60        # close pooled connections idle longer than this (seconds)
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_BASE_SECONDS = 5 # backoff doubles per attempt
+OUTBOX_RETRY_MAX_SECONDS = 600
+OUTBOX_POLL_SECONDS = 5
+OUTBOX_CLAIM_LEASE_SECONDS = 300  # a 'sending' row older than this is assumed abandoned and retried
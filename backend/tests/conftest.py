@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before any app module creates its engines
+_TMP = tempfile.mkdtemp(prefix="music_web_tests_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TMP, 'test.db')}")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app_db():
+    """The app's own engine with every table and the FTS index; emptied again afterwards"""
+    from sqlalchemy import delete
+    from app.database.database import Base, engine
+    from app.database.news_fts import ensure_news_fts
+    from app.models import news, news_stats, outbox, refresh_token, user, verification  # noqa: F401
+    from app.core.response_cache import news_cache
+    from app.core.user_cache import user_cache
+
+    Base.metadata.create_all(bind=engine)
+    ensure_news_fts(engine)
+    yield engine
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(delete(table))
+    news_cache.clear()
+    user_cache.clear()
+
+@pytest.fixture
+def api(app_db):
+    """
+    make(*routers, user=...) -> TestClient over a bare app with those routers
+    mounted under /api/<name>, backed by app_db. `user` stands in for the
+    logged-in user; leave it out to use real token auth.
+    """
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.core.deps import get_current_user
+    from app.database.database import dispose_async_engines
+
+    clients = []
+
+    def make(*routers, user=None):
+        app = FastAPI()
+        for name, router in routers:
+            app.include_router(router, prefix=f"/api/{name}")
+        if user is not None:
+            app.dependency_overrides[get_current_user] = lambda: user
+        client = TestClient(app)
+        client.__enter__()
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        # Pooled aiosqlite connections belong to this client's event loop
+        client.portal.call(dispose_async_engines)
+        client.__exit__(None, None, None)
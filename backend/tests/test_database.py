@@ -0,0 +1,34 @@
+import importlib.util
+
+import pytest
+
+from app.database import database
+from app.database.database import async_database_url
+
+def test_sqlite_uses_aiosqlite():
+    assert async_database_url("sqlite:///./music_web.db") == "sqlite+aiosqlite:///./music_web.db"
+    assert async_database_url("sqlite://") == "sqlite+aiosqlite://"
+
+def test_async_driver_is_kept():
+    url = "postgresql+asyncpg://user:secret@db/music"
+    assert async_database_url(url) == url
+    assert async_database_url("sqlite+aiosqlite:///x.db") == "sqlite+aiosqlite:///x.db"
+
+def test_installed_driver_is_substituted(monkeypatch):
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: object())
+    assert async_database_url("postgresql://user:secret@db/music") == "postgresql+asyncpg://user:secret@db/music"
+    assert async_database_url("mysql+pymysql://user@db/music") == "mysql+aiomysql://user@db/music"
+
+def test_missing_driver_is_a_clear_error(monkeypatch):
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    with pytest.raises(RuntimeError, match="pip install asyncpg"):
+        async_database_url("postgresql://user@db/music")
+
+def test_unknown_backend_is_a_clear_error():
+    with pytest.raises(RuntimeError, match="No asyncio driver known for 'mssql'"):
+        async_database_url("mssql+pyodbc://user@db/music")
+
+def test_engine_creation_reports_the_missing_driver(monkeypatch):
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+    with pytest.raises(RuntimeError, match="aiomysql"):
+        database.create_async_db_engine("mysql://user@db/music")
@@ -0,0 +1,195 @@
+import smtplib
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.database import Base
+from app.models.outbox import EmailOutbox
+from app.core.email_outbox import OutboxWorker, SMTPConnectionPool
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib.sendmail; answers DATA with server.data_reply"""
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 fake ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 fake")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 go ahead")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.messages += 1
+                self.reply(self.server.data_reply)
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, data_reply: str):
+        super().__init__(("127.0.0.1", 0), FakeSMTPHandler)
+        self.data_reply = data_reply
+        self.messages = 0
+
+@pytest.fixture
+def smtp_server(request):
+    server = FakeSMTPServer(getattr(request, "param", "250 queued"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def make_pool(server: FakeSMTPServer) -> SMTPConnectionPool:
+    host, port = server.server_address
+    return SMTPConnectionPool(host, port, size=1, use_starttls=False, timeout=5)
+
+@pytest.mark.parametrize("smtp_server", ["550 5.7.1 message rejected"], indirect=True)
+def test_rejected_message_is_sent_once(smtp_server):
+    pool = make_pool(smtp_server)
+    with pytest.raises(smtplib.SMTPDataError) as info:
+        pool.send("from@example.com", "to@example.com", "Subject: hi\r\n\r\nbody")
+    assert info.value.smtp_code == 550
+    assert smtp_server.messages == 1
+    # The connection stays usable after a rejection
+    assert pool._idle.qsize() == 1
+    pool.close()
+
+def test_connection_is_reused(smtp_server):
+    pool = make_pool(smtp_server)
+    for _ in range(3):
+        pool.send("from@example.com", "to@example.com", "Subject: hi\r\n\r\nbody")
+    assert smtp_server.messages == 3
+    assert pool._idle.qsize() == 1
+    pool.close()
+
+class FlakyPool:
+    size = 1
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.sent = 0
+
+    def send(self, sender, recipient, message):
+        if self.error is not None:
+            raise self.error
+        self.sent += 1
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[EmailOutbox.__table__])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def add_row(session_factory, **values) -> int:
+    db = session_factory()
+    row = EmailOutbox(recipient="to@example.com", subject="s", body="b", next_attempt_at=datetime.utcnow(), **values)
+    db.add(row)
+    db.commit()
+    outbox_id = row.id
+    db.close()
+    return outbox_id
+
+def get_row(session_factory, outbox_id: int) -> EmailOutbox:
+    db = session_factory()
+    row = db.get(EmailOutbox, outbox_id)
+    db.close()
+    return row
+
+def make_worker(pool, session_factory, **kwargs) -> OutboxWorker:
+    options = dict(max_attempts=3, retry_base=10, retry_max=25, claim_lease=60)
+    options.update(kwargs)
+    return OutboxWorker(pool, "from@example.com", session_factory=session_factory, **options)
+
+def test_transient_failure_backs_off_then_fails(session_factory):
+    worker = make_worker(FlakyPool(smtplib.SMTPServerDisconnected("gone")), session_factory)
+    outbox_id = add_row(session_factory)
+
+    expected_delays = [10, 20]
+    for delay in expected_delays:
+        before = datetime.utcnow()
+        assert worker._claim_due(limit=10) == [outbox_id]
+        worker._deliver(outbox_id)
+        row = get_row(session_factory, outbox_id)
+        assert row.status == "pending"
+        assert "SMTPServerDisconnected" in row.last_error
+        wait = (row.next_attempt_at - before).total_seconds()
+        assert delay * 0.8 - 1 <= wait <= delay * 1.2 + 1
+        # Not due yet
+        assert worker._claim_due(limit=10) == []
+        db = session_factory()
+        db.query(EmailOutbox).update({EmailOutbox.next_attempt_at: datetime.utcnow()})
+        db.commit()
+        db.close()
+
+    assert worker._claim_due(limit=10) == [outbox_id]
+    worker._deliver(outbox_id)
+    row = get_row(session_factory, outbox_id)
+    assert row.status == "failed"
+    assert row.attempts == 3
+
+def test_backoff_is_capped(session_factory):
+    worker = make_worker(FlakyPool(OSError("reset")), session_factory, max_attempts=10)
+    outbox_id = add_row(session_factory, attempts=5)
+    before = datetime.utcnow()
+    worker._claim_due(limit=10)
+    worker._deliver(outbox_id)
+    wait = (get_row(session_factory, outbox_id).next_attempt_at - before).total_seconds()
+    assert wait <= 25 * 1.2 + 1
+
+def test_permanent_failure_is_not_retried(session_factory):
+    error = smtplib.SMTPRecipientsRefused({"to@example.com": (550, b"no such user")})
+    worker = make_worker(FlakyPool(error), session_factory)
+    outbox_id = add_row(session_factory)
+    worker._claim_due(limit=10)
+    worker._deliver(outbox_id)
+    row = get_row(session_factory, outbox_id)
+    assert row.status == "failed"
+    assert row.attempts == 1
+
+def test_successful_delivery(session_factory):
+    pool = FlakyPool()
+    worker = make_worker(pool, session_factory)
+    outbox_id = add_row(session_factory)
+    worker._claim_due(limit=10)
+    worker._deliver(outbox_id)
+    row = get_row(session_factory, outbox_id)
+    assert row.status == "sent"
+    assert row.sent_at is not None
+    assert pool.sent == 1
+
+def test_recovery_only_reclaims_expired_claims(session_factory):
+    worker = make_worker(FlakyPool(), session_factory, claim_lease=60)
+    now = datetime.utcnow()
+    live = add_row(session_factory, status="sending", claimed_at=now - timedelta(seconds=5))
+    abandoned = add_row(session_factory, status="sending", claimed_at=now - timedelta(seconds=120))
+    legacy = add_row(session_factory, status="sending")
+
+    worker._recover_stuck()
+
+    assert get_row(session_factory, live).status == "sending"
+    assert get_row(session_factory, abandoned).status == "pending"
+    assert get_row(session_factory, legacy).status == "pending"
+
+    # A live worker's claim is never handed out twice by the poll either
+    assert sorted(worker._claim_due(limit=10)) == sorted([abandoned, legacy])
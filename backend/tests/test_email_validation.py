@@ -0,0 +1,204 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import dns.resolver
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import truemail_validator
+from app.core.deps import get_current_user
+from app.core.truemail_validator import AddressQuota, AsyncTruemailValidator, DNSCache
+from app.routes import verification
+
+class Answer(list):
+    def __init__(self, records, ttl=300):
+        super().__init__(records)
+        self.rrset = SimpleNamespace(ttl=ttl)
+
+class Resolver:
+    """dns.asyncresolver stand-in: every domain has A and MX records after `delay` seconds"""
+
+    def __init__(self, delay: float = 0, missing=()):
+        self.delay = delay
+        self.missing = set(missing)
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def resolve(self, domain, rdtype, lifetime=None):
+        self.calls.append((domain, rdtype))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if domain in self.missing or rdtype == "AAAA":
+            raise dns.resolver.NXDOMAIN()
+        if rdtype == "MX":
+            return Answer([SimpleNamespace(exchange=f"mx.{domain}.", preference=10)])
+        return Answer([SimpleNamespace(to_text=lambda: "93.184.216.34")])
+
+def make_validator(resolver, **kwargs) -> AsyncTruemailValidator:
+    return AsyncTruemailValidator(dns_cache=DNSCache(async_resolver=resolver), **kwargs)
+
+def test_valid_address():
+    validator = make_validator(Resolver())
+    result = asyncio.run(validator.validate_email_address("user@mail.example.org"))
+    assert result["valid"] and result["mx_valid"] and result["domain_valid"]
+    assert result["errors"] == []
+
+def test_missing_domain():
+    validator = make_validator(Resolver(missing={"nowhere.example.org"}))
+    result = asyncio.run(validator.validate_email_address("user@nowhere.example.org"))
+    assert not result["valid"]
+    assert result["errors"] == ["Domain does not exist"]
+
+def test_slow_dns_hits_the_deadline():
+    validator = make_validator(Resolver(delay=5), deadline=0.2)
+    started = time.perf_counter()
+    result = asyncio.run(validator.validate_email_address("user@slow.example.org"))
+    elapsed = time.perf_counter() - started
+    assert result["errors"] == ["Validation timed out"]
+    assert result["syntax_valid"] and not result["valid"]
+    assert elapsed < 1
+
+def test_deadline_does_not_cancel_the_shared_lookup():
+    resolver = Resolver(delay=0.3)
+    validator = make_validator(resolver, deadline=0.1)
+
+    async def run():
+        first = await validator.validate_email_address("user@late.example.org")
+        # The lookup keeps running for the next caller and lands in the cache
+        await asyncio.sleep(0.4)
+        second = await validator.validate_email_address("user@late.example.org", deadline=0.1)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first["errors"] == ["Validation timed out"]
+    assert second["valid"]
+    assert len(resolver.calls) == 3
+
+def test_smtp_probe_shares_the_deadline():
+    validator = make_validator(Resolver(delay=0.1), deadline=0.3, smtp_probe=True, smtp_timeout=10)
+
+    async def hung_probe(host):
+        await asyncio.sleep(10)
+
+    validator._probe_smtp = hung_probe
+    started = time.perf_counter()
+    result = asyncio.run(validator.validate_email_address("user@mail.example.org"))
+    elapsed = time.perf_counter() - started
+    assert result["mx_valid"] and not result["smtp_valid"]
+    assert result["errors"] == ["SMTP server not reachable"]
+    assert elapsed < 0.6
+
+def test_batch_respects_concurrency_and_order():
+    resolver = Resolver(delay=0.05)
+    validator = make_validator(resolver)
+    emails = [f"user@d{i}.example.org" for i in range(12)] + ["not an email"]
+
+    results = asyncio.run(validator.validate_many(emails, concurrency=3))
+
+    assert [result["email"] for result in results] == emails
+    assert all(result["valid"] for result in results[:-1])
+    assert not results[-1]["syntax_valid"]
+    # Each address runs its three lookups together, so 3 addresses => 9 queries
+    assert resolver.max_in_flight == 9
+
+def test_batch_coalesces_lookups_for_one_domain():
+    resolver = Resolver(delay=0.05)
+    validator = make_validator(resolver)
+    emails = [f"user{i}@same.example.org" for i in range(20)]
+    results = asyncio.run(validator.validate_many(emails, concurrency=20))
+    assert all(result["valid"] for result in results)
+    assert sorted(resolver.calls) == sorted([("same.example.org", t) for t in ("A", "AAAA", "MX")])
+
+def test_batch_deadline_is_per_address():
+    # Queued addresses start their own budget when they get a slot
+    resolver = Resolver(delay=0.15)
+    validator = make_validator(resolver, deadline=0.25)
+    emails = [f"user@q{i}.example.org" for i in range(4)]
+    results = asyncio.run(validator.validate_many(emails, concurrency=2))
+    assert all(result["valid"] for result in results)
+
+@pytest.fixture
+def anonymous_client(monkeypatch):
+    monkeypatch.setattr(verification, "async_truemail_validator", make_validator(Resolver()))
+    monkeypatch.setattr(verification, "batch_quota", AddressQuota(per_minute=1000))
+    app = FastAPI()
+    app.include_router(verification.router, prefix="/api/verification")
+    return TestClient(app)
+
+@pytest.fixture
+def client(anonymous_client):
+    anonymous_client.app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(username="alice")
+    return anonymous_client
+
+def test_batch_endpoint(client):
+    response = client.post("/api/verification/validate-batch", json={"emails": [" User@Mail.Example.org ", "bad"]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["email"] for result in body["results"]] == ["user@mail.example.org", "bad"]
+    assert body["valid_count"] == 1
+
+@pytest.mark.parametrize("emails", [[], ["user@example.org"] * 501])
+def test_batch_endpoint_limits(client, emails):
+    response = client.post("/api/verification/validate-batch", json={"emails": emails})
+    assert response.status_code == 422
+
+def test_batch_endpoint_requires_login(anonymous_client):
+    response = anonymous_client.post("/api/verification/validate-batch", json={"emails": ["user@example.org"]})
+    assert response.status_code == 403
+
+def test_batch_smtp_probe_is_capped(client, monkeypatch):
+    probed = []
+
+    async def probe(host):
+        probed.append(host)
+        return True
+
+    monkeypatch.setattr(verification.async_truemail_validator, "_probe_smtp", probe)
+    emails = [f"user@p{i}.example.org" for i in range(verification.EMAIL_BATCH_MAX_SMTP_PROBES + 1)]
+    response = client.post("/api/verification/validate-batch", json={"emails": emails, "smtp_probe": True})
+    assert response.status_code == 400
+    assert probed == []
+
+    response = client.post("/api/verification/validate-batch", json={"emails": emails[:-1], "smtp_probe": True})
+    assert response.status_code == 200
+    assert len(probed) == len(emails) - 1
+
+def test_batch_quota_per_caller(client, monkeypatch):
+    monkeypatch.setattr(verification, "batch_quota", AddressQuota(per_minute=10))
+    emails = [f"user{i}@example.org" for i in range(6)]
+    assert client.post("/api/verification/validate-batch", json={"emails": emails}).status_code == 200
+    response = client.post("/api/verification/validate-batch", json={"emails": emails})
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+    # Another caller has its own budget
+    client.app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(username="bob")
+    assert client.post("/api/verification/validate-batch", json={"emails": emails}).status_code == 200
+
+def test_probes_cost_more_quota(client, monkeypatch):
+    monkeypatch.setattr(verification, "batch_quota", AddressQuota(per_minute=25))
+
+    async def probe(host):
+        return True
+
+    monkeypatch.setattr(verification.async_truemail_validator, "_probe_smtp", probe)
+    body = {"emails": ["a@example.org", "b@example.org"], "smtp_probe": True}
+    assert client.post("/api/verification/validate-batch", json=body).status_code == 200
+    assert client.post("/api/verification/validate-batch", json=body).status_code == 429
+
+def test_quota_refills_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(truemail_validator.time, "monotonic", lambda: now[0])
+    quota = AddressQuota(per_minute=60)
+    assert quota.take("alice", 60) == 0
+    assert quota.take("alice", 30) == pytest.approx(30)
+    now[0] += 30
+    assert quota.take("alice", 30) == 0
+    assert quota.take("alice", 1) == pytest.approx(1)
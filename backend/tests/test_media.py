@@ -0,0 +1,215 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.media_cache import HTTPImageFetcher, MediaUnavailable, Variant, is_public_address, resolve_host
+from app.database.database import get_async_read_db
+from app.routes import media
+
+PUBLIC_IP = "93.184.216.34"
+
+def make_fetcher(hosts, handler, **kwargs):
+    """Fetcher whose DNS answers come from `hosts` and whose requests go to `handler`"""
+    seen = []
+
+    async def resolver(host, port):
+        if host not in hosts:
+            raise OSError(f"unknown host {host}")
+        return hosts[host]
+
+    def record(request):
+        seen.append(request)
+        return handler(request)
+
+    fetcher = HTTPImageFetcher(resolver=resolver, transport=httpx.MockTransport(record), **kwargs)
+    return fetcher, seen
+
+def with_literals(resolver):
+    async def resolve(host, port):
+        if host.replace(".", "").isdigit() or ":" in host:
+            return [host]
+        return await resolver(host, port)
+    return resolve
+
+def fetch(fetcher, url):
+    async def run():
+        try:
+            return await fetcher.fetch(url)
+        finally:
+            await fetcher.close()
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("address", [
+    "127.0.0.1", "10.0.0.5", "172.16.0.1", "192.168.1.1", "169.254.169.254",
+    "100.64.0.1", "0.0.0.0", "224.0.0.1", "::1", "fe80::1", "fc00::1", "::ffff:127.0.0.1",
+])
+def test_non_public_addresses(address):
+    assert not is_public_address(address)
+
+@pytest.mark.parametrize("address", [PUBLIC_IP, "2606:4700::1111"])
+def test_public_addresses(address):
+    assert is_public_address(address)
+
+def test_private_ip_url_is_refused():
+    fetcher, seen = make_fetcher({}, lambda request: httpx.Response(200, content=b"img"))
+    # IP literals resolve to themselves without a DNS query
+    fetcher.resolver = resolve_host
+    for url in ("http://10.0.0.5/a.png", "http://127.0.0.1:8000/a.png", "http://[::1]/a.png"):
+        with pytest.raises(MediaUnavailable, match="not public"):
+            fetch(fetcher, url)
+    assert seen == []
+
+def test_hostname_resolving_to_private_ip_is_refused():
+    fetcher, seen = make_fetcher(
+        {"images.example.com": [PUBLIC_IP], "metadata.internal": ["169.254.169.254"]},
+        lambda request: httpx.Response(200, content=b"img"),
+    )
+    with pytest.raises(MediaUnavailable, match="not public"):
+        fetch(fetcher, "http://metadata.internal/latest/meta-data")
+    assert seen == []
+
+def test_any_private_answer_refuses_the_host():
+    fetcher, seen = make_fetcher(
+        {"mixed.example.com": [PUBLIC_IP, "10.0.0.7"]},
+        lambda request: httpx.Response(200, content=b"img"),
+    )
+    with pytest.raises(MediaUnavailable, match="not public"):
+        fetch(fetcher, "http://mixed.example.com/a.png")
+    assert seen == []
+
+@pytest.mark.parametrize("location", [
+    "http://127.0.0.1/admin",
+    "http://internal.example.com/secret",
+    "http://[::ffff:10.0.0.1]/",
+])
+def test_redirect_to_private_ip_is_refused(location):
+    fetcher, seen = make_fetcher(
+        {"images.example.com": [PUBLIC_IP], "internal.example.com": ["10.1.2.3"]},
+        lambda request: httpx.Response(302, headers={"Location": location}),
+    )
+    fetcher.resolver = with_literals(fetcher.resolver)
+    with pytest.raises(MediaUnavailable, match="not public"):
+        fetch(fetcher, "http://images.example.com/a.png")
+    assert len(seen) == 1
+
+def test_redirect_is_followed_and_pinned():
+    def handler(request):
+        if request.url.path == "/old.png":
+            return httpx.Response(301, headers={"Location": "https://cdn.example.com/new.png"})
+        return httpx.Response(200, content=b"image-bytes")
+
+    fetcher, seen = make_fetcher(
+        {"images.example.com": [PUBLIC_IP], "cdn.example.com": ["2606:4700::1111"]},
+        handler,
+    )
+    assert fetch(fetcher, "http://images.example.com/old.png") == b"image-bytes"
+    assert [request.url.host for request in seen] == [PUBLIC_IP, "2606:4700::1111"]
+    assert [request.headers["host"] for request in seen] == ["images.example.com", "cdn.example.com"]
+    assert seen[1].extensions["sni_hostname"] == "cdn.example.com"
+
+def test_redirect_limit():
+    fetcher, seen = make_fetcher(
+        {"images.example.com": [PUBLIC_IP]},
+        lambda request: httpx.Response(302, headers={"Location": "/again"}),
+        max_redirects=3,
+    )
+    with pytest.raises(MediaUnavailable, match="redirects"):
+        fetch(fetcher, "http://images.example.com/a.png")
+    assert len(seen) == 4
+
+def test_allowed_hosts_apply_to_redirects():
+    fetcher, seen = make_fetcher(
+        {"images.example.com": [PUBLIC_IP], "elsewhere.example.com": [PUBLIC_IP]},
+        lambda request: httpx.Response(302, headers={"Location": "http://elsewhere.example.com/a.png"}),
+        allowed_hosts=["images.example.com"],
+    )
+    with pytest.raises(MediaUnavailable, match="not allowed"):
+        fetch(fetcher, "http://images.example.com/a.png")
+    assert len(seen) == 1
+
+# Route: conditional and range requests
+
+BODY = bytes(range(100))
+ETAG = '"abc123-w320.jpeg"'
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = tmp_path / "variant.jpeg"
+    path.write_bytes(BODY)
+
+    async def get_news_by_id(db, news_id):
+        return SimpleNamespace(id=news_id, image_url="http://images.example.com/a.png")
+
+    async def get(url, width, fmt):
+        return Variant(path=str(path), size=len(BODY), etag=ETAG, media_type="image/jpeg")
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(media, "get_news_by_id", get_news_by_id)
+    monkeypatch.setattr(media.media_cache, "get", get)
+    app = FastAPI()
+    app.include_router(media.router, prefix="/api/media")
+    app.dependency_overrides[get_async_read_db] = no_db
+    return TestClient(app)
+
+def test_full_response(client):
+    response = client.get("/api/media/1?format=jpeg")
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["etag"] == ETAG
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "vary" not in response.headers
+
+def test_negotiated_format_varies_on_accept(client):
+    assert client.get("/api/media/1").headers["vary"] == "Accept"
+
+@pytest.mark.parametrize("if_none_match", [ETAG, f'"other", {ETAG}'])
+def test_not_modified(client, if_none_match):
+    response = client.get("/api/media/1?format=jpeg", headers={"If-None-Match": if_none_match})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == ETAG
+
+def test_stale_etag_gets_full_body(client):
+    response = client.get("/api/media/1?format=jpeg", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-9", 0, 9),
+    ("bytes=90-", 90, 99),
+    ("bytes=-10", 90, 99),
+    ("bytes=95-500", 95, 99),
+])
+def test_range(client, header, start, end):
+    response = client.get("/api/media/1?format=jpeg", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == BODY[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(BODY)}"
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=50-10"])
+def test_unsatisfiable_range(client, header):
+    response = client.get("/api/media/1?format=jpeg", headers={"Range": header})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(BODY)}"
+
+@pytest.mark.parametrize("header", ["bytes=0-1,5-6", "items=0-1", "bytes=-"])
+def test_unsupported_range_serves_whole_file(client, header):
+    response = client.get("/api/media/1?format=jpeg", headers={"Range": header})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+def test_if_range_matching_etag_serves_range(client):
+    response = client.get("/api/media/1?format=jpeg", headers={"Range": "bytes=0-9", "If-Range": ETAG})
+    assert response.status_code == 206
+    assert response.content == BODY[:10]
+
+def test_if_range_stale_etag_serves_whole_file(client):
+    response = client.get("/api/media/1?format=jpeg", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == BODY
@@ -0,0 +1,37 @@
+import pytest
+
+from app.core.metrics import Counter, Histogram, Metric
+
+def test_metric_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("base", "no samples")
+
+    class Incomplete(Metric):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "no samples")
+
+def test_counter_render():
+    requests = Counter("requests_total", "Requests", labels=("method",))
+    requests.inc(method="GET")
+    requests.inc(2, method='P"OST')
+    assert requests.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{method="GET"} 1',
+        'requests_total{method="P\\"OST"} 2',
+    ]
+
+def test_histogram_buckets_are_cumulative():
+    latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value)
+    assert latency.samples() == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+    assert latency.count() == 4
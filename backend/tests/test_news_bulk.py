@@ -0,0 +1,58 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.routes import news
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+@pytest.fixture
+def client(api, monkeypatch):
+    monkeypatch.setattr(news, "related_news", SimpleNamespace(catch_up_later=lambda: None))
+    return api(("news", news.router), user=SimpleNamespace(username="alice"))
+
+def ndjson(*items):
+    return "".join(json.dumps(item) + "\n" for item in items).encode()
+
+def test_export_requires_login(api):
+    response = api(("news", news.router)).get("/api/news/export")
+    assert response.status_code == 403
+
+def test_export_round_trips_through_bulk(client):
+    response = client.post("/api/news/bulk", content=ndjson(
+        {"title": "First", "description": "Opening night at the new concert hall"},
+        {"title": "Second", "description": "A quiet folk record from the hills", "image_url": "https://example.com/a.jpg"},
+        {"title": "Third", "description": "Festival lineup announced for the summer"},
+    ), headers=NDJSON)
+    assert response.json()["inserted"] == 3
+
+    with client.stream("GET", "/api/news/export") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        exported = b"".join(response.iter_bytes())
+    rows = [json.loads(line) for line in exported.splitlines()]
+    assert [row["title"] for row in rows] == ["First", "Second", "Third"]
+    assert rows[1]["image_url"] == "https://example.com/a.jpg"
+
+    # The exported lines are valid NewsCreate input; extra fields like id are ignored
+    response = client.post("/api/news/bulk", content=exported, headers=NDJSON)
+    assert response.json() == {"inserted": 3, "failed": 0, "errors": [], "warnings": []}
+    with client.stream("GET", "/api/news/export") as response:
+        again = [json.loads(line) for line in b"".join(response.iter_bytes()).splitlines()]
+    assert [row["title"] for row in again] == ["First", "Second", "Third"] * 2
+    assert [row["id"] for row in again] == sorted(row["id"] for row in again)
+
+def test_bulk_reports_errors_per_line(client):
+    body = b"\n".join([
+        json.dumps({"title": "Good", "description": "A valid line"}).encode(),
+        b"{not json",
+        b"",
+        json.dumps({"title": "Missing description"}).encode(),
+        json.dumps({"title": "Also good", "description": "Another valid line"}).encode(),
+    ])
+    result = client.post("/api/news/bulk", content=body, headers=NDJSON).json()
+    assert result["inserted"] == 2
+    assert result["failed"] == 2
+    assert [error["line"] for error in result["errors"]] == [2, 4]
+    assert "description" in result["errors"][1]["error"]
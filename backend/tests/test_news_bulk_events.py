@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.deps import get_current_user
+from app.core.news_events import NewsEventHub
+from app.database.database import get_async_db
+from app.routes import news
+
+@pytest.fixture
+def client(monkeypatch):
+    hub = NewsEventHub(heartbeat_seconds=0)
+    outcome = {"inserted": 0, "failed": 0, "errors": [], "warnings": []}
+
+    async def import_news_ndjson(db, lines, creator):
+        return dict(outcome)
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(news, "news_events", hub)
+    monkeypatch.setattr(news, "import_news_ndjson", import_news_ndjson)
+    monkeypatch.setattr(news, "related_news", SimpleNamespace(catch_up_later=lambda: None))
+    app = FastAPI()
+    app.include_router(news.router, prefix="/api/news")
+    app.dependency_overrides[get_async_db] = no_db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(username="alice")
+    client = TestClient(app)
+    client.hub = hub
+    client.outcome = outcome
+    return client
+
+def published(hub):
+    return [event.type for event in hub._replay]
+
+def test_bulk_import_publishes_one_reset(client):
+    client.outcome["inserted"] = 250
+    response = client.post("/api/news/bulk", content=b"{}\n", headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert published(client.hub) == ["reset"]
+
+def test_empty_bulk_import_publishes_nothing(client):
+    client.outcome["failed"] = 1
+    response = client.post("/api/news/bulk", content=b"{}\n", headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert published(client.hub) == []
+
+def test_reset_is_replayed_to_resuming_subscribers():
+    hub = NewsEventHub(heartbeat_seconds=0)
+    before = hub.publish("created", b'{"id":1}')
+    hub.publish("reset", b"{}")
+    subscriber = hub.subscribe(before.id)
+    assert [event.type for event in subscriber._queue] == ["reset"]
@@ -0,0 +1,74 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.database.database import Base
+from app.models.news import News
+from app.core.news_duplicates import FingerprintIndex, NewsDuplicates, description_fingerprint, news_duplicates
+
+STORY = (
+    "The city council approved a new budget on Tuesday that expands bus service "
+    "to the northern districts and funds two additional libraries next year"
+)
+EDITED = STORY.replace("Tuesday", "Wednesday")
+OTHER = (
+    "Researchers at the university published a study about migratory birds "
+    "crossing the mountains during unusually warm autumn weather patterns"
+)
+
+def test_nothing_is_allocated_at_import():
+    assert news_duplicates.index._heads is None
+
+def test_index_allocates_on_first_add():
+    index = FingerprintIndex(bucket_bits=10)
+    assert index.matches(description_fingerprint(STORY)) == []
+    assert index._heads is None
+    index.add(1, description_fingerprint(STORY))
+    assert len(index._heads) == 8 and len(index._heads[0]) == 1 << 10
+
+def test_near_duplicates_match():
+    index = FingerprintIndex(bucket_bits=10)
+    index.add_many([1, 2], [description_fingerprint(STORY), description_fingerprint(OTHER)])
+    assert index.matches(description_fingerprint(EDITED)) == [1]
+    assert index.matches(description_fingerprint(STORY), exclude=1) == []
+    index.discard(1)
+    assert index.matches(description_fingerprint(EDITED)) == []
+
+def run_with_news(descriptions, scenario):
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[News.__table__])
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                for description in descriptions:
+                    db.add(News(title="t", description=description, creator="alice",
+                                fingerprint=description_fingerprint(description)))
+                await db.commit()
+                return await scenario(db)
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+def test_tables_are_allocated_by_the_first_catch_up():
+    duplicates = NewsDuplicates(mode="warn")
+    assert duplicates.index._heads is None
+
+    async def scenario(db):
+        assert await duplicates.check(db, description_fingerprint(EDITED)) == [1]
+        assert duplicates.index._heads is not None
+
+    run_with_news([STORY, OTHER], scenario)
+
+def test_off_mode_never_allocates():
+    duplicates = NewsDuplicates(mode="off")
+
+    async def scenario(db):
+        assert await duplicates.catch_up(db) == 0
+        assert await duplicates.check(db, description_fingerprint(STORY)) == []
+        duplicates.update(1, description_fingerprint(STORY))
+        duplicates.discard(1)
+
+    run_with_news([STORY], scenario)
+    assert duplicates.index._heads is None
+    assert duplicates.index.size == 0
@@ -0,0 +1,57 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.deps import get_current_user
+from app.core.response_cache import ResponseCache
+from app.database.database import get_async_read_db
+from app.routes import news
+
+@pytest.fixture
+def client(monkeypatch):
+    reads = []
+
+    async def get_news_rows(db, skip, limit, cursor, columns, creator):
+        reads.append(creator)
+        return [SimpleNamespace(id=1, updated_at=datetime(2024, 1, 1))]
+
+    async def no_db():
+        yield None
+
+    monkeypatch.setattr(news, "news_cache", ResponseCache())
+    monkeypatch.setattr(news, "get_news_rows", get_news_rows)
+    monkeypatch.setattr(news, "render_news_rows", lambda rows, rendered: b'[{"id":1}]')
+    app = FastAPI()
+    app.include_router(news.router, prefix="/api/news")
+    app.dependency_overrides[get_async_read_db] = no_db
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(username="alice")
+    client = TestClient(app)
+    client.reads = reads
+    return client
+
+def test_mine_then_creator_filter(client):
+    mine = client.get("/api/news/mine")
+    public = client.get("/api/news/?creator=alice")
+    assert mine.headers["cache-control"] == "private, no-cache"
+    assert mine.headers["vary"] == "Authorization"
+    assert public.headers["cache-control"] == "no-cache"
+    assert "vary" not in public.headers
+    # One read serves both routes
+    assert client.reads == ["alice"]
+    assert mine.content == public.content
+
+def test_creator_filter_then_mine(client):
+    public = client.get("/api/news/?creator=alice")
+    mine = client.get("/api/news/mine")
+    assert public.headers["cache-control"] == "no-cache"
+    assert mine.headers["cache-control"] == "private, no-cache"
+    assert mine.headers["vary"] == "Authorization"
+
+def test_not_modified_keeps_route_headers(client):
+    etag = client.get("/api/news/?creator=alice").headers["etag"]
+    mine = client.get("/api/news/mine", headers={"If-None-Match": etag})
+    assert mine.status_code == 304
+    assert mine.headers["cache-control"] == "private, no-cache"
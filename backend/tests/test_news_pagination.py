@@ -0,0 +1,101 @@
+import base64
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database.database import SessionLocal
+from app.models.news import News
+from app.routes import news
+
+BASE = datetime(2024, 1, 1, 12, 0, 0)
+
+def add_news(*seconds):
+    """One row per entry, created `seconds` after BASE; returns their ids"""
+    with SessionLocal() as db:
+        rows = [
+            News(title=f"n{i}", description="d", creator="alice", created_at=BASE + timedelta(seconds=s))
+            for i, s in enumerate(seconds)
+        ]
+        db.add_all(rows)
+        db.commit()
+        return [row.id for row in rows]
+
+def newest_first(ids, seconds):
+    return [news_id for _, news_id in sorted(zip(seconds, ids), reverse=True)]
+
+def walk(client, limit, between_pages=None):
+    """Follow X-Next-Cursor to the end; returns the ids in page order and the page count"""
+    ids, pages = [], 0
+    response = client.get("/api/news/", params={"limit": limit, "fields": "id"})
+    while True:
+        assert response.status_code == 200
+        ids += [item["id"] for item in response.json()]
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids, pages
+        if between_pages is not None:
+            between_pages(pages)
+        response = client.get("/api/news/", params={"limit": limit, "cursor": cursor, "fields": "id"})
+
+@pytest.fixture
+def client(api):
+    return api(("news", news.router))
+
+def test_cursor_round_trips_across_pages(client):
+    seconds = list(range(7))
+    ids = add_news(*seconds)
+    walked, pages = walk(client, limit=3)
+    assert walked == newest_first(ids, seconds)
+    # 3 + 3 + 1; a full last page would need one more, empty request
+    assert pages == 3
+
+def test_ties_within_a_second_are_broken_by_id(client):
+    # SQLite timestamps have second resolution, so these all collide
+    seconds = [0, 5, 5, 5, 5, 5, 9]
+    ids = add_news(*seconds)
+    walked, _ = walk(client, limit=2)
+    assert walked == [ids[6], ids[5], ids[4], ids[3], ids[2], ids[1], ids[0]]
+
+def test_rows_inserted_between_pages_are_not_repeated_or_skipped(client):
+    seconds = [0, 1, 2, 2, 2, 3, 4]
+    ids = add_news(*seconds)
+    newer, tied = [], []
+
+    def insert(page):
+        # One row ahead of every cursor, and a late one inside the tied second
+        fresh, late = add_news(10 + page, 2)
+        newer.append(fresh)
+        tied.append(late)
+
+    walked, _ = walk(client, limit=2, between_pages=insert)
+    assert len(walked) == len(set(walked))
+    assert [news_id for news_id in walked if news_id in ids] == newest_first(ids, seconds)
+    # Rows newer than the cursor wait for the next walk; ones behind it are picked up
+    assert not set(walked) & set(newer)
+    assert set(walked) - set(ids) <= set(tied)
+    assert tied[0] in walked
+
+def test_offset_and_cursor_pages_agree(client):
+    add_news(*range(6))
+    first = client.get("/api/news/", params={"limit": 3})
+    by_cursor = client.get("/api/news/", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    by_offset = client.get("/api/news/", params={"limit": 3, "skip": 3})
+    assert by_cursor.json() == by_offset.json()
+
+def encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    encode(b"not json"),
+    encode(b'["2024-01-01T12:00:00"]'),
+    encode(b'["yesterday", 3]'),
+    encode(b'["2024-01-01T12:00:00", "three"]'),
+    encode(b'{"created_at": "2024-01-01T12:00:00", "id": 3}'),
+])
+def test_malformed_cursor_is_a_bad_request(client, cursor):
+    add_news(0)
+    response = client.get("/api/news/", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
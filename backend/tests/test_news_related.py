@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from app.core.news_related import RelatedNews, RelatedNewsIndex, tokenize
+from app.database.database import SessionLocal
+from app.models.news import News
+
+ARTICLES = {
+    1: ("Jazz festival returns", "The jazz festival returns downtown with saxophone and trumpet sets"),
+    2: ("Saxophone legend plays jazz", "A saxophone legend headlines the jazz club with a trumpet quartet"),
+    3: ("Stadium rock tour", "The rock band announced a stadium tour with guitar heavy shows"),
+    4: ("Guitar maker expands", "A guitar maker expands production as rock bands order more amplifiers"),
+    5: ("Weather", "Rain expected over the weekend"),
+}
+
+def small_index(**options):
+    return RelatedNewsIndex(features=2 ** 12, **options)
+
+def indexed(**options):
+    index = small_index(**options)
+    for news_id, (title, description) in ARTICLES.items():
+        index.add(news_id, title, description)
+    return index
+
+def related(index, news_id, limit=3):
+    title, description = ARTICLES[news_id]
+    return index.similar([(news_id, title, description)], limit)[news_id]
+
+def test_tokenize():
+    assert tokenize("<b>Jazz</b> & a Blues_band 2024") == ["jazz", "blues", "band", "2024"]
+    assert tokenize("新歌发布 by 周") == ["新歌", "歌发", "发布", "周", "by"]
+    assert tokenize(None) == []
+
+def test_similar_articles_rank_first():
+    index = indexed()
+    assert related(index, 1)[0] == 2
+    assert related(index, 3)[0] == 4
+    assert 1 not in related(index, 1)
+
+def test_batched_lookups_match_single_ones():
+    index = indexed()
+    queries = [(news_id, *ARTICLES[news_id]) for news_id in (1, 3)]
+    assert index.similar(queries, 3) == {1: related(index, 1), 3: related(index, 3)}
+
+def test_remove_and_edit():
+    index = indexed()
+    index.remove(2)
+    assert 2 not in index
+    assert 2 not in related(index, 1)
+    # Edited into a rock story, it now belongs with the others
+    index.add(2, "Rock guitar tour", "The rock band adds guitar shows to the stadium tour")
+    assert related(index, 3)[0] == 2
+    assert related(index, 1)[0] != 2
+
+def test_merge_keeps_results_and_masks():
+    index = indexed()
+    before = {news_id: related(index, news_id) for news_id in ARTICLES}
+    index.merge()
+    assert not index._recent and len(index._ids) == len(ARTICLES)
+    assert {news_id: related(index, news_id) for news_id in ARTICLES} == before
+    index.remove(2)
+    assert 2 not in index and 2 not in related(index, 1)
+
+def test_posting_lists_are_capped():
+    index = indexed(max_postings=1)
+    index.merge()
+    assert index._postings.getnnz(axis=1).max() == 1
+
+def test_merge_threshold():
+    index = small_index(merge_threshold=3)
+    index.add(1, *ARTICLES[1])
+    index.add(2, *ARTICLES[2])
+    assert not index.needs_merge
+    index.add(3, *ARTICLES[3])
+    assert index.needs_merge
+
+def test_every_change_advances_the_generation():
+    index = indexed()
+    generation = index.generation
+    index.add(6, "Jazz", "More jazz")
+    assert index.generation > generation
+    generation = index.generation
+    index.remove(404)
+    assert index.generation == generation
+    index.remove(6)
+    assert index.generation > generation
+    generation = index.generation
+    index.merge()
+    assert index.generation > generation
+
+@pytest.fixture
+def related_news(app_db):
+    with SessionLocal() as db:
+        db.add_all([
+            News(id=news_id, title=title, description=description, creator="alice")
+            for news_id, (title, description) in ARTICLES.items()
+        ])
+        db.commit()
+    related_news = RelatedNews(bind=app_db, index=small_index())
+    assert related_news.catch_up() == len(ARTICLES)
+    return related_news
+
+def lookup(related_news, news_id):
+    return asyncio.run(related_news.related(news_id, *ARTICLES[news_id]))
+
+def test_catch_up_indexes_the_database(related_news):
+    assert related_news.index.documents == len(ARTICLES)
+    assert lookup(related_news, 1)[0] == 2
+    assert related_news.catch_up() == 0
+
+def test_new_article_refreshes_other_articles_lists(related_news):
+    assert 6 not in lookup(related_news, 3)
+    assert related_news.cached(3) is not None
+
+    related_news.add(6, "Rock guitar festival", "A rock festival with guitar bands and a stadium stage")
+    # Article 3 wasn't touched, but its cached list no longer reflects the index
+    assert related_news.cached(3) is None
+    assert 6 in lookup(related_news, 3)
+
+def test_removed_article_refreshes_other_articles_lists(related_news):
+    assert lookup(related_news, 1)[0] == 2
+    related_news.remove(2)
+    assert related_news.cached(1) is None
+    assert 2 not in lookup(related_news, 1)
+
+def test_merge_refreshes_cached_lists(related_news):
+    lookup(related_news, 1)
+    related_news.index.merge()
+    assert related_news.cached(1) is None
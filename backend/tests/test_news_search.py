@@ -0,0 +1,54 @@
+import pytest
+
+from app.core.crud import _excerpt, _mark_terms, search_news
+from app.database import news_fts
+from app.database.database import SessionLocal
+from app.models.news import News
+
+def test_overlapping_terms_are_marked_once():
+    assert _mark_terms("remark on market", ["mark", "ark"]) == "re<mark>mark</mark> on <mark>mark</mark>et"
+    assert _mark_terms("a dark park", ["ark", "park"]) == "a d<mark>ark</mark> <mark>park</mark>"
+
+def test_terms_matching_the_tag_name():
+    assert _mark_terms("mark my words", ["mark", "ma", "k"]) == "<mark>mark</mark> my words"
+    assert _mark_terms("mark", ["mark", "<mark>"]) == "<mark>mark</mark>"
+    assert "</mark>>" not in _mark_terms("remark", ["mark", "ark", "k>"])
+
+def test_markup_in_text_is_escaped():
+    assert _mark_terms("a<script>", ["script"]) == "a&lt;<mark>script</mark>&gt;"
+    assert _mark_terms("Tom & Jerry <b>", ["jerry"]) == "Tom &amp; Jerry &lt;b&gt;"
+
+def test_terms_with_special_characters():
+    assert _mark_terms("R&B <3", ["R&B", "<3"]) == "<mark>R&amp;B</mark> <mark>&lt;3</mark>"
+    assert _mark_terms("a.b axb", ["a.b"]) == "<mark>a.b</mark> axb"
+
+def test_excerpt_is_escaped():
+    text = "x" * 60 + " <img> beat drop " + "y" * 60
+    excerpt = _excerpt(text, ["beat"])
+    assert "<img" not in excerpt
+    assert "&lt;img&gt; <mark>beat</mark>" in excerpt
+    assert excerpt.startswith("…") and excerpt.endswith("…")
+
+@pytest.fixture
+def indexed_news(app_db):
+    db = SessionLocal()
+    db.add_all([
+        News(title="Rock & <b>Roll</b> market", description="<script>x</script> market", creator="alice"),
+        News(title="Quiet ballads", description="Nothing to see", creator="alice"),
+    ])
+    db.commit()
+    yield db
+    db.close()
+
+def test_fts_highlights_are_escaped(indexed_news):
+    assert news_fts.fts_enabled
+    [(news, title, snippet, score)] = search_news(indexed_news, "market")
+    assert news.title == "Rock & <b>Roll</b> market"
+    assert title == "Rock &amp; &lt;b&gt;Roll&lt;/b&gt; <mark>market</mark>"
+    assert "<script>" not in snippet
+    assert "&lt;script&gt;" in snippet and "<mark>market</mark>" in snippet
+
+def test_short_term_highlights_are_escaped(indexed_news):
+    # Under the trigram minimum, so served by the substring scan and _mark_terms
+    [(news, title, snippet, score)] = search_news(indexed_news, "&")
+    assert title == "Rock <mark>&amp;</mark> &lt;b&gt;Roll&lt;/b&gt; market"
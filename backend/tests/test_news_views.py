@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import select
+
+from app.core import news_views as views_module
+from app.core.news_views import NewsViewCounter
+from app.database.database import SessionLocal
+from app.models.news import News
+from app.models.news_stats import NewsStats
+from app.routes import news
+
+@pytest.fixture
+def counter(app_db, monkeypatch):
+    # Never started: flushes happen only when the test asks
+    counter = NewsViewCounter(bind=app_db, threshold=10**6, trending_size=3)
+    monkeypatch.setattr(news, "news_views", counter)
+    return counter
+
+@pytest.fixture
+def client(api, counter):
+    return api(("news", news.router))
+
+def add_news(*titles):
+    with SessionLocal() as db:
+        rows = [News(title=title, description="d", creator="alice") for title in titles]
+        db.add_all(rows)
+        db.commit()
+        return [row.id for row in rows]
+
+def view(client, news_id, times):
+    for _ in range(times):
+        assert client.get(f"/api/news/{news_id}").status_code == 200
+
+def view_counts():
+    with SessionLocal() as db:
+        return dict(db.execute(select(NewsStats.news_id, NewsStats.view_count)).all())
+
+def trending(client, **params):
+    return [item["id"] for item in client.get("/api/news/trending", params=params).json()]
+
+def test_flush_persists_counts_and_ranks_trending(client, counter):
+    first, second, third = add_news("first", "second", "third")
+    view(client, first, 1)
+    view(client, second, 3)
+    view(client, third, 2)
+    # Write-behind: nothing is stored or ranked until the flush
+    assert view_counts() == {}
+    assert trending(client) == []
+
+    assert counter.flush() == 6
+    assert view_counts() == {first: 1, second: 3, third: 2}
+    assert trending(client) == [second, third, first]
+    assert trending(client, limit=2) == [second, third]
+
+    view(client, first, 4)
+    assert counter.flush() == 4
+    assert view_counts() == {first: 5, second: 3, third: 2}
+    assert trending(client) == [first, second, third]
+
+def test_ranking_survives_a_restart(client, counter, app_db):
+    ids = add_news("a", "b", "c", "d")
+    for times, news_id in enumerate(ids, start=1):
+        view(client, news_id, times)
+    counter.flush()
+
+    restarted = NewsViewCounter(bind=app_db, trending_size=3)
+    restarted.reload()
+    assert restarted.trending.snapshot()[1] == (ids[3], ids[2], ids[1])
+
+def test_recent_views_outweigh_older_ones(counter, monkeypatch):
+    old, recent = add_news("old", "recent")
+    clock = [1_700_000_000.0]
+    monkeypatch.setattr(views_module.time, "time", lambda: clock[0])
+    for _ in range(3):
+        counter.record(old)
+    counter.flush()
+    # Two half-lives later, two views beat three
+    clock[0] += 2 * views_module.TRENDING_HALF_LIFE_HOURS * 3600
+    for _ in range(2):
+        counter.record(recent)
+    counter.flush()
+    assert counter.trending.snapshot()[1] == (recent, old)
+
+def test_views_of_deleted_news_are_dropped(counter):
+    kept, deleted = add_news("kept", "deleted")
+    counter.record(kept)
+    counter.record(deleted)
+    counter.forget(deleted)
+    # Deleted between the read and the flush: no row is created for it
+    ghost = deleted + 100
+    counter.record(ghost)
+    counter.flush()
+    assert view_counts() == {kept: 1}
+    assert counter.trending.snapshot()[1] == (kept,)
@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import select
+
+from app.core import async_crud, security
+from app.database.database import SessionLocal
+from app.models.user import User
+from app.routes import auth
+
+# Far below the calibrated bounds, so hashing stays cheap in tests
+OLD_COST = 4
+NEW_COST = 5
+
+class InlinePool:
+    """Runs the pool's jobs in-process; the real one needs spawned workers"""
+
+    async def hash(self, password):
+        return security.get_password_hash(password)
+
+    async def verify_and_update(self, password, hashed_password):
+        return security.verify_and_update_password(password, hashed_password)
+
+@pytest.fixture(autouse=True)
+def restore_policy():
+    policy = security.current_password_policy()
+    yield
+    security.configure_password_hashing(*policy)
+
+def test_lower_cost_hash_is_upgraded():
+    security.configure_password_hashing("bcrypt", OLD_COST)
+    old_hash = security.get_password_hash("hunter22")
+    assert old_hash.startswith("$2b$04$")
+    assert not security.password_needs_rehash(old_hash)
+
+    security.configure_password_hashing("bcrypt", NEW_COST)
+    assert security.password_needs_rehash(old_hash)
+    assert security.verify_and_update_password("wrong", old_hash) == (False, None)
+    valid, new_hash = security.verify_and_update_password("hunter22", old_hash)
+    assert valid and new_hash.startswith("$2b$05$")
+    assert security.verify_and_update_password("hunter22", new_hash) == (True, None)
+
+def test_other_scheme_is_upgraded():
+    security.configure_password_hashing("bcrypt", OLD_COST)
+    old_hash = security.get_password_hash("hunter22")
+    security.configure_password_hashing("argon2", 2)
+    valid, new_hash = security.verify_and_update_password("hunter22", old_hash)
+    assert valid and new_hash.startswith("$argon2id$")
+
+def stored_hash(username):
+    with SessionLocal() as db:
+        return db.scalar(select(User.password_hash).where(User.username == username))
+
+def test_login_persists_the_upgraded_hash(api, monkeypatch):
+    monkeypatch.setattr(async_crud, "password_pool", InlinePool())
+    client = api(("auth", auth.router))
+    security.configure_password_hashing("bcrypt", OLD_COST)
+    with SessionLocal() as db:
+        db.add(User(username="alice", email="alice@example.com", password_hash=security.get_password_hash("hunter22")))
+        db.commit()
+    old_hash = stored_hash("alice")
+
+    security.configure_password_hashing("bcrypt", NEW_COST)
+    wrong = client.post("/api/auth/login", json={"username": "alice", "password": "wrong"})
+    assert wrong.status_code == 401
+    assert stored_hash("alice") == old_hash
+
+    assert client.post("/api/auth/login", json={"username": "alice", "password": "hunter22"}).status_code == 200
+    new_hash = stored_hash("alice")
+    assert new_hash.startswith("$2b$05$")
+    assert not security.password_needs_rehash(new_hash)
+
+    # Already current: the next login leaves it alone
+    assert client.post("/api/auth/login", json={"username": "alice", "password": "hunter22"}).status_code == 200
+    assert stored_hash("alice") == new_hash
@@ -0,0 +1,130 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, delete, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database.database import Base
+from app.models.refresh_token import RefreshToken
+from app.models.user import User
+from app.core import refresh_tokens
+from app.core.sweeper import sweeper
+from app.core.refresh_tokens import (
+    InvalidRefreshToken, RefreshTokenRaced, hash_refresh_token, issue_refresh_token, rotate_refresh_token,
+)
+
+def run_with_db(scenario):
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[RefreshToken.__table__, User.__table__])
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                db.add(User(username="alice", email="alice@example.com", password_hash="x"))
+                await db.commit()
+                return await scenario(db)
+        finally:
+            await engine.dispose()
+    return asyncio.run(run())
+
+async def age_token(db, token: str, seconds: float) -> None:
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(token))
+        .values(used_at=datetime.utcnow() - timedelta(seconds=seconds))
+    )
+    await db.commit()
+
+async def family_size(db) -> int:
+    return len((await db.scalars(select(RefreshToken.id))).all())
+
+def test_rotation_issues_the_next_token():
+    async def scenario(db):
+        first = await issue_refresh_token(db, "alice")
+        username, second = await rotate_refresh_token(db, first)
+        assert username == "alice" and second != first
+        username, third = await rotate_refresh_token(db, second)
+        assert username == "alice"
+    run_with_db(scenario)
+
+def test_unknown_token():
+    async def scenario(db):
+        with pytest.raises(InvalidRefreshToken):
+            await rotate_refresh_token(db, "not-a-token")
+    run_with_db(scenario)
+
+def test_second_tab_inside_grace_keeps_the_session(monkeypatch):
+    monkeypatch.setattr(refresh_tokens, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 10)
+
+    async def scenario(db):
+        first = await issue_refresh_token(db, "alice")
+        _, second = await rotate_refresh_token(db, first)
+        with pytest.raises(RefreshTokenRaced):
+            await rotate_refresh_token(db, first)
+        # Nothing was revoked or issued: the winning tab's token still works
+        assert await family_size(db) == 2
+        username, _ = await rotate_refresh_token(db, second)
+        assert username == "alice"
+    run_with_db(scenario)
+
+def test_reuse_after_grace_revokes_the_family(monkeypatch):
+    monkeypatch.setattr(refresh_tokens, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 10)
+
+    async def scenario(db):
+        first = await issue_refresh_token(db, "alice")
+        _, second = await rotate_refresh_token(db, first)
+        await age_token(db, first, 60)
+        with pytest.raises(InvalidRefreshToken) as info:
+            await rotate_refresh_token(db, first)
+        assert not isinstance(info.value, RefreshTokenRaced)
+        assert await family_size(db) == 0
+        with pytest.raises(InvalidRefreshToken):
+            await rotate_refresh_token(db, second)
+    run_with_db(scenario)
+
+def test_no_grace_when_disabled(monkeypatch):
+    monkeypatch.setattr(refresh_tokens, "REFRESH_TOKEN_REUSE_GRACE_SECONDS", 0)
+
+    async def scenario(db):
+        first = await issue_refresh_token(db, "alice")
+        await rotate_refresh_token(db, first)
+        await age_token(db, first, 1)
+        with pytest.raises(InvalidRefreshToken) as info:
+            await rotate_refresh_token(db, first)
+        assert not isinstance(info.value, RefreshTokenRaced)
+        assert await family_size(db) == 0
+    run_with_db(scenario)
+
+def test_deleted_user_revokes_the_family():
+    async def scenario(db):
+        first = await issue_refresh_token(db, "alice")
+        _, second = await rotate_refresh_token(db, first)
+        await db.execute(delete(User).where(User.username == "alice"))
+        await db.commit()
+        with pytest.raises(InvalidRefreshToken, match="no longer exists"):
+            await rotate_refresh_token(db, second)
+        assert await family_size(db) == 0
+    run_with_db(scenario)
+
+def test_sweeper_deletes_expired_tokens(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[RefreshToken.__table__])
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(sweeper, "session_factory", session_factory)
+    monkeypatch.setattr(sweeper, "batch_size", 2)
+    now = datetime.utcnow()
+    with session_factory() as db:
+        db.add_all([
+            RefreshToken(token_hash=f"h{i}", family_id="f", username="alice",
+                         expires_at=now + timedelta(days=1 if i % 2 else -1))
+            for i in range(5)
+        ])
+        db.commit()
+
+    assert "refresh_tokens" in sweeper.jobs
+    assert sweeper.sweep("refresh_tokens") == 3
+    with session_factory() as db:
+        assert db.scalars(select(RefreshToken.token_hash).order_by(RefreshToken.id)).all() == ["h1", "h3"]
@@ -0,0 +1,113 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from app.core.response_cache import ResponseCache, news_cache
+from app.routes import news
+
+def request(**headers):
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+def test_matching_etag_is_not_modified():
+    cache = ResponseCache()
+    entry = cache.store("k", b"[]", cache.generation(), last_modified=datetime(2024, 1, 1))
+    assert entry.to_response(request()).status_code == 200
+    for header in (entry.etag, f'"other", {entry.etag}', "*"):
+        response = entry.to_response(request(if_none_match=header))
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == entry.etag
+        assert response.headers["last-modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+def test_stale_etag_gets_the_body():
+    cache = ResponseCache()
+    old = cache.store("k", b"[1]", cache.generation())
+    new = cache.store("k", b"[2]", cache.generation())
+    assert old.etag != new.etag
+    response = cache.get("k").to_response(request(if_none_match=old.etag))
+    assert response.status_code == 200
+    assert response.body == b"[2]"
+
+def test_invalidate_drops_tagged_entries_only():
+    cache = ResponseCache()
+    cache.store("item", b"{}", cache.generation(), tags=["news:1"])
+    cache.store("list", b"[]", cache.generation(), tags=["news:1", "news:2", "list"])
+    cache.store("other", b"{}", cache.generation(), tags=["news:2"])
+    assert cache.invalidate("news:1") == 2
+    assert cache.get("item") is None and cache.get("list") is None
+    assert cache.get("other") is not None
+
+def test_response_built_across_a_write_is_not_stored():
+    cache = ResponseCache()
+    generation = cache.generation()
+    cache.invalidate("news:1")
+    entry = cache.store("k", b"{}", generation, tags=["news:1"])
+    assert entry.etag and cache.get("k") is None
+
+@pytest.fixture
+def client(api, monkeypatch):
+    monkeypatch.setattr(news, "related_news", SimpleNamespace(
+        add=lambda *args: None, remove=lambda news_id: None, catch_up_later=lambda: None,
+    ))
+    return api(("news", news.router), user=SimpleNamespace(username="alice"))
+
+def create(client, title):
+    response = client.post("/api/news/", json={"title": title, "description": f"About {title}"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={"If-None-Match": etag})
+
+def test_unchanged_item_and_list_are_not_modified(client):
+    news_id = create(client, "first")
+    for url in (f"/api/news/{news_id}", "/api/news/", "/api/news/mine"):
+        etag = client.get(url).headers["etag"]
+        assert revalidate(client, url, etag).status_code == 304
+
+def test_create_invalidates_lists(client):
+    news_id = create(client, "first")
+    item_etag = client.get(f"/api/news/{news_id}").headers["etag"]
+    list_etag = client.get("/api/news/").headers["etag"]
+    mine_etag = client.get("/api/news/mine").headers["etag"]
+
+    create(client, "second")
+    response = revalidate(client, "/api/news/", list_etag)
+    assert response.status_code == 200
+    assert [item["title"] for item in response.json()] == ["second", "first"]
+    assert revalidate(client, "/api/news/mine", mine_etag).status_code == 200
+    # The first item itself didn't change
+    assert revalidate(client, f"/api/news/{news_id}", item_etag).status_code == 304
+
+def test_update_invalidates_the_item_and_lists_holding_it(client):
+    news_id = create(client, "first")
+    other_id = create(client, "other")
+    item_etag = client.get(f"/api/news/{news_id}").headers["etag"]
+    other_etag = client.get(f"/api/news/{other_id}").headers["etag"]
+    list_etag = client.get("/api/news/").headers["etag"]
+
+    assert client.put(f"/api/news/{news_id}", json={"title": "renamed"}).status_code == 200
+    response = revalidate(client, f"/api/news/{news_id}", item_etag)
+    assert response.status_code == 200 and response.json()["title"] == "renamed"
+    response = revalidate(client, "/api/news/", list_etag)
+    assert response.status_code == 200
+    assert "renamed" in [item["title"] for item in response.json()]
+    assert revalidate(client, f"/api/news/{other_id}", other_etag).status_code == 304
+
+def test_delete_invalidates_the_item_and_lists(client):
+    news_id = create(client, "doomed")
+    create(client, "kept")
+    client.get(f"/api/news/{news_id}")
+    list_etag = client.get("/api/news/").headers["etag"]
+    mine_etag = client.get("/api/news/mine").headers["etag"]
+
+    assert client.delete(f"/api/news/{news_id}").status_code == 200
+    assert news_cache.get(("item", news_id)) is None
+    assert client.get(f"/api/news/{news_id}").status_code == 404
+    for url, etag in (("/api/news/", list_etag), ("/api/news/mine", mine_etag)):
+        response = revalidate(client, url, etag)
+        assert response.status_code == 200
+        assert [item["title"] for item in response.json()] == ["kept"]
@@ -0,0 +1,82 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.security import create_access_token
+from app.core.user_cache import UserCache, user_cache
+from app.database.database import SessionLocal
+from app.models.user import User
+from app.routes import auth
+from app.schemas.user import User as UserSchema
+
+def snapshot(username):
+    return UserSchema(id=1, username=username, email=f"{username}@example.com", created_at=datetime(2024, 1, 1))
+
+def test_entries_never_outlive_the_token():
+    cache = UserCache(ttl=300)
+    cache.set("expired", snapshot("alice"), expires_at=time.time() - 1)
+    assert cache.get("expired") is None
+    cache.set("live", snapshot("alice"), expires_at=time.time() + 60)
+    assert cache.get("live").username == "alice"
+
+def test_invalidate_user_drops_all_their_tokens():
+    cache = UserCache()
+    expires_at = time.time() + 60
+    cache.set("a1", snapshot("alice"), expires_at)
+    cache.set("a2", snapshot("alice"), expires_at)
+    cache.set("b1", snapshot("bob"), expires_at)
+    cache.invalidate_user("alice")
+    assert cache.get("a1") is None and cache.get("a2") is None
+    assert cache.get("b1") is not None
+
+@pytest.fixture
+def client(api):
+    with SessionLocal() as db:
+        db.add(User(username="alice", email="alice@example.com", password_hash="x"))
+        db.commit()
+    return api(("auth", auth.router))
+
+def token_for(username):
+    return create_access_token({"sub": username}, expires_delta=timedelta(minutes=5))
+
+def me(client, token):
+    return client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+def change_alice(**values):
+    # Through the ORM, so the mapper events fire
+    with SessionLocal() as db:
+        user = db.scalar(select(User).where(User.username == "alice"))
+        for name, value in values.items():
+            setattr(user, name, value)
+        db.commit()
+
+def test_update_evicts_the_cached_user(client):
+    token = token_for("alice")
+    assert me(client, token).json()["email"] == "alice@example.com"
+    assert user_cache.get(token) is not None
+
+    change_alice(email="alice@new.example.com")
+    assert user_cache.get(token) is None
+    assert me(client, token).json()["email"] == "alice@new.example.com"
+
+def test_rename_evicts_tokens_of_the_old_name(client):
+    token = token_for("alice")
+    assert me(client, token).status_code == 200
+
+    change_alice(username="alicia")
+    assert user_cache.get(token) is None
+    assert me(client, token).status_code == 401
+
+def test_delete_evicts_the_cached_user(client):
+    token = token_for("alice")
+    assert me(client, token).status_code == 200
+
+    with SessionLocal() as db:
+        db.delete(db.scalar(select(User).where(User.username == "alice")))
+        db.commit()
+    assert user_cache.get(token) is None
+    response = me(client, token)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
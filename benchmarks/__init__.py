@@ -0,0 +1,15 @@
+"""
+Reproducible benchmarks for the music_web backend.
+
+    python -m benchmarks seed  --size 1m --database sqlite:///./bench.db
+    python -m benchmarks micro --database sqlite:///./bench.db
+    python -m benchmarks load  --url http://localhost:8000 --concurrency 32
+    python -m benchmarks compare results/a.json results/b.json
+"""
+import os
+import sys
+
+# Same layout trick as create-sample-data.py: the app package lives in backend/
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,88 @@
+import argparse
+import os
+
+from benchmarks import stats
+from benchmarks.datasets import parse_size
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="music_web benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed = sub.add_parser("seed", help="create a deterministic synthetic database")
+    seed.add_argument("--database", default="sqlite:///./bench.db")
+    seed.add_argument("--size", default="10k", help="news rows: 10k, 100k, 1m, 10m or a number")
+    seed.add_argument("--users", type=int, help="defaults to one user per 100 news rows (at least 100)")
+    seed.add_argument("--seed", type=int, default=42)
+    seed.add_argument("--batch-size", type=int, default=50_000)
+    seed.add_argument("--no-fts", action="store_true", help="skip the search index; the app builds it on first start")
+    seed.add_argument("--force", action="store_true", help="replace an existing database file")
+
+    micro = sub.add_parser("micro", help="in-process crud/security/serialization micro-benchmarks")
+    micro.add_argument("--database", default="sqlite:///./bench.db")
+    micro.add_argument("--iterations", type=int, default=200)
+    micro.add_argument("--warmup", type=int, default=20)
+    micro.add_argument("--seed", type=int, default=42)
+    micro.add_argument("--only", help="run only cases whose name contains this text")
+    micro.add_argument("--output")
+
+    load = sub.add_parser("load", help="HTTP load against a running server")
+    load.add_argument("--url", default="http://localhost:8000")
+    load.add_argument("--scenario", action="append", default=[], help="repeatable; default is every scenario")
+    load.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    load.add_argument("--concurrency", type=int, default=16)
+    load.add_argument("--size", default="10k", help="size the server's database was seeded with")
+    load.add_argument("--users", type=int)
+    load.add_argument("--seed", type=int, default=42)
+    load.add_argument("--timeout", type=float, default=30)
+    load.add_argument("--output")
+
+    diff = sub.add_parser("compare", help="compare two result files")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        stats.compare(args.baseline, args.candidate)
+        return
+
+    if args.command in ("seed", "micro"):
+        # Must be set before any app module creates its engines
+        os.environ["DATABASE_URL"] = args.database
+
+    if args.command == "seed":
+        from benchmarks.datasets import seed_database
+        news = parse_size(args.size)
+        summary = seed_database(
+            args.database,
+            news=news,
+            users=args.users or max(100, news // 100),
+            seed=args.seed,
+            batch_size=args.batch_size,
+            build_fts=not args.no_fts,
+            force=args.force,
+        )
+        print(f"🌱 Seeded {summary['news']} news / {summary['users']} users in {summary['load_seconds']}s "
+              f"(+{summary['fts_seconds']}s search index)")
+        return
+
+    if args.command == "micro":
+        from benchmarks import micro as micro_benchmarks
+        parameters = {"database": args.database, "iterations": args.iterations, "warmup": args.warmup, "seed": args.seed}
+        results = micro_benchmarks.run(args.iterations, args.warmup, args.seed, args.only)
+    else:
+        from benchmarks import load as load_test
+        news = parse_size(args.size)
+        users = args.users or max(100, news // 100)
+        parameters = {
+            "url": args.url, "scenarios": args.scenario or "all", "requests": args.requests,
+            "concurrency": args.concurrency, "news": news, "users": users, "seed": args.seed,
+        }
+        results = load_test.run(args.url, args.scenario, args.requests, args.concurrency, news, users, args.seed, args.timeout)
+
+    stats.print_table(results)
+    path = stats.write_results(args.command, parameters, results, args.output)
+    print(f"📄 Results written to {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Deterministic synthetic data. The same --seed always produces the same
+rows, so two runs against separately seeded databases are comparable.
+"""
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, Tuple
+from sqlalchemy.engine import make_url
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+BENCH_PASSWORD = "benchmark-password"
+BASE_TIME = datetime(2024, 1, 1)
+# Timestamp's SQLite storage format, written as text so no type processing is needed
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+TITLE_WORDS = [
+    "音乐节", "巡回演唱会", "新专辑", "乐队", "钢琴家", "交响乐团", "说唱", "民谣", "电子音乐", "爵士",
+    "festival", "tour", "album", "band", "pianist", "orchestra", "live", "remix", "single", "premiere",
+]
+BODY_WORDS = TITLE_WORDS + [
+    "艺术家", "观众", "现场", "首演", "门票", "发布", "合作", "经典", "全新", "城市",
+    "music", "stage", "fans", "release", "studio", "vinyl", "chart", "artist", "venue", "record",
+]
+EMOJI = ["🎵", "🎸", "🎹", "🎤", "🎼", "🥁", "🎷", "🎻"]
+
+def parse_size(value: str) -> int:
+    value = value.lower()
+    return SIZES[value] if value in SIZES else int(value)
+
+def username(i: int) -> str:
+    return f"user{i}"
+
+def email(i: int) -> str:
+    return f"user{i}@bench.example"
+
+def user_rows(count: int, password_hash: str) -> Iterator[Tuple]:
+    for i in range(count):
+        yield (username(i), email(i), password_hash)
+
+# Text is drawn from fixed pools; composing fresh sentences per row would
+# make generation, not SQLite, the bottleneck at 10M rows
+POOL_SIZE = 4096
+
+def news_rows(count: int, users: int, seed: int) -> Iterator[Tuple]:
+    """(title, description, summary, image_url, creator, created_at, updated_at), oldest first"""
+    from app.core.news_summary import make_summary
+
+    rng = random.Random(seed)
+    titles = [
+        f"{rng.choice(EMOJI)} {' '.join(rng.choices(TITLE_WORDS, k=rng.randint(2, 5)))}"
+        for _ in range(POOL_SIZE)
+    ]
+    descriptions = [" ".join(rng.choices(BODY_WORDS, k=rng.randint(20, 60))) for _ in range(POOL_SIZE)]
+    summaries = [make_summary(description) for description in descriptions]
+    images = [f"https://images.example.com/{n}.jpg" for n in range(POOL_SIZE)] + [None] * (POOL_SIZE // 4)
+    creators = [username(n) for n in range(users)]
+    steps = (0, 1, 7, 30, 90)
+
+    moment = BASE_TIME
+    stamp = moment.strftime(TIME_FORMAT)
+    randrange = rng.randrange
+    for i in range(count):
+        # Several rows share a second now and then, like real bursts of posts
+        step = steps[randrange(5)]
+        if step:
+            moment += timedelta(seconds=step)
+            stamp = moment.strftime(TIME_FORMAT)
+        title = f"{titles[randrange(POOL_SIZE)]} #{i}"
+        body = randrange(POOL_SIZE)
+        yield (
+            title,
+            descriptions[body],
+            summaries[body],
+            images[randrange(len(images))],
+            creators[randrange(users)],
+            stamp,
+            stamp,
+        )
+
+def _batches(rows: Iterator[Tuple], size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def seed_database(
+    url: str,
+    news: int,
+    users: int,
+    seed: int = 42,
+    batch_size: int = 50_000,
+    build_fts: bool = True,
+    force: bool = False,
+) -> dict:
+    """
+    Create a fresh database and fill it with `news` rows and `users` users.
+    Rows are inserted oldest first in large executemany batches; the FTS
+    index is built once at the end instead of by per-row triggers.
+    """
+    from app.database.database import Base, create_db_engine, ensure_indexes
+    from app.database.news_fts import ensure_news_fts
+    from app.core.security import get_password_hash
+    # Importing the models registers their tables on Base.metadata
+    import app.models.news, app.models.user, app.models.verification, app.models.outbox, app.models.refresh_token, app.models.news_stats
+
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        raise SystemExit("Seeding writes SQLite-specific SQL; use a sqlite:/// URL")
+    if parsed.database and os.path.exists(parsed.database):
+        if not force:
+            raise SystemExit(f"{parsed.database} already exists; pass --force to replace it")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(parsed.database + suffix):
+                os.remove(parsed.database + suffix)
+
+    engine = create_db_engine(url)
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes(bind=engine)
+
+    started = time.perf_counter()
+    # Every user shares one hash; hashing millions of passwords would dominate seeding
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    with engine.begin() as conn:
+        # Throwaway data: trade crash safety for load speed on this connection only
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        for batch in _batches(user_rows(users, password_hash), batch_size):
+            conn.exec_driver_sql("INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)", batch)
+        for batch in _batches(news_rows(news, users, seed), batch_size):
+            conn.exec_driver_sql(
+                "INSERT INTO news (title, description, summary, image_url, creator, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+    loaded = time.perf_counter()
+
+    fts = False
+    if build_fts:
+        # First creation backfills the whole table with one 'rebuild'
+        fts = ensure_news_fts(bind=engine)
+    finished = time.perf_counter()
+    engine.dispose()
+    return {
+        "news": news,
+        "users": users,
+        "seed": seed,
+        "load_seconds": round(loaded - started, 2),
+        "fts_seconds": round(finished - loaded, 2),
+        "fts": fts,
+    }
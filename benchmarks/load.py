@@ -0,0 +1,144 @@
+"""
+HTTP load generator. Each scenario runs a fixed number of requests with
+N concurrent clients against a running server (seeded with `seed`, so
+users and ids line up).
+"""
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.datasets import BENCH_PASSWORD, email, username
+from benchmarks.micro import SEARCH_TERMS
+from benchmarks.stats import summarize
+
+Request = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+def _refresh_request(user_count: int) -> Request:
+    # One rotating token family per client; its first request also logs in
+    tokens: Dict[int, str] = {}
+
+    async def refresh(c: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        key = id(rng)
+        if key not in tokens:
+            login = await c.post(
+                "/api/auth/login",
+                json={"username": username(rng.randrange(user_count)), "password": BENCH_PASSWORD},
+            )
+            tokens[key] = login.json()["refresh_token"]
+        response = await c.post("/api/auth/refresh", json={"refresh_token": tokens[key]})
+        if response.status_code == 200:
+            tokens[key] = response.json()["refresh_token"]
+        return response
+
+    return refresh
+
+def scenarios(news_count: int, user_count: int) -> Dict[str, Tuple[Request, Tuple[int, ...]]]:
+    """name -> (request factory, status codes that count as success)"""
+    return {
+        "news_list": (
+            lambda c, rng: c.get("/api/news/", params={"limit": 20, "skip": rng.randrange(0, 1000, 20)}),
+            (200,),
+        ),
+        "news_item": (
+            lambda c, rng: c.get(f"/api/news/{rng.randint(1, news_count)}"),
+            (200,),
+        ),
+        "news_trending": (
+            lambda c, rng: c.get("/api/news/trending", params={"limit": 10}),
+            (200,),
+        ),
+        # 503 while the index is still building after startup
+        "news_related": (
+            lambda c, rng: c.get(f"/api/news/{rng.randint(1, news_count)}/related", params={"limit": 5}),
+            (200, 503),
+        ),
+        "news_search": (
+            lambda c, rng: c.get("/api/news/search", params={"q": rng.choice(SEARCH_TERMS), "limit": 10}),
+            (200,),
+        ),
+        "auth_login": (
+            lambda c, rng: c.post(
+                "/api/auth/login",
+                json={"username": username(rng.randrange(user_count)), "password": BENCH_PASSWORD},
+            ),
+            (200,),
+        ),
+        "auth_refresh": (_refresh_request(user_count), (200,)),
+        "verification_status": (
+            lambda c, rng: c.get(f"/api/verification/verification-status/{email(rng.randrange(user_count))}"),
+            (200,),
+        ),
+        # A wrong code exercises the full lookup path; 400 is the expected answer
+        "verification_verify": (
+            lambda c, rng: c.post(
+                "/api/verification/verify-email",
+                json={"email": email(rng.randrange(user_count)), "verification_code": "000000"},
+            ),
+            (400,),
+        ),
+    }
+
+async def run_scenario(
+    base_url: str,
+    request: Request,
+    expected: Tuple[int, ...],
+    requests: int,
+    concurrency: int,
+    seed: int,
+    timeout: float,
+) -> Dict:
+    samples: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    remaining = requests
+
+    async def worker(worker_id: int) -> None:
+        nonlocal remaining, errors
+        rng = random.Random(seed * 1000 + worker_id)
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await request(client, rng)
+            except httpx.HTTPError as e:
+                errors += 1
+                statuses[type(e).__name__] += 1
+                continue
+            samples.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] += 1
+            if response.status_code not in expected:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        wall_started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        wall = time.perf_counter() - wall_started
+
+    summary = summarize(samples, wall, errors)
+    summary["statuses"] = dict(statuses)
+    return summary
+
+def run(
+    base_url: str,
+    names: List[str],
+    requests: int,
+    concurrency: int,
+    news_count: int,
+    user_count: int,
+    seed: int = 42,
+    timeout: float = 30,
+) -> Dict[str, Dict]:
+    available = scenarios(news_count, user_count)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}; choose from {', '.join(available)}")
+    results = {}
+    for name in names or list(available):
+        request, expected = available[name]
+        results[name] = asyncio.run(run_scenario(base_url, request, expected, requests, concurrency, seed, timeout))
+    return results
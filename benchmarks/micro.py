@@ -0,0 +1,107 @@
+"""
+In-process micro-benchmarks: crud queries against a seeded database,
+password hashing and JWT handling, and Pydantic serialization.
+"""
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.datasets import BENCH_PASSWORD, username
+from benchmarks.stats import summarize
+
+SEARCH_TERMS = ["音乐节", "band", "钢琴", "orchestra live", "巡回演唱会"]
+
+def run_case(fn: Callable[[int], object], iterations: int, warmup: int) -> Dict:
+    for i in range(warmup):
+        fn(i)
+    samples: List[float] = []
+    errors = 0
+    wall_started = time.perf_counter()
+    for i in range(iterations):
+        started = time.perf_counter()
+        try:
+            fn(i)
+        except Exception:
+            errors += 1
+            continue
+        samples.append(time.perf_counter() - started)
+    summary = summarize(samples, time.perf_counter() - wall_started, errors)
+    summary.update(measure_allocations(fn, iterations))
+    return summary
+
+def measure_allocations(fn: Callable[[int], object], i: int) -> Dict:
+    """Peak memory traced during one more call, after timing so it doesn't skew it"""
+    tracemalloc.start()
+    try:
+        fn(i)
+        _, peak = tracemalloc.get_traced_memory()
+    except Exception:
+        return {}
+    finally:
+        tracemalloc.stop()
+    return {"alloc_peak_kib": round(peak / 1024, 1)}
+
+def run(iterations: int = 200, warmup: int = 20, seed: int = 42, only: str = None) -> Dict[str, Dict]:
+    # Imported late: the CLI points DATABASE_URL at the benchmark database first
+    from pydantic import TypeAdapter
+    from sqlalchemy import func, select
+    from app.core import crud, security
+    from app.core.news_json import render_news_rows
+    from app.database.database import SessionLocal
+    from app.database.news_fts import ensure_news_fts
+    from app.models.news import News
+    from app.models.user import User
+    from app.schemas.news import News as NewsSchema
+
+    rng = random.Random(seed)
+    # Search uses FTS only once this has run, as it does at app startup
+    ensure_news_fts()
+    db = SessionLocal()
+    try:
+        news_count = db.scalar(select(func.count()).select_from(News)) or 0
+        user_count = db.scalar(select(func.count()).select_from(User)) or 0
+        if not news_count or not user_count:
+            raise SystemExit("The benchmark database is empty; run `python -m benchmarks seed` first")
+        ids = [rng.randint(1, news_count) for _ in range(iterations + warmup)]
+        users = [username(rng.randrange(user_count)) for _ in range(iterations + warmup)]
+        middle = crud.get_news_list(db, skip=min(news_count // 2, 100_000), limit=1)
+        cursor = crud.encode_news_cursor(middle[0])
+        page = crud.get_news_list(db, limit=100)
+        rows = crud.get_news_rows(db, limit=100)
+        list_adapter = TypeAdapter(List[NewsSchema])
+        password_hash = security.get_password_hash(BENCH_PASSWORD)
+        token = security.create_access_token({"sub": username(0)})
+
+        # Hashing is deliberately slow; a handful of samples is enough
+        slow = max(5, iterations // 20)
+        cases = {
+            "crud.get_news_list[limit=100]": (lambda i: crud.get_news_list(db, limit=100), iterations),
+            "crud.get_news_list[skip=10000]": (lambda i: crud.get_news_list(db, skip=min(10_000, news_count - 1), limit=20), iterations),
+            "crud.get_news_list[cursor]": (lambda i: crud.get_news_list(db, limit=20, cursor=cursor), iterations),
+            "crud.get_news_by_id": (lambda i: crud.get_news_by_id(db, ids[i]), iterations),
+            "crud.search_news": (lambda i: crud.search_news(db, SEARCH_TERMS[i % len(SEARCH_TERMS)], limit=10), iterations),
+            "crud.get_user_by_username": (lambda i: crud.get_user_by_username(db, users[i]), iterations),
+            "security.get_password_hash": (lambda i: security.get_password_hash(BENCH_PASSWORD), slow),
+            "security.verify_password": (lambda i: security.verify_password(BENCH_PASSWORD, password_hash), slow),
+            "security.create_access_token": (lambda i: security.create_access_token({"sub": users[i]}), iterations),
+            "security.verify_token": (lambda i: security.verify_token(token), iterations),
+            "pydantic.validate[100]": (lambda i: [NewsSchema.model_validate(item) for item in page], iterations),
+            "pydantic.dump_json[100]": (lambda i: list_adapter.dump_json(list_adapter.validate_python(page, from_attributes=True)), iterations),
+            "orjson.render_rows[100]": (lambda i: render_news_rows(rows), iterations),
+            # Query plus body for GET /api/news/?limit=100, before and after the row path
+            "read_news[100].orm+pydantic": (lambda i: list_adapter.dump_json(list_adapter.validate_python(crud.get_news_list(db, limit=100), from_attributes=True)), iterations),
+            "read_news[100].rows+orjson": (lambda i: render_news_rows(crud.get_news_rows(db, limit=100)), iterations),
+        }
+        results = {}
+        for name, (fn, count) in cases.items():
+            if only and only not in name:
+                continue
+            # Identity-map hits would hide query cost; every sample starts clean
+            def sample(i, fn=fn):
+                db.expunge_all()
+                return fn(i)
+            results[name] = run_case(sample, count, min(warmup, count))
+        return results
+    finally:
+        db.close()
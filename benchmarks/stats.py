@@ -0,0 +1,88 @@
+import json
+import math
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional, Sequence
+
+def percentile(sorted_samples: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+def summarize(samples: List[float], wall_seconds: float, errors: int = 0) -> Dict:
+    """Latency percentiles in ms plus throughput; samples are per-operation seconds"""
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "count": count,
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "mean_ms": round(sum(ordered) / count * 1000, 4) if count else 0.0,
+        "max_ms": round(ordered[-1] * 1000, 4) if count else 0.0,
+        "throughput_per_s": round(count / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+    }
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def environment() -> Dict:
+    return {
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+def write_results(kind: str, parameters: Dict, results: Dict, output: Optional[str]) -> str:
+    """Write one run as JSON; the default path is results/<kind>-<timestamp>.json"""
+    if output is None:
+        output = os.path.join("results", f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    document = {"kind": kind, "environment": environment(), "parameters": parameters, "results": results}
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return output
+
+def print_table(results: Dict) -> None:
+    print(f"{'case':<32} {'count':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'errors':>7} {'peak KiB':>9}")
+    for name, summary in results.items():
+        # Load-test results carry no allocation figures
+        peak = summary.get("alloc_peak_kib")
+        print(
+            f"{name:<32} {summary['count']:>8} {summary['p50_ms']:>10.3f} {summary['p95_ms']:>10.3f} "
+            f"{summary['p99_ms']:>10.3f} {summary['throughput_per_s']:>10.1f} {summary['errors']:>7} "
+            f"{'-' if peak is None else f'{peak:.1f}':>9}"
+        )
+
+def compare(baseline_path: str, candidate_path: str) -> None:
+    """Print per-case percentile changes between two result files"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(candidate_path, encoding="utf-8") as f:
+        candidate = json.load(f)["results"]
+    print(f"{'case':<32} {'p50':>18} {'p95':>18} {'p99':>18} {'ops/s':>18}")
+    for name in baseline:
+        if name not in candidate:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s"):
+            before, after = baseline[name][key], candidate[name][key]
+            change = (after - before) / before * 100 if before else 0.0
+            cells.append(f"{after:>9.2f} ({change:+6.1f}%)")
+        print(f"{name:<32} " + " ".join(cells))
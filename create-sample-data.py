@@ -6,11 +6,14 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
+from sqlalchemy import insert, select
 from sqlalchemy.orm import sessionmaker
 from backend.app.database.database import engine
 from backend.app.models.user import User
 from backend.app.models.news import News
 from backend.app.core.security import get_password_hash
+from backend.app.core.news_summary import make_summary
+from backend.app.core.news_duplicates import description_fingerprint
 
 # 创建会话
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -80,15 +83,23 @@ def create_sample_users():
             print(f"⚠️  用户已存在: {user_data['username']}")
 
 def create_sample_news():
-    """创建示例新闻"""
+    """创建示例新闻（一次查询已有标题，再批量插入）"""
+    titles = [news_data["title"] for news_data in sample_news]
+    existing_titles = set(db.scalars(select(News.title).where(News.title.in_(titles))))
+    new_news = []
     for news_data in sample_news:
-        existing_news = db.query(News).filter(News.title == news_data["title"]).first()
-        if not existing_news:
-            news = News(**news_data)
-            db.add(news)
-            print(f"✅ 创建新闻: {news_data['title']}")
-        else:
+        if news_data["title"] in existing_titles:
             print(f"⚠️  新闻已存在: {news_data['title']}")
+        else:
+            new_news.append({
+                **news_data,
+                "summary": make_summary(news_data["description"]),
+                "fingerprint": description_fingerprint(news_data["description"]),
+            })
+            print(f"✅ 创建新闻: {news_data['title']}")
+    if new_news:
+        # 参数列表走 executemany，而不是逐个 ORM 对象 flush
+        db.execute(insert(News), new_news)
 
 def main():
     try:
@@ -6,6 +6,7 @@ const API_BASE_URL = `${import.meta.env.VITE_API_BASE_URL || 'http://47.97.154.1
 
 export const useAuthStore = defineStore('auth', () => {
   const token = ref<string | null>(localStorage.getItem('token'))
+  const refreshToken = ref<string | null>(localStorage.getItem('refresh_token'))
   const currentUsername = ref<string | null>(localStorage.getItem('username'))
   
   const isAuthenticated = computed(() => {
@@ -24,6 +25,77 @@ export const useAuthStore = defineStore('auth', () => {
     }
   }
   
+  const storeTokens = (data: { access_token: string; refresh_token: string; username: string }) => {
+    token.value = data.access_token
+    refreshToken.value = data.refresh_token
+    currentUsername.value = data.username
+    
+    localStorage.setItem('token', data.access_token)
+    localStorage.setItem('refresh_token', data.refresh_token)
+    localStorage.setItem('username', data.username)
+    
+    setAuthHeader(data.access_token)
+  }
+  
+  // Other tabs share localStorage: pick up their logins, refreshes and logouts
+  const loadStoredTokens = () => {
+    token.value = localStorage.getItem('token')
+    refreshToken.value = localStorage.getItem('refresh_token')
+    currentUsername.value = localStorage.getItem('username')
+    setAuthHeader(token.value)
+  }
+  
+  window.addEventListener('storage', (event) => {
+    if (event.key === null || ['token', 'refresh_token', 'username'].includes(event.key)) {
+      loadStoredTokens()
+    }
+  })
+  
+  // Resolves true once another tab stores a refresh token other than `presented`
+  const waitForOtherTab = (presented: string, timeoutMs = 3000) => new Promise<boolean>((resolve) => {
+    const finish = (rotated: boolean) => {
+      window.removeEventListener('storage', onStorage)
+      clearTimeout(timer)
+      resolve(rotated)
+    }
+    const onStorage = (event: StorageEvent) => {
+      if (event.key === 'refresh_token' && event.newValue && event.newValue !== presented) finish(true)
+    }
+    const timer = setTimeout(() => finish(false), timeoutMs)
+    window.addEventListener('storage', onStorage)
+    const latest = localStorage.getItem('refresh_token')
+    if (latest && latest !== presented) finish(true)
+  })
+  
+  // Access tokens last 30 minutes; the refresh token renews them without a password.
+  // Refresh tokens are single-use, so concurrent 401s share one refresh call.
+  let refreshing: Promise<boolean> | null = null
+  
+  const refreshAccessToken = () => {
+    if (!refreshing) {
+      refreshing = (async () => {
+        // Read at refresh time: another tab may have rotated the token since this one loaded it
+        const presented = localStorage.getItem('refresh_token')
+        if (!presented) return false
+        try {
+          const response = await axios.post(`${API_BASE_URL}/auth/refresh`, { refresh_token: presented })
+          storeTokens(response.data)
+          return true
+        } catch (error: any) {
+          // 409: another tab spent this token a moment ago and is about to store the next pair
+          if (error.response?.status === 409 && await waitForOtherTab(presented)) {
+            loadStoredTokens()
+            return !!token.value
+          }
+          return false
+        } finally {
+          refreshing = null
+        }
+      })()
+    }
+    return refreshing
+  }
+  
   const login = async (inputUsername: string, password: string) => {
     try {
       const response = await axios.post(`${API_BASE_URL}/auth/login`, {
@@ -31,14 +103,7 @@ export const useAuthStore = defineStore('auth', () => {
         password
       })
       
-      const { access_token, username: responseUsername } = response.data
-      token.value = access_token
-      currentUsername.value = responseUsername
-      
-      localStorage.setItem('token', access_token)
-      localStorage.setItem('username', responseUsername)
-      
-      setAuthHeader(access_token)
+      storeTokens(response.data)
       
       return { success: true }
     } catch (error: any) {
@@ -55,21 +120,39 @@ export const useAuthStore = defineStore('auth', () => {
     }
   }
   
-  const logout = () => {
+  const clearSession = () => {
     token.value = null
+    refreshToken.value = null
     currentUsername.value = null
     localStorage.removeItem('token')
+    localStorage.removeItem('refresh_token')
     localStorage.removeItem('username')
     setAuthHeader(null)
   }
   
+  const logout = () => {
+    // Revoke the refresh token family server-side; the local session ends either way
+    if (refreshToken.value) {
+      axios.post(`${API_BASE_URL}/auth/logout`, { refresh_token: refreshToken.value }).catch(() => {})
+    }
+    clearSession()
+  }
+  
   // Add response interceptor to handle 401 errors globally
   axios.interceptors.response.use(
     (response) => response,
-    (error) => {
-      if (error.response?.status === 401 && token.value) {
-        // Token is invalid, logout automatically
-        logout()
+    async (error) => {
+      const request = error.config
+      const isAuthCall = request?.url?.startsWith(`${API_BASE_URL}/auth/`)
+      if (error.response?.status === 401 && token.value && !isAuthCall && !request._retried) {
+        // Expired access token: renew it once and replay the request
+        if (await refreshAccessToken()) {
+          request._retried = true
+          request.headers['Authorization'] = `Bearer ${token.value}`
+          return axios(request)
+        }
+        // Refresh token is gone too (expired, revoked or reused): log out locally
+        clearSession()
       }
       return Promise.reject(error)
     }